@@ -1,5 +1,7 @@
 corpus_source = "swebok" # Guide to the Software Engineering Body of Knowledge
 # corpus_source = "default" # "Software Engineering: A PRACTITIONER’S APPROACH"
+# Serve several corpora at once, one FAISS shard each (eg: ["swebok", "default"]); empty serves corpus_source only
+corpus_shards = []
 
 import os
 
@@ -7,6 +9,9 @@ import os
 CORPUS_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"data/{corpus_source}")
 os.environ["CORPUS_SOURCE"] = CORPUS_SOURCE
 print(f"\nCorpus source: ", CORPUS_SOURCE)
+if corpus_shards:
+    os.environ["CORPUS_SHARDS"] = ",".join(corpus_shards)
+    print(f"Corpus shards: ", ", ".join(corpus_shards))
 
 import subprocess
 from frontend import streamlit
@@ -0,0 +1,110 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, NamedTuple, Optional, Tuple
+import numpy as np
+
+# Answers of repeat and near-repeat questions are replayed instead of generated again
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "1") == "1"
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", 0.95))  # Minimum cosine of the question embeddings
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", 24 * 3600))  # Seconds an answer stays valid
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1024))
+# Number of recurring questions from the conversation log answered at startup to fill the cache (0 disables)
+ANSWER_CACHE_WARMUP = int(os.getenv("ANSWER_CACHE_WARMUP", 0))
+NUMBER_PATTERN = re.compile(r"\d+")
+
+class AnswerKey(NamedTuple):
+    """Exact part of an answer cache key; the question embedding is matched by similarity within it."""
+    index_version: Hashable  # Snapshot(s) the answer was retrieved from
+    prompt_hash: str
+    model_name: str
+    signature: Tuple  # Chapter and numbers of the question, which embeddings barely tell apart
+
+def question_signature(question: str, chapter: Optional[str] = None) -> Tuple:
+    """Return the chapter and the numbers of a question ("chapter 11" and "chapter 12" embed almost the same)."""
+    return chapter, tuple(sorted(NUMBER_PATTERN.findall(question)))
+
+class AnswerCache:
+    """
+    Purpose: Thread-safe semantic cache of streamed answers
+    Processing:
+        - Question embeddings are L2-normalized rows of one preallocated matrix; a lookup is one matmul over
+          every slot, then the best slot above the similarity threshold whose AnswerKey matches wins
+        - Entries are evicted least-recently-used first, and ignored (then dropped) after ttl seconds
+        - retain_version drops the entries of index snapshots that are no longer served
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES, ttl: float = ANSWER_CACHE_TTL, threshold: float = ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._vectors = None
+        self._entries = OrderedDict()  # slot -> (key, chunks, created), least recently used first
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def get(self, key: AnswerKey, embedding) -> Tuple[Optional[List[Tuple[str, str]]], float]:
+        """
+        Purpose: Find the cached answer of a similar question
+        Input:
+            - key: AnswerKey the entry must match exactly
+            - embedding: Question embedding
+        Output: Tuple of (stored (chunk, model_name) pairs or None, similarity of the best candidate)
+        """
+        vector = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            if not self._entries or self._vectors.shape[1] != len(vector):
+                return None, 0.0
+            scores = self._vectors @ vector
+            best = 0.0
+            for slot in np.argsort(-scores):
+                slot = int(slot)
+                if scores[slot] < self.threshold:
+                    break
+                entry = self._entries.get(slot)
+                if entry is None or entry[0] != key:
+                    continue
+                if now - entry[2] > self.ttl:
+                    self._drop(slot)
+                    continue
+                self._entries.move_to_end(slot)
+                return entry[1], float(scores[slot])
+            if len(scores):
+                best = float(scores.max())
+            return None, best
+
+    def put(self, key: AnswerKey, embedding, chunks: List[Tuple[str, str]]) -> None:
+        """Store the streamed chunks of an answer, evicting the least recently used entry when full."""
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != len(vector):
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+                self._entries.clear()
+                self._free = list(range(self.max_entries - 1, -1, -1))
+            if not self._free:
+                self._drop(next(iter(self._entries)))
+            slot = self._free.pop()
+            self._vectors[slot] = vector
+            self._entries[slot] = (key, list(chunks), time.time())
+
+    def retain_version(self, index_version: Hashable) -> None:
+        """Drop every entry retrieved from another index snapshot."""
+        with self._lock:
+            for slot in [slot for slot, entry in self._entries.items() if entry[0].index_version != index_version]:
+                self._drop(slot)
+
+    def _drop(self, slot: int) -> None:
+        del self._entries[slot]
+        self._vectors[slot] = 0
+        self._free.append(slot)
+
+    def __len__(self) -> int:
+        return len(self._entries)
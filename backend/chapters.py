@@ -0,0 +1,145 @@
+import os
+import re
+import json
+import bisect
+import hashlib
+
+CONTENTS_PATH = "/app/data/swebok/contents.json"
+CONTENTS_NAME = "contents.json"
+cached_contents = {}  # {path: ((mtime_ns, size), contents, digest)} of load_contents_cached
+
+def load_contents(path: str = CONTENTS_PATH) -> dict:
+    """
+    Purpose: Read a table of contents (chapters with sections, appendices)
+    Input: path: Path to contents.json
+    Output: Contents dictionary, or None if the corpus has none
+    """
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def load_contents_cached(path: str = CONTENTS_PATH) -> tuple:
+    """Return (contents, digest) of a contents.json, read again only when its mtime or size changes ((None, None) if missing)."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None, None
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = cached_contents.get(path)
+    if cached is None or cached[0] != key:
+        contents = load_contents(path)
+        cached = (key, contents, contents_digest(contents))
+        cached_contents[path] = cached
+    return cached[1], cached[2]
+
+def contents_digest(contents: dict) -> str:
+    """Return a short hash of the contents, used to detect stale chapter annotations."""
+    if contents is None:
+        return None
+    return hashlib.sha256(json.dumps(contents, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def find_chapter(question: str, contents: dict, explicit: bool = False) -> str:
+    """
+    Purpose: Find the chapter a question refers to ("chapter 3", "chapter 03", "chapter three")
+    Input:
+        - question: User query string
+        - contents: Contents dictionary
+        - explicit: Only accept chapters named after the word "chapter"; otherwise a bare number word
+          ("three") also counts, which only suits the chapter intents
+    Output: Chapter number as written in the question (eg: "3"), or None
+    """
+    chapter_match = re.search(r'chapter\s*0?(\d+)', question.lower())
+    if chapter_match:
+        return chapter_match.group(1)
+    prefix = r"chapter\s+" if explicit else r"\b"
+    for chapter in contents["chapters"]:
+        if re.search(rf"{prefix}{chapter['chapter_number_text']}\b", question.lower()):
+            return chapter["chapter"]
+    return None
+
+def heading_pattern(number: int, title: str) -> re.Pattern:
+    """
+    Purpose: Match a numbered section heading ("2. Requirements Elicitation") in page text
+    Input: number: Section number, title: Section title
+    Output: Compiled pattern that tolerates line breaks and hyphenation inside the title
+    """
+    title_pattern = r"\W*".join(re.escape(char) for char in re.sub(r"\W", "", title.lower()))
+    return re.compile(rf"(?<![\d.]){number}\.\s+{title_pattern}")
+
+class ChapterIndex:
+    """
+    Purpose: Map (source, page) to the chapter and section that contain it
+    Processing:
+        - Built from contents.json plus the text of each page (the chunks of a page, in order)
+        - A chapter or appendix starts on the page whose first line is its first page label
+          ("1-1", "A-1") and which carries its heading ("CHAPTER 01", "Appendix A")
+        - A section starts on the first page of its chapter with the numbered heading ("2. Requirements Elicitation")
+        - Pages before the first chapter (front matter, table of contents) belong to no chapter
+    """
+
+    def __init__(self, units: dict):
+        # {source: [(start_page, chapter, [(section_start_page, section_title), ...]), ...]} sorted by start page
+        self.units = units
+
+    @classmethod
+    def build(cls, contents: dict, pages: dict) -> "ChapterIndex":
+        """
+        Purpose: Locate every chapter and section of contents in the page texts
+        Input:
+            - contents: Contents dictionary
+            - pages: {(source, page): text} for every indexed page
+        Output: ChapterIndex
+        """
+        units = [(chapter["chapter"], "CHAPTER", chapter.get("sections", [])) for chapter in contents["chapters"]]
+        units += [(appendix["chapter"], "APPENDIX", []) for appendix in contents.get("appendices", [])]
+        by_source = {}
+        for (source, page), text in sorted(pages.items()):
+            by_source.setdefault(source, []).append((page, text))
+
+        index = {}
+        for source, source_pages in by_source.items():
+            starts = []
+            for unit_id, keyword, _ in units:
+                label = re.compile(rf"^\s*0*{re.escape(unit_id.lstrip('0') or '0')}\s*-?\s*1\s*$")
+                heading = re.compile(rf"\b{keyword}\s+0*{re.escape(unit_id.lstrip('0') or '0')}\b", re.IGNORECASE)
+                for page, text in source_pages:
+                    lines = text.strip().splitlines()
+                    if lines and label.match(lines[0]) and heading.search(text[:200]):
+                        starts.append((page, unit_id))
+                        break
+            starts.sort()
+            unit_sections = {unit_id: sections for unit_id, _, sections in units}
+            entries = []
+            for position, (start, unit_id) in enumerate(starts):
+                stop = starts[position + 1][0] if position + 1 < len(starts) else float("inf")
+                chapter_pages = [(page, text.lower()) for page, text in source_pages if start <= page < stop]
+                sections, first_page = [], start
+                for number, title in enumerate(unit_sections[unit_id], start=1):
+                    pattern = heading_pattern(number, title)
+                    for page, text in chapter_pages:
+                        if page >= first_page and pattern.search(text):
+                            sections.append((page, title))
+                            first_page = page
+                            break
+                entries.append((start, unit_id, sections))
+            if entries:
+                index[source] = entries
+        return cls(index)
+
+    def lookup(self, source: str, page: int) -> tuple:
+        """
+        Purpose: Find the chapter and section of a page
+        Input: source: PDF path as stored in chunk metadata, page: Zero-based page number
+        Output: Tuple of (chapter, section); either can be None
+        """
+        entries = self.units.get(source)
+        if not entries:
+            return None, None
+        position = bisect.bisect_right([start for start, _, _ in entries], page) - 1
+        if position < 0:
+            return None, None
+        _, chapter, sections = entries[position]
+        section_position = bisect.bisect_right([start for start, _ in sections], page) - 1
+        return chapter, sections[section_position][1] if section_position >= 0 else None
@@ -1,4 +1,6 @@
 import os
+import ntpath
+from urllib.parse import quote
 
 def get_citations(docs):
     """
@@ -8,22 +10,33 @@ def get_citations(docs):
     # Processing: Filters documents with valid page numbers and creates citation entries
     """
     citations = [
-        {'page': doc.metadata.get('page', 'Unknown page') + 1, 'text': ''}  # No text
+        {'page': doc.metadata.get('page', 'Unknown page') + 1, 'text': '', 'file': citation_file(doc)}  # No text
         for doc in docs
         if isinstance(doc.metadata.get('page'), int)
     ][:1]
     return citations if citations else []
 
+def citation_file(doc):
+    """
+    # Purpose: Find the PDF a document was cut from
+    # Input: Document object with metadata
+    # Output: Path of the PDF under the corpus the document is served from (its shard, or CORPUS_SOURCE)
+    """
+    corpus_path = doc.metadata.get('corpus_path') or os.getenv('CORPUS_SOURCE')
+    source = doc.metadata.get('source')
+    # ntpath splits on both separators (some indexes were built on Windows)
+    return f"{corpus_path}/{ntpath.basename(source) if source else 'textbook.pdf'}"
+
 def format_citations(citations):
     """
     # Purpose: Format citations as HTML links
-    # Input: List of citation dictionaries containing page numbers
+    # Input: List of citation dictionaries containing page numbers and PDF paths
     # Output: HTML string with formatted citation links
-    # Processing: Generates clickable PDF links for each citation
+    # Processing: Generates clickable PDF links for each citation; the path is URL-encoded so spaces, "&", "#"
+    #             or "+" in a file name cannot break the query parameters
     """
-    pdf_path = f"{os.getenv('CORPUS_SOURCE')}/textbook.pdf"
     links = [
-        f'<a href="/team3/?view=pdf&file={pdf_path}&page={citation["page"]}" target="_blank">[{index + 1}]</a>'
+        f'<a href="/team3/?view=pdf&file={quote(citation["file"], safe="/")}&page={citation["page"]}" target="_blank">[{index + 1}]</a>'
         for index, citation in enumerate(citations)
     ]
     return "\n\nSource: " + "".join(links)
@@ -0,0 +1,157 @@
+import os
+import re
+import json
+import shutil
+import numpy as np
+
+SENTENCE_DIRECTORY = "sentences"
+# Extractive compression of the LLM context (off by default: the sentence index costs one embedding per sentence)
+CONTEXT_COMPRESSION = os.getenv("CONTEXT_COMPRESSION", "0") == "1"
+# Share of each passage's characters kept, taking the sentences most similar to the query first
+COMPRESSION_KEEP_RATIO = float(os.getenv("COMPRESSION_KEEP_RATIO", 0.5))
+MIN_SENTENCE_CHARS = 30  # Shorter fragments (headings, list numbers) are joined to the next sentence
+SENTENCE_PATTERN = re.compile(r"\S.*?(?:[.!?](?=\s)|$)", re.DOTALL)
+GAP_MARKER = " ... "
+
+def split_sentences(text: str) -> list:
+    """
+    Purpose: Split a passage into sentences
+    Input: text: Passage text
+    Output: List of (start, end) character spans covering the sentences in order
+    """
+    spans = []
+    pending_start = None
+    for match in SENTENCE_PATTERN.finditer(text):
+        start = match.start() if pending_start is None else pending_start
+        if match.end() - start < MIN_SENTENCE_CHARS:
+            pending_start = start
+            continue
+        spans.append((start, match.end()))
+        pending_start = None
+    if pending_start is not None:
+        if spans:
+            spans[-1] = (spans[-1][0], len(text.rstrip()))
+        else:
+            spans.append((pending_start, len(text.rstrip())))
+    return spans
+
+class SentenceIndex:
+    """
+    Purpose: Precomputed sentence embeddings of every context unit (parent window, or chunk)
+    Processing:
+        - Sentence spans and embeddings of all units are stored in one float16 matrix, sliced per unit by offsets
+        - Embeddings are L2-normalized at build time, so query time is one small matmul per passage
+        - Arrays are memory-mapped on load
+    """
+
+    def __init__(self, offsets, spans, embeddings, fingerprint: str = None):
+        self.offsets = offsets
+        self.spans = spans
+        self.embeddings = embeddings
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, texts: list, embed_fn, fingerprint: str = None, batch_size: int = 256) -> "SentenceIndex":
+        """
+        Purpose: Split and embed the sentences of every unit
+        Input:
+            - texts: Unit texts in unit order
+            - embed_fn: Callable embedding a list of texts (eg: EMBEDDING_FUNCTION.embed_documents)
+            - fingerprint: Value identifying the texts and model
+            - batch_size: Sentences embedded per call
+        Output: SentenceIndex
+        """
+        spans, sentences, offsets = [], [], [0]
+        for text in texts:
+            unit_spans = split_sentences(text)
+            spans.extend(unit_spans)
+            sentences.extend(text[start:end] for start, end in unit_spans)
+            offsets.append(len(spans))
+        vectors = []
+        for start in range(0, len(sentences), batch_size):
+            vectors.extend(embed_fn(sentences[start:start + batch_size]))
+        embeddings = np.asarray(vectors, dtype=np.float32).reshape(len(sentences), -1)
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return cls(
+            np.asarray(offsets, dtype=np.int64),
+            np.asarray(spans, dtype=np.int32).reshape(-1, 2),
+            embeddings.astype(np.float16),
+            fingerprint
+        )
+
+    def save(self, path: str) -> None:
+        """Write the index to path (replaced atomically)."""
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        with open(os.path.join(tmp_path, "meta.json"), 'w') as f:
+            json.dump({"fingerprint": self.fingerprint, "sentences": len(self.spans)}, f)
+        np.save(os.path.join(tmp_path, "offsets.npy"), self.offsets)
+        np.save(os.path.join(tmp_path, "spans.npy"), self.spans)
+        np.save(os.path.join(tmp_path, "embeddings.npy"), self.embeddings)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SentenceIndex":
+        """Memory-map an index written by save()."""
+        with open(os.path.join(path, "meta.json"), 'r') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in ("offsets", "spans", "embeddings")}
+        return cls(fingerprint=meta["fingerprint"], **arrays)
+
+    def compress(self, unit: int, text: str, query_vector: np.ndarray, keep_ratio: float = COMPRESSION_KEEP_RATIO) -> str:
+        """
+        Purpose: Keep the sentences of a unit most similar to the query
+        Input:
+            - unit: Unit number the text belongs to
+            - text: Unit text the spans refer to
+            - query_vector: L2-normalized float32 query embedding
+            - keep_ratio: Share of the unit's characters to keep
+        Output: Kept sentences in their original order, gaps marked with " ... "
+        Processing: Sentences are taken best first until keep_ratio of the characters is reached (at least one)
+        """
+        start, end = int(self.offsets[unit]), int(self.offsets[unit + 1])
+        if end - start <= 1:
+            return text
+        spans = np.asarray(self.spans[start:end])
+        scores = np.asarray(self.embeddings[start:end], dtype=np.float32) @ query_vector
+        lengths = spans[:, 1] - spans[:, 0]
+        budget, kept, total = keep_ratio * lengths.sum(), [], 0
+        for sentence in np.argsort(-scores):
+            if kept and total + lengths[sentence] > budget:
+                continue
+            kept.append(int(sentence))
+            total += lengths[sentence]
+        pieces, previous = [], None
+        for sentence in sorted(kept):
+            if previous is not None:
+                pieces.append(" " if sentence == previous + 1 else GAP_MARKER)
+            pieces.append(text[spans[sentence, 0]:spans[sentence, 1]])
+            previous = sentence
+        return "".join(pieces)
+
+def load_or_create_sentence_index(texts_fn, persist_directory: str, embed_fn, fingerprint: str) -> SentenceIndex:
+    """
+    Purpose: Load the persisted sentence index or build it from the served context units
+    Input:
+        - texts_fn: Callable returning the unit texts (parent windows, or chunks in row order; only called on build)
+        - persist_directory: Directory holding faiss_indexes (the index is stored next to the collection)
+        - embed_fn: Callable embedding a list of texts
+        - fingerprint: Identifies the snapshot and embedding model the units come from
+    Output: SentenceIndex
+    Processing: Only meta.json is read to check the fingerprint, so an up-to-date index is memory-mapped
+                without reading or hashing the corpus
+    """
+    index_path = os.path.join(persist_directory, SENTENCE_DIRECTORY)
+    if os.path.exists(index_path):
+        sentence_index = SentenceIndex.load(index_path)
+        if sentence_index.fingerprint == fingerprint:
+            print(f"Loaded sentence index from {index_path}...\n")
+            return sentence_index
+        print(f"Sentence index at {index_path} is stale, rebuilding...\n")
+    else:
+        print(f"Creating sentence index in {index_path}...\n")
+    sentence_index = SentenceIndex.build(texts_fn(), embed_fn, fingerprint)
+    sentence_index.save(index_path)
+    return sentence_index
@@ -0,0 +1,106 @@
+import os
+from functools import lru_cache
+from typing import Hashable, List, NamedTuple, Optional, Tuple
+import tiktoken
+
+# Token budget of the retrieved context handed to the LLM
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1200))
+# Encoding of the text splitter (RecursiveCharacterTextSplitter.from_tiktoken_encoder defaults to gpt2)
+TOKEN_ENCODING = "gpt2"
+MIN_MERGE_OVERLAP = 8  # Shortest overlap (chars) treated as splitter overlap rather than coincidence
+MAX_MERGE_OVERLAP = 2000
+
+class Passage(NamedTuple):
+    """A retrieved text and where it sits in its corpus, so neighbouring passages can be merged."""
+    text: str
+    group: Hashable  # Passages can only be merged within a group (same store and source)
+    position: Optional[int] = None  # Order within the group; consecutive positions are adjacent text
+
+@lru_cache(maxsize=None)
+def get_encoding():
+    """Return the tiktoken encoding (loaded once per process)."""
+    return tiktoken.get_encoding(TOKEN_ENCODING)
+
+def count_tokens(text: str) -> int:
+    """Return the number of tokens of text with the splitter's encoding."""
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Return the first max_tokens tokens of text."""
+    tokens = get_encoding().encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else get_encoding().decode(tokens[:max_tokens])
+
+def overlap_length(first: str, second: str) -> int:
+    """Return the length of the longest prefix of second that ends first (0 if shorter than MIN_MERGE_OVERLAP)."""
+    for size in range(min(len(first), len(second), MAX_MERGE_OVERLAP), MIN_MERGE_OVERLAP - 1, -1):
+        if first.endswith(second[:size]):
+            return size
+    return 0
+
+def merge_chunk_texts(texts: list) -> str:
+    """
+    Purpose: Join consecutive chunks back into running text
+    Input: texts: Chunk texts in document order
+    Output: Text with the splitter overlap between neighbouring chunks removed (a newline where there is none)
+    """
+    merged = texts[0]
+    for text in texts[1:]:
+        overlap = overlap_length(merged, text)
+        merged = merged + text[overlap:] if overlap else f"{merged}\n{text}"
+    return merged
+
+def build_context(passages: List[Passage], budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[str, List[int], int]:
+    """
+    Purpose: Assemble the LLM context from retrieved passages within a token budget
+    Input:
+        - passages: Passages in score order (best first)
+        - budget: Maximum number of context tokens
+    Output: Tuple of (context, indexes of the passages it uses, context token count)
+    Processing:
+        1. Walks the passages in score order; a passage already in the context (same window, or contained in a
+           selected text) is used for free, others are added while their tokens fit the budget
+        2. The best passage is always used, truncated to the budget if it is longer
+        3. Selected passages of one group are sorted by position; adjacent ones (consecutive positions, or texts
+           overlapping by the splitter overlap) are merged so repeated text is sent once
+        4. Groups are joined with blank lines in the order of their best passage
+    """
+    selected, used, total = [], [], 0
+    for index, passage in enumerate(passages):
+        if any(
+            (passage.position is not None and (passage.group, passage.position) == (chosen.group, chosen.position))
+            or passage.text in chosen.text
+            for chosen in selected
+        ):
+            used.append(index)
+            continue
+        tokens = count_tokens(passage.text)
+        if total + tokens > budget:
+            if selected:
+                continue
+            passage = passage._replace(text=truncate_tokens(passage.text, budget))
+            tokens = budget
+        selected.append(passage)
+        used.append(index)
+        total += tokens
+
+    groups = {}
+    for passage in selected:
+        groups.setdefault(passage.group, []).append(passage)
+    blocks = []
+    for group in groups.values():
+        if all(passage.position is not None for passage in group):
+            group.sort(key=lambda passage: passage.position)
+        merged = [group[0]]
+        for passage in group[1:]:
+            previous = merged[-1]
+            adjacent = previous.position is not None and passage.position == previous.position + 1
+            if adjacent or overlap_length(previous.text, passage.text):
+                merged[-1] = previous._replace(text=merge_chunk_texts([previous.text, passage.text]), position=passage.position)
+            elif previous.position is None and overlap_length(passage.text, previous.text):
+                # Unpositioned chunks keep score order, so the later one in the text may come first
+                merged[-1] = previous._replace(text=merge_chunk_texts([passage.text, previous.text]))
+            else:
+                merged.append(passage)
+        blocks.extend(passage.text for passage in merged)
+    context = "\n\n".join(blocks)
+    return context, used, count_tokens(context)
@@ -0,0 +1,98 @@
+import os
+import hashlib
+import numpy as np
+from .lexical import tokenize
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+# Chunks whose SimHashes differ in at most this many bits are near-duplicates (-1 disables deduplication)
+DEDUP_MAX_DISTANCE = int(os.getenv("CHUNK_DEDUP_DISTANCE", 3))
+
+def dedup_settings() -> dict:
+    """Return the dedup parameters recorded in the index settings, or None when deduplication is off."""
+    if DEDUP_MAX_DISTANCE < 0:
+        return None
+    return {"method": "simhash", "bits": SIMHASH_BITS, "shingle": SHINGLE_SIZE, "max_distance": DEDUP_MAX_DISTANCE}
+
+def simhash(text: str) -> int:
+    """
+    Purpose: Compute a 64-bit SimHash of a chunk
+    Input: text: Chunk text
+    Output: Fingerprint as an int; similar texts get fingerprints that differ in few bits
+    Processing:
+        1. Tokenizes like the lexical index and hashes every 3-word shingle (the whole text if shorter)
+        2. Each bit of the fingerprint is the majority vote of that bit over the shingle hashes
+    """
+    terms = tokenize(text)
+    if not terms:
+        return 0
+    shingles = {" ".join(terms[i:i + SHINGLE_SIZE]) for i in range(max(1, len(terms) - SHINGLE_SIZE + 1))}
+    digests = b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(len(shingles), 8), axis=1)
+    votes = bits.sum(axis=0) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(votes).tobytes(), "big")
+
+class SimHashIndex:
+    """
+    Purpose: Find a stored chunk whose SimHash is within max_distance bits of a new one
+    Processing:
+        - Fingerprints are split into max_distance + 1 bands; two fingerprints within max_distance bits
+          agree exactly on at least one band, so only chunks sharing a band are compared
+        - Chunks can be removed again when their page changes
+    """
+
+    def __init__(self, max_distance: int = DEDUP_MAX_DISTANCE):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        widths = [SIMHASH_BITS // bands + (band < SIMHASH_BITS % bands) for band in range(bands)]
+        self.bands = [(sum(widths[:band]), width) for band, width in enumerate(widths)]
+        self.tables = [{} for _ in self.bands]
+        self.hashes = {}
+
+    def _keys(self, fingerprint: int) -> list:
+        return [(fingerprint >> shift) & ((1 << width) - 1) for shift, width in self.bands]
+
+    def add(self, chunk_id: str, fingerprint: int) -> None:
+        """Store the fingerprint of a kept chunk."""
+        self.hashes[chunk_id] = fingerprint
+        for table, key in zip(self.tables, self._keys(fingerprint)):
+            table.setdefault(key, set()).add(chunk_id)
+
+    def remove(self, chunk_id: str) -> None:
+        """Forget a chunk (no-op if it is unknown)."""
+        fingerprint = self.hashes.pop(chunk_id, None)
+        if fingerprint is None:
+            return
+        for table, key in zip(self.tables, self._keys(fingerprint)):
+            table[key].discard(chunk_id)
+            if not table[key]:
+                del table[key]
+
+    def find(self, fingerprint: int) -> str:
+        """Return the id of a stored near-duplicate of fingerprint, or None."""
+        for table, key in zip(self.tables, self._keys(fingerprint)):
+            for chunk_id in table.get(key, ()):
+                if bin(self.hashes[chunk_id] ^ fingerprint).count("1") <= self.max_distance:
+                    return chunk_id
+        return None
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+def dedup_chunks(chunks: list, max_distance: int = DEDUP_MAX_DISTANCE) -> list:
+    """
+    Purpose: Drop chunks that are near-duplicates of an earlier chunk
+    Input:
+        - chunks: Document chunks in corpus order
+        - max_distance: SimHash distance threshold (-1 keeps every chunk)
+    Output: Chunks that were kept, in order (the first occurrence of repeated text wins)
+    """
+    if max_distance < 0:
+        return chunks
+    index, kept = SimHashIndex(max_distance), []
+    for position, chunk in enumerate(chunks):
+        fingerprint = simhash(chunk.page_content)
+        if index.find(fingerprint) is None:
+            index.add(position, fingerprint)
+            kept.append(chunk)
+    return kept
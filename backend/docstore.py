@@ -0,0 +1,216 @@
+import os
+import json
+import mmap
+import shutil
+from types import MappingProxyType
+from collections.abc import Mapping
+import numpy as np
+from pydantic import ConfigDict
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+
+class FrozenDocument(Document):
+    """Document whose fields cannot be reassigned once it is served."""
+    model_config = ConfigDict(frozen=True)
+
+class ReadOnlyDocstore(Docstore):
+    """
+    Purpose: Immutable docstore shared by every search thread
+    Processing:
+        - Documents are stored as FrozenDocument objects behind a read-only mapping
+        - Searches return the shared objects directly, so no copies or locks are needed
+        - Optional parent windows are indexed by the "parent" metadata of each chunk
+    """
+
+    def __init__(self, documents: dict, parents: list = None):
+        self.parents = tuple(parents) if parents is not None else None
+        self._dict = MappingProxyType({
+            doc_id: doc if isinstance(doc, FrozenDocument) else FrozenDocument(
+                id=doc.id, page_content=doc.page_content, metadata=doc.metadata
+            )
+            for doc_id, doc in documents.items()
+        })
+
+    def search(self, search: str):
+        """Return the document stored under search, or an error string if missing."""
+        return self._dict.get(search, f"ID {search} not found.")
+
+    def add(self, texts: dict) -> None:
+        raise TypeError("ReadOnlyDocstore does not support add")
+
+    def delete(self, ids: list) -> None:
+        raise TypeError("ReadOnlyDocstore does not support delete")
+
+    def __len__(self) -> int:
+        return len(self._dict)
+
+COLUMNAR_VERSION = 1
+MISSING_INT = np.iinfo(np.int64).min
+
+class StringColumn(Mapping):
+    """
+    Purpose: Read-only row -> string mapping over a UTF-8 blob and an offsets array
+    Processing: Strings are decoded on access; nothing is materialized at load time
+    """
+
+    def __init__(self, blob, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __getitem__(self, row: int) -> str:
+        if not 0 <= row < len(self):
+            raise KeyError(row)
+        return self.blob[int(self.offsets[row]):int(self.offsets[row + 1])].decode("utf-8")
+
+    def __iter__(self):
+        return iter(range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @staticmethod
+    def write(path: str, name: str, values: list) -> None:
+        """Write values as <name>.bin and <name>_offsets.npy."""
+        encoded = [value.encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        with open(os.path.join(path, f"{name}.bin"), 'wb') as f:
+            f.write(b"".join(encoded))
+        np.save(os.path.join(path, f"{name}_offsets.npy"), offsets)
+
+    @classmethod
+    def load(cls, path: str, name: str) -> "StringColumn":
+        """Memory-map a column written by write()."""
+        with open(os.path.join(path, f"{name}.bin"), 'rb') as f:
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        return cls(blob, np.load(os.path.join(path, f"{name}_offsets.npy"), mmap_mode='r'))
+
+class ColumnarDocstore(Docstore):
+    """
+    Purpose: Compact read-only docstore stored as columns next to the FAISS index
+    Processing:
+        - Chunk texts and ids are UTF-8 blobs with offset arrays; metadata keys are columns
+        - Integer metadata (page) is an int64 array; other values (source, flags) are int32 codes
+          into a small table of JSON-encoded values
+        - Every file is memory-mapped; a Document is only built for the rows a search returns
+        - Optional parent windows are a third string column, indexed by the "parent" metadata column
+    """
+
+    def __init__(self, ids: StringColumn, texts: StringColumn, columns: dict, parents: StringColumn = None):
+        self.ids = ids
+        self.texts = texts
+        self.columns = columns
+        self.parents = parents
+        self._rows = None
+        self._selections = {}
+
+    @staticmethod
+    def write(path: str, ids: list, documents: list, source_stat: list = None, parents: list = None) -> None:
+        """
+        Purpose: Persist documents in row order
+        Input:
+            - path: Target directory (replaced atomically)
+            - ids: Docstore id of each row
+            - documents: Document of each row
+            - source_stat: Optional [size, mtime_ns] of the file the columns were built from
+            - parents: Optional parent window texts the "parent" metadata points into
+        """
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        StringColumn.write(tmp_path, "ids", [str(doc_id) for doc_id in ids])
+        StringColumn.write(tmp_path, "texts", [doc.page_content for doc in documents])
+        if parents is not None:
+            StringColumn.write(tmp_path, "parents", parents)
+        columns = {}
+        for key in dict.fromkeys(key for doc in documents for key in doc.metadata):
+            values = [doc.metadata.get(key) for doc in documents]
+            if all(type(value) is int or value is None for value in values):
+                array = np.array([MISSING_INT if value is None else value for value in values], dtype=np.int64)
+                columns[key] = {"kind": "int"}
+            else:
+                table = {}
+                codes = [-1 if key not in doc.metadata else table.setdefault(json.dumps(doc.metadata[key]), len(table)) for doc in documents]
+                array = np.array(codes, dtype=np.int32)
+                columns[key] = {"kind": "value", "values": list(table)}
+            columns[key]["file"] = f"meta_{len(columns) - 1}.npy"
+            np.save(os.path.join(tmp_path, columns[key]["file"]), array)
+        with open(os.path.join(tmp_path, "columns.json"), 'w') as f:
+            json.dump({
+                "version": COLUMNAR_VERSION,
+                "rows": len(ids),
+                "source_stat": source_stat,
+                "columns": columns,
+                "parents": None if parents is None else len(parents)
+            }, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, source_stat: list = None) -> "ColumnarDocstore":
+        """
+        Purpose: Memory-map a docstore written by write()
+        Input:
+            - path: Directory written by write()
+            - source_stat: When given, the docstore is only returned if it was built from a file with this stat
+        Output: ColumnarDocstore, or None if missing, of another version or stale
+        """
+        try:
+            with open(os.path.join(path, "columns.json"), 'r') as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        if meta.get("version") != COLUMNAR_VERSION or (source_stat is not None and meta.get("source_stat") != source_stat):
+            return None
+        columns = {}
+        for key, column in meta["columns"].items():
+            array = np.load(os.path.join(path, column["file"]), mmap_mode='r')
+            values = [json.loads(value) for value in column["values"]] if column["kind"] == "value" else None
+            columns[key] = (array, values)
+        parents = StringColumn.load(path, "parents") if meta.get("parents") is not None else None
+        return cls(StringColumn.load(path, "ids"), StringColumn.load(path, "texts"), columns, parents)
+
+    def document(self, row: int) -> FrozenDocument:
+        """Build the Document stored at a row."""
+        metadata = {}
+        for key, (array, values) in self.columns.items():
+            value = array[row]
+            if values is None:
+                if value != MISSING_INT:
+                    metadata[key] = int(value)
+            elif value >= 0:
+                metadata[key] = values[value]
+        return FrozenDocument(id=self.ids[row], page_content=self.texts[row], metadata=metadata)
+
+    def rows_where(self, key: str, value) -> np.ndarray:
+        """Return the rows whose metadata[key] equals value, as a sorted int64 array (cached)."""
+        if (key, value) not in self._selections:
+            array, values = self.columns.get(key, (None, None))
+            if array is None:
+                rows = np.zeros(0, dtype=np.int64)
+            elif values is None:
+                rows = np.flatnonzero(array == value)
+            else:
+                rows = np.flatnonzero(array == values.index(value)) if value in values else np.zeros(0, dtype=np.int64)
+            self._selections[(key, value)] = rows.astype(np.int64)
+        return self._selections[(key, value)]
+
+    def row_of(self, doc_id: str) -> int:
+        """Return the row of a docstore id, or None if missing (builds an id index on first use)."""
+        if self._rows is None:
+            self._rows = {doc_id: row for row, doc_id in self.ids.items()}
+        return self._rows.get(doc_id)
+
+    def search(self, search: str):
+        """Return the document stored under an id, or an error string if missing."""
+        row = self.row_of(search)
+        return f"ID {search} not found." if row is None else self.document(row)
+
+    def add(self, texts: dict) -> None:
+        raise TypeError("ColumnarDocstore does not support add")
+
+    def delete(self, ids: list) -> None:
+        raise TypeError("ColumnarDocstore does not support delete")
+
+    def __len__(self) -> int:
+        return len(self.ids)
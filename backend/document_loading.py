@@ -1,85 +1,252 @@
 import os
-import re
 import json
+import hashlib
 import numpy as np
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.retrievers import BM25Retriever
 from langchain.retrievers import EnsembleRetriever
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFDirectoryLoader
+from langchain_core.documents import Document
+from .query_cache import QueryContext, store_token
+from .intents import get_intent_matcher
+from .docstore import ReadOnlyDocstore, ColumnarDocstore
+from .pdf_parsing import clean_text
+from .lexical import LexicalIndex, load_or_create_lexical_index, reciprocal_rank_fusion
+from .context import Passage, merge_chunk_texts
+from .compression import SentenceIndex, load_or_create_sentence_index
+from .embeddings import EMBEDDING_MODEL_NAME, get_embedding_engine
+from .chapters import CONTENTS_PATH, ChapterIndex, contents_digest, find_chapter, load_contents
+from . import faiss_indexes
 
-EMBEDDING_MODEL_NAME = "Alibaba-NLP/gte-large-en-v1.5"  # Embedding model (https://huggingface.co/Alibaba-NLP/gte-large-en-v1.5)
-model_kwargs = {'trust_remote_code': True}
-EMBEDDING_FUNCTION = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME, model_kwargs=model_kwargs)
+EMBEDDING_FUNCTION = get_embedding_engine()  # Backend selected by EMBEDDING_BACKEND
+MIN_LEXICAL_COVERAGE = float(os.getenv("MIN_LEXICAL_COVERAGE", 1.0))  # Fraction of query terms a lexical hit must contain
+DOCSTORE_DIRECTORY = "docstore"  # Columnar docstore inside each collection directory
+# Small-to-big retrieval: chunks are searched, windows of this many neighbouring chunks are returned (1 disables)
+PARENT_WINDOW_CHUNKS = int(os.getenv("PARENT_WINDOW_CHUNKS", 3))
 
-def load_documents_from_directory(
-	document_path: str, 
-	chunk_size: int = 200, 
-	chunk_overlap: int = 50
-):
+def load_faiss_index(index_path: str, writable: bool = False, contents: dict = None) -> FAISS:
+	"""
+	Purpose: Load a saved FAISS collection, preferring the columnar docstore over the pickle
+	Input:
+		- index_path: Collection directory
+		- writable: Load the pickled docstore because the caller will add or delete chunks
+		- contents: Table of contents the chunks are annotated with (None for no chapter annotations)
+	Output: FAISS vector store
+	Processing: When docstore/ was built from the current index.pkl and contents, the pickle is never opened
+	"""
+	if not writable:
+		docstore = ColumnarDocstore.load(os.path.join(index_path, DOCSTORE_DIRECTORY), docstore_key(index_path, contents))
+		if docstore is not None:
+			return FAISS(
+				embedding_function=EMBEDDING_FUNCTION,
+				index=faiss_indexes.read_index(os.path.join(index_path, "index.faiss")),
+				docstore=docstore,
+				index_to_docstore_id=docstore.ids
+			)
+	return FAISS.load_local(index_path, embeddings=EMBEDDING_FUNCTION, allow_dangerous_deserialization=True)
+
+def docstore_key(index_path: str, contents: dict = None) -> list:
+	"""Return [size, mtime_ns, contents digest, parent window size] identifying what the columns were built from."""
+	stat = os.stat(os.path.join(index_path, "index.pkl"))
+	return [stat.st_size, stat.st_mtime_ns, contents_digest(contents), PARENT_WINDOW_CHUNKS]
+
+def save_faiss_vector_store(faiss_store: FAISS, index_path: str) -> None:
 	"""
-	Purpose: Load and split PDF documents from a directory into manageable chunks
+	Purpose: Save a FAISS vector store without ever exposing a partially written file
 	Input:
-		- document_path: Path to directory containing PDF files
-		- chunk_size: Size of each text chunk
-		- chunk_overlap: Number of characters to overlap between chunks
-	Output: List of document chunks, where each chunk is a Document object
+		- faiss_store: FAISS vector store to save
+		- index_path: Collection directory
+	Processing: Saves into a sibling directory and renames each file over the old one, so processes
+		that memory-map index.faiss keep reading the old inode until they reload
+	"""
+	tmp_path = f"{index_path}.tmp"
+	faiss_store.save_local(tmp_path)
+	os.makedirs(index_path, exist_ok=True)
+	for name in ("index.faiss", "index.pkl"):
+		os.replace(os.path.join(tmp_path, name), os.path.join(index_path, name))
+	os.rmdir(tmp_path)
+
+def freeze_docstore(faiss_store: FAISS, index_path: str = None, contents: dict = None) -> None:
+	"""
+	Purpose: Make the served docstore read-only
+	Input:
+		- faiss_store: FAISS vector store to freeze in place
+		- index_path: Collection directory; when given, the docstore is also written in columnar form there
+		- contents: Table of contents; when given, every chunk is annotated with its chapter and section
+	Output: None
 	Processing:
-		1. Loads all PDF files from specified directory
-		2. Creates text splitter with tiktoken encoder
-		3. Splits documents into overlapping chunks
+		1. Leaves a columnar docstore (already read-only) untouched
+		2. Cleans chunks from indexes built before cleaning moved to ingestion
+		3. Annotates chunks with "chapter" and "section" from a page-range index of the contents
+		4. Groups neighbouring chunks into parent windows (see annotate_parents)
+		5. Replaces the docstore with a memory-mapped ColumnarDocstore, or a ReadOnlyDocstore of frozen documents
 	"""
-	print(f"Loading documents from {document_path}...")
-	# Load PDF documents from the specified directory
-	documents = PyPDFDirectoryLoader(document_path).load_and_split()
-	# Create a text splitter using tiktoken encoder
-	text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-	# Split the documents into chunks
-	return text_splitter.split_documents(documents)
+	if isinstance(faiss_store.docstore, ColumnarDocstore):
+		return
+	documents = {}
+	for doc_id, doc in faiss_store.docstore._dict.items():
+		if not doc.metadata.get("cleaned"):
+			doc = Document(
+				id=doc.id,
+				page_content=clean_text(doc.page_content),
+				metadata={**doc.metadata, "cleaned": True}
+			)
+		documents[doc_id] = doc
+	ids = [faiss_store.index_to_docstore_id[row] for row in range(faiss_store.index.ntotal)]
+	if contents is not None:
+		annotate_chapters(documents, ids, contents)
+	parents = annotate_parents(documents, ids, PARENT_WINDOW_CHUNKS) if PARENT_WINDOW_CHUNKS > 1 else None
+	if index_path is None:
+		faiss_store.docstore = ReadOnlyDocstore(documents, parents)
+		return
+	docstore_path = os.path.join(index_path, DOCSTORE_DIRECTORY)
+	ColumnarDocstore.write(docstore_path, ids, [documents[doc_id] for doc_id in ids], docstore_key(index_path, contents), parents)
+	faiss_store.docstore = ColumnarDocstore.load(docstore_path)
+	faiss_store.index_to_docstore_id = faiss_store.docstore.ids
 
+def annotate_chapters(documents: dict, ids: list, contents: dict) -> None:
+	"""
+	Purpose: Add "chapter" and "section" metadata to every chunk
+	Input:
+		- documents: {doc_id: Document}, updated in place
+		- ids: Doc ids in FAISS row order (chunks of a page are consecutive)
+		- contents: Table of contents
+	Processing: Builds a ChapterIndex from the page texts, then looks up each chunk by (source, page)
+	"""
+	pages = {}
+	for doc_id in ids:
+		doc = documents[doc_id]
+		key = (doc.metadata.get("source"), doc.metadata.get("page"))
+		pages[key] = f"{pages[key]}\n{doc.page_content}" if key in pages else doc.page_content
+	chapter_index = ChapterIndex.build(contents, pages)
+	for doc_id in ids:
+		doc = documents[doc_id]
+		chapter, section = chapter_index.lookup(doc.metadata.get("source"), doc.metadata.get("page"))
+		metadata = {key: value for key, value in doc.metadata.items() if key not in ("chapter", "section")}
+		if chapter is not None:
+			metadata["chapter"] = chapter
+		if section is not None:
+			metadata["section"] = section
+		documents[doc_id] = Document(id=doc.id, page_content=doc.page_content, metadata=metadata)
 
-def load_or_create_faiss_vector_store(
-	documents: list,
-	persist_directory: str,
-	collection_name: str = "collection"
-) -> FAISS:
+def annotate_parents(documents: dict, ids: list, window_chunks: int) -> list:
 	"""
-	Purpose: Create or load a FAISS vector store for document embeddings
+	Purpose: Precompute the parent window returned to the LLM for each (small) indexed chunk
 	Input:
-		- documents: List of document chunks to be indexed
-		- persist_directory: Directory path to save/load the FAISS index
-		- collection_name: Name of the vector store collection
-	Output: FAISS vector store object containing document embeddings
+		- documents: {doc_id: Document}, updated in place with a "parent" metadata index
+		- ids: Doc ids in FAISS row order
+		- window_chunks: Maximum number of consecutive chunks per window
+	Output: List of parent window texts
 	Processing:
-		1. Checks if index exists at specified path
-		2. If exists: loads existing index
-		3. If not: creates new index from documents and saves it
-	"""
-	index_path = os.path.join(persist_directory, f'{collection_name}')
-	if os.path.exists(index_path):
-		# Load existing FAISS index
-		print(f"Loading existing FAISS vector store from {index_path}...\n")
-		faiss_store = FAISS.load_local(
-			index_path, 
-			embeddings=EMBEDDING_FUNCTION, 
-			allow_dangerous_deserialization=True
-		)
+		1. Orders chunks by source and page (rows of one page stay in split order)
+		2. Cuts them into runs of at most window_chunks chunks that never cross a section
+		   (or a page, when chunks carry no section)
+		3. Each window is the run's text with chunk overlaps removed; every chunk of the run points to it
+	"""
+	order = sorted(range(len(ids)), key=lambda row: (
+		str(documents[ids[row]].metadata.get("source")),
+		documents[ids[row]].metadata.get("page") or 0
+	))
+	windows, runs, previous_key = [], [], None
+	for row in order:
+		metadata = documents[ids[row]].metadata
+		if "section" in metadata:
+			key = (metadata.get("source"), metadata.get("chapter"), metadata["section"])
+		else:
+			key = (metadata.get("source"), metadata.get("page"))
+		if key != previous_key or len(runs[-1]) == window_chunks:
+			runs.append([])
+		runs[-1].append(row)
+		previous_key = key
+	for run in runs:
+		pages = {}
+		for row in run:
+			doc = documents[ids[row]]
+			pages.setdefault(doc.metadata.get("page"), []).append(doc.page_content)
+			documents[ids[row]] = Document(id=doc.id, page_content=doc.page_content, metadata={**doc.metadata, "parent": len(windows)})
+		windows.append("\n".join(merge_chunk_texts(texts) for texts in pages.values()))
+	return windows
+
+def parent_content(vector_store: FAISS, doc: Document) -> str:
+	"""
+	Purpose: Return the context window to hand the LLM for a retrieved chunk
+	Input: vector_store: FAISS vector store the chunk came from, doc: Retrieved chunk
+	Output: The chunk's precomputed parent window, or the chunk text when the index has none
+	"""
+	parents = getattr(vector_store.docstore, "parents", None)
+	if parents is None or "parent" not in doc.metadata:
+		return doc.page_content
+	return parents[doc.metadata["parent"]]
+
+def context_passage(vector_store: FAISS, doc: Document, sentence_index: SentenceIndex = None, query_vector: np.ndarray = None) -> Passage:
+	"""
+	Purpose: Describe a retrieved chunk for build_context
+	Input:
+		- vector_store: FAISS vector store the chunk came from
+		- doc: Retrieved chunk
+		- sentence_index: Optional sentence index of the store; with query_vector, the passage is compressed
+		- query_vector: L2-normalized query embedding
+	Output: Passage with the chunk's parent window; windows of one source are adjacent when their indexes are consecutive
+	"""
+	source = doc.metadata.get("source")
+	if getattr(vector_store.docstore, "parents", None) is None or "parent" not in doc.metadata:
+		passage = Passage(doc.page_content, (store_token(vector_store), source, doc.metadata.get("page")))
 	else:
-		# Create new FAISS index
-		print(f"Creating new FAISS vector store in {index_path}...\n")
-		faiss_store = FAISS.from_documents(
-			documents, 
-			embedding=EMBEDDING_FUNCTION
-		)
-		faiss_store.save_local(index_path)
-	return faiss_store
+		passage = Passage(parent_content(vector_store, doc), (store_token(vector_store), source), doc.metadata["parent"])
+	unit = context_unit(vector_store, doc)
+	if sentence_index is None or query_vector is None or unit is None:
+		return passage
+	return passage._replace(text=sentence_index.compress(unit, passage.text, query_vector))
+
+def context_unit(vector_store: FAISS, doc: Document) -> int:
+	"""
+	Purpose: Find the sentence index unit of a retrieved chunk
+	Input: vector_store: FAISS vector store the chunk came from, doc: Retrieved chunk
+	Output: Parent window index, chunk row when the index has no windows, or None (docstore without rows)
+	"""
+	if getattr(vector_store.docstore, "parents", None) is not None and "parent" in doc.metadata:
+		return doc.metadata["parent"]
+	if isinstance(vector_store.docstore, ColumnarDocstore) and vector_store.docstore.parents is None:
+		return vector_store.docstore.row_of(doc.id)
+	return None
+
+def chapter_rows(vector_store: FAISS, chapter: str) -> np.ndarray:
+	"""
+	Purpose: Find the FAISS rows of the chunks annotated with a chapter
+	Input: vector_store: FAISS vector store, chapter: Chapter id as in contents.json (eg: "03")
+	Output: Sorted array of rows, or None when no chunk carries that chapter (search everything instead)
+	"""
+	if isinstance(vector_store.docstore, ColumnarDocstore):
+		rows = vector_store.docstore.rows_where("chapter", chapter)
+	else:
+		rows = np.array([
+			row for row, doc_id in vector_store.index_to_docstore_id.items()
+			if vector_store.docstore.search(doc_id).metadata.get("chapter") == chapter
+		], dtype=np.int64)
+	return rows if len(rows) else None
+
+def question_chapter(question: str) -> str:
+	"""
+	Purpose: Find the chapter a question explicitly refers to, for chapter-scoped retrieval
+	Input: question: User query string
+	Output: Chapter id as in contents.json (eg: "03"), or None
+	Processing: Only "chapter N" and "chapter <number word>" count; a bare number word ("the two main types")
+	            does not scope retrieval
+	"""
+	contents = load_contents(CONTENTS_PATH)
+	if contents is None:
+		return None
+	chapter_num = find_chapter(question, contents, explicit=True)
+	chapters = {chapter["chapter"] for chapter in contents["chapters"]}
+	return chapter_num.zfill(2) if chapter_num and chapter_num.zfill(2) in chapters else None
 
 def similarity_search(
 	question: str,
 	vector_store: FAISS,
 	k: int,
-	distance_threshold: float = 400
+	distance_threshold: float = 400,
+	embedding: list = None,
+	query_context: QueryContext = None,
+	chapter: str = None
 ):
 	"""
 	Purpose: Find most similar documents to a given question
@@ -88,65 +255,254 @@ def similarity_search(
 		- vector_store: FAISS vector store containing document embeddings
 		- k: Number of similar documents to retrieve
 		- distance_threshold: Maximum distance score to include document
+		- embedding: Optional precomputed query embedding
+		- query_context: Optional per-request context that embeds once and caches hits
+		- chapter: Optional chapter id; only that chapter's chunks are searched (when annotated)
 	Output: List of tuples containing (Document, similarity_score)
 	Processing:
-		1. Performs similarity search using vector store
-		2. Filters results based on distance threshold
-		3. Returns filtered documents with their scores
+		1. Performs similarity search by vector when the embedding is known
+		2. Restricts the search to the chapter's rows with a FAISS ID selector
+		3. Filters results based on distance threshold
+		4. Returns filtered documents with their scores
 	"""
-	retrieved_docs = vector_store.similarity_search_with_score(question, k=k)
+	rows = chapter_rows(vector_store, chapter) if chapter else None
+	if query_context is not None:
+		with query_context.timer("dense"):
+			retrieved_docs = query_context.search(
+				question,
+				store_token(vector_store) if rows is None else (store_token(vector_store), "chapter", chapter),
+				k,
+				lambda vector: search_documents_by_vector(vector_store, vector, k, rows)
+			)
+	else:
+		if embedding is None:
+			embedding = EMBEDDING_FUNCTION.embed_query(question)
+		retrieved_docs = search_documents_by_vector(vector_store, embedding, k, rows)
 	filtered_docs = [[doc, score] for doc, score in retrieved_docs if score <= distance_threshold]
 	return filtered_docs
 
-def clean_text(text: str) -> str:
+def dense_search(vector_store: FAISS, embedding, k: int, rows: np.ndarray = None) -> list:
+	"""
+	Purpose: Search the FAISS index directly and return row ids instead of Documents
+	Input:
+		- vector_store: FAISS vector store
+		- embedding: Query embedding
+		- k: Number of rows to retrieve
+		- rows: Optional sorted array of rows the search is restricted to
+	Output: List of (row, distance) tuples, closest first
+	"""
+	vector = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+	if rows is None:
+		distances, rows = vector_store.index.search(vector, k)
+	else:
+		distances, rows = faiss_indexes.search_rows(vector_store.index, vector, k, rows)
+	return [(int(row), float(distance)) for row, distance in zip(rows[0], distances[0]) if row != -1]
+
+def search_documents_by_vector(vector_store: FAISS, embedding, k: int, rows: np.ndarray = None) -> list:
+	"""
+	Purpose: Search the FAISS index and build Documents for the hits only
+	Input:
+		- vector_store: FAISS vector store
+		- embedding: Query embedding
+		- k: Number of documents to retrieve
+		- rows: Optional sorted array of rows the search is restricted to
+	Output: List of (Document, distance) tuples, closest first
+	"""
+	return [(get_document(vector_store, row), distance) for row, distance in dense_search(vector_store, embedding, k, rows)]
+
+def get_document(vector_store: FAISS, row: int) -> Document:
 	"""
-	Purpose: Clean text by removing unwanted special characters
-	Input: text: String to be cleaned
-	Output: Cleaned string containing only alphanumeric chars and basic punctuation
-	Processing: Filters string to keep only allowed characters
+	Purpose: Look up the Document stored for a FAISS row
+	Input: vector_store: FAISS vector store, row: FAISS row id
+	Output: Document for that row
 	"""
-	return ''.join(char for char in text if char.isalpha() or char.isspace() or char.isnumeric() or char in '.,!?\'";:()')
+	if isinstance(vector_store.docstore, ColumnarDocstore):
+		return vector_store.docstore.document(row)
+	return vector_store.docstore.search(vector_store.index_to_docstore_id[row])
 
-def cosine_similarity(v1: list, v2: list) -> float:
+def hybrid_search(
+	question: str,
+	vector_store: FAISS,
+	lexical_index: LexicalIndex,
+	k: int,
+	distance_threshold: float = 400,
+	query_context: QueryContext = None,
+	fetch_k: int = 20,
+	min_lexical_coverage: float = MIN_LEXICAL_COVERAGE,
+	chapter: str = None
+):
 	"""
-	Purpose: Calculate cosine similarity between two vectors
-	Input: v1: First vector, v2: Second vector
-	Output: Cosine similarity score between 0 and 1
+	Purpose: Combine dense (FAISS) and lexical (BM25) retrieval with reciprocal rank fusion
+	Input:
+		- question: User query string
+		- vector_store: FAISS vector store containing document embeddings
+		- lexical_index: LexicalIndex whose rows line up with the FAISS index
+		- k: Number of fused documents to return
+		- distance_threshold: Maximum distance for dense candidates
+		- query_context: Per-request context (records per-stage latency)
+		- fetch_k: Number of candidates fetched from each retriever before fusion
+		- min_lexical_coverage: Fraction of the query terms a lexical candidate must contain
+		- chapter: Optional chapter id; both retrievers only consider that chapter's chunks
+	Output: List of [Document, distance] pairs in fused order
 	Processing:
-		1. Converts inputs to numpy arrays
-		2. Calculates dot product and magnitudes
-		3. Returns normalized similarity score
+		1. Fetches dense candidates within the distance threshold
+		2. Fetches lexical candidates that contain enough of the query terms
+		3. Fuses both rankings by reciprocal rank
+		4. Lexical-only hits are reported at the distance threshold, so they only win when no close dense hit exists
+	"""
+	if query_context is None:
+		query_context = QueryContext(EMBEDDING_FUNCTION)
+	rows = chapter_rows(vector_store, chapter) if chapter else None
+	with query_context.timer("dense"):
+		dense_hits = query_context.search(
+			question,
+			(store_token(vector_store), "rows", chapter if rows is not None else None),
+			fetch_k,
+			lambda vector: dense_search(vector_store, vector, fetch_k, rows)
+		)
+	dense_hits = [(row, distance) for row, distance in dense_hits if distance <= distance_threshold]
+	with query_context.timer("lexical"):
+		lexical_hits = lexical_index.search(question, fetch_k, min_lexical_coverage, rows)
+	with query_context.timer("fusion"):
+		fused = reciprocal_rank_fusion([[row for row, _ in dense_hits], [row for row, _ in lexical_hits]])
+		distances = dict(dense_hits)
+		results = [[get_document(vector_store, row), distances.get(row, distance_threshold)] for row, _ in fused[:k]]
+	return results
+
+def lexical_search(
+	question: str,
+	lexical_index: LexicalIndex,
+	documents: list,
+	k: int,
+	distance_threshold: float = 400,
+	query_context: QueryContext = None,
+	min_lexical_coverage: float = MIN_LEXICAL_COVERAGE
+):
+	"""
+	Purpose: BM25-only retrieval, used while no FAISS index is available yet
+	Input:
+		- question: User query string
+		- lexical_index: LexicalIndex whose rows line up with documents
+		- documents: Chunk Documents in row order
+		- k: Number of documents to return
+		- distance_threshold: Distance reported for every hit
+		- query_context: Per-request context (records stage latency)
+		- min_lexical_coverage: Fraction of the query terms a hit must contain
+	Output: List of [Document, distance] pairs, best BM25 score first
+	Processing: Hits are reported at the distance threshold, as lexical-only hits are in hybrid_search
+	"""
+	if query_context is None:
+		query_context = QueryContext(EMBEDDING_FUNCTION)
+	with query_context.timer("lexical"):
+		lexical_hits = lexical_index.search(question, k, min_lexical_coverage)
+	return [[documents[row], distance_threshold] for row, _ in lexical_hits]
+
+def load_lexical_index(faiss_store: FAISS, persist_directory: str) -> LexicalIndex:
+	"""
+	Purpose: Load or build the BM25 index stored next to the FAISS collection
+	Input:
+		- faiss_store: Served FAISS vector store (source of chunk texts on build)
+		- persist_directory: Directory holding the FAISS indexes
+	Output: LexicalIndex aligned with the FAISS rows
 	"""
-	v1, v2 = np.array(v1), np.array(v2)
-	return np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
+	num_docs = faiss_store.index.ntotal
+	return load_or_create_lexical_index(
+		lambda: [get_document(faiss_store, row).page_content for row in range(num_docs)],
+		persist_directory,
+		row_fingerprint(faiss_store)
+	)
 
-def get_tag(question: str) -> str:
+def sentence_index_key(faiss_store: FAISS, contents: dict = None) -> str:
+	"""Return what a sentence index must have been built from: snapshot id, contents, parent window size and model."""
+	return json.dumps([faiss_store.snapshot_id, contents_digest(contents), PARENT_WINDOW_CHUNKS, EMBEDDING_FUNCTION.model_name])
+
+def load_sentence_index(faiss_store: FAISS, persist_directory: str, contents: dict = None) -> SentenceIndex:
+	"""
+	Purpose: Load or build the sentence embeddings used to compress the context
+	Input:
+		- faiss_store: Synced FAISS vector store with a columnar docstore and a snapshot id
+		- persist_directory: Directory holding the FAISS indexes
+		- contents: Table of contents the docstore was annotated with
+	Output: SentenceIndex over the parent windows (or the chunks in row order when there are none), or None
+		when the docstore is not columnar
+	Processing: Keyed on the snapshot id (see sentence_index_key), so the sentences are only embedded when
+		ingestion produced a new snapshot
+	"""
+	docstore = faiss_store.docstore
+	if not isinstance(docstore, ColumnarDocstore):
+		return None
+	units = docstore.parents if docstore.parents is not None else docstore.texts
+	return load_or_create_sentence_index(
+		lambda: [units[unit] for unit in range(len(units))],
+		persist_directory,
+		EMBEDDING_FUNCTION.embed_documents,
+		sentence_index_key(faiss_store, contents)
+	)
+
+def row_fingerprint(faiss_store: FAISS) -> str:
+	"""
+	Purpose: Hash the FAISS row order so derived indexes can detect that they are stale
+	Input: faiss_store: FAISS vector store
+	Output: Hex SHA-256 digest of the docstore ids in row order
+	"""
+	row_ids = "\n".join(str(faiss_store.index_to_docstore_id[row]) for row in range(faiss_store.index.ntotal))
+	return hashlib.sha256(row_ids.encode("utf-8")).hexdigest()
+
+def load_serving_index(
+	faiss_store: FAISS,
+	persist_directory: str,
+	collection_name: str = "collection",
+	config: dict = None
+) -> dict:
+	"""
+	Purpose: Swap the flat index of a FAISS store for the configured serving index (HNSW / IVF-Flat / IVF-PQ)
+	Input:
+		- faiss_store: FAISS vector store holding the flat index
+		- persist_directory: Directory holding the FAISS indexes
+		- collection_name: Name of the vector store collection
+		- config: Index config (defaults to FAISS_INDEX_TYPE / FAISS_INDEX_PARAMS)
+	Output: Index metadata (type, parameters, build time)
+	Processing:
+		1. A flat config leaves the store untouched
+		2. Otherwise the serving index is loaded, or built from the flat vectors when stale
+		3. Rows are added in flat order, so index_to_docstore_id and the lexical index stay aligned
+		4. With FAISS_MMAP=1 the served index (flat or derived) is memory-mapped read-only
+	"""
+	config = config or faiss_indexes.index_config_from_env()
+	index_path = os.path.join(persist_directory, collection_name)
+	if config["type"] == "flat":
+		if faiss_indexes.FAISS_MMAP:
+			faiss_store.index = faiss_indexes.read_index(os.path.join(index_path, "index.faiss"))
+		return {"config": config, "params": config, "ntotal": faiss_store.index.ntotal, "mmap": faiss_indexes.FAISS_MMAP}
+	flat_index = faiss_store.index
+	index, meta = faiss_indexes.load_serving_index(
+		index_path,
+		lambda: flat_index.reconstruct_n(0, flat_index.ntotal),
+		row_fingerprint(faiss_store),
+		config
+	)
+	faiss_store.index = index
+	return {**meta, "mmap": faiss_indexes.FAISS_MMAP}
+
+def get_tag(question: str, embedding: list = None) -> str:
   """
 	Purpose: Find the most similar predefined tag for a given question
-	Input: question: User query string
+	Input:
+		- question: User query string
+		- embedding: Optional precomputed query embedding
 	Output: Matching tag string or None if no match found
 	Processing:
-		1. Loads predefined questions from JSON
-		2. Embeds input question
-		3. Calculates similarity with stored questions
+		1. Gets the cached, pre-normalized intent matrix
+		2. Embeds input question (unless an embedding was passed in)
+		3. Scores every stored question with one matrix product
 		4. Returns tag of best match above threshold
   """
-  max_similarity = 0.70
-  best_match = None
-  QUESTIONS = None
   try:
-    with open(f"/app/data/swebok/common.json", 'r') as f:
-      QUESTIONS = json.load(f)
-    query_embedding = EMBEDDING_FUNCTION.embed_documents([question])[0]
-    for item in QUESTIONS:
-      similarity = cosine_similarity(query_embedding, item["embedding"])
-      # print(f'q: {item["question"]}, score: {similarity}')
-      if similarity > max_similarity:
-        max_similarity = similarity
-        best_match = item["tag"]
+    matcher = get_intent_matcher()
+    query_embedding = embedding if embedding is not None else EMBEDDING_FUNCTION.embed_documents([question])[0]
+    return matcher.match_embeddings(query_embedding)[0]
   except:
-    pass
-  return best_match
+    return None
 
 def get_content(tag: str, question: str) -> tuple[str, str]:
   """
@@ -165,7 +521,7 @@ def get_content(tag: str, question: str) -> tuple[str, str]:
 	"""
   CONTENTS = None
   try:
-    with open(f"/app/data/swebok/contents.json", 'r') as f:
+    with open(CONTENTS_PATH, 'r') as f:
       CONTENTS = json.load(f)
   except:
     return None, None
@@ -174,18 +530,8 @@ def get_content(tag: str, question: str) -> tuple[str, str]:
   elif tag == "title": return f"What is the title of this book? SWEBOK", CONTENTS["title"]
   elif tag == "author": return f"Who is the author? {CONTENTS['author']}", CONTENTS["author"]
   elif tag in ["chapter_title", "summary_chapter"]:
-    # Try to match numeric chapter
-    chapter_match = re.search(r'chapter\s*0?(\d+)', question.lower())
-    chapter_num = None
-    if chapter_match:
-      chapter_num = chapter_match.group(1)
-    else:
-      # Try to match word-based chapter
-      for chapter in CONTENTS["chapters"]:
-        word_pattern = rf"\b{chapter['chapter_number_text']}\b"
-        if re.search(word_pattern, question.lower()):
-          chapter_num = chapter["chapter"]
-          break
+    # Match a numeric ("chapter 3") or word-based ("chapter three") chapter
+    chapter_num = find_chapter(question, CONTENTS)
     if not chapter_num:
       return f"{question} is invalid", "The specified chapter does not exist. Select a chapter from 1 to 18"
 
@@ -214,22 +560,3 @@ def get_content(tag: str, question: str) -> tuple[str, str]:
       return question, context
   
   return None
-
-def match_question(question: str) -> str:
-  """
-	Purpose: Match user question to appropriate content
-	Input:
-		- question: User query string
-	Output:
-		- Tuple of (processed_question, content)
-		- Both elements can be None if no match found
-	Processing:
-		1. Gets tag for question
-		2. If tag found, retrieves corresponding content
-		3. Returns None, None if no match
-	"""
-  tag = get_tag(question)
-  if tag is not None:
-    return get_content(tag, question)
-  else:
-    return None, None
\ No newline at end of file
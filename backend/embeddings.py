@@ -0,0 +1,114 @@
+import os
+import re
+import hashlib
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL_NAME = "Alibaba-NLP/gte-large-en-v1.5"  # Embedding model (https://huggingface.co/Alibaba-NLP/gte-large-en-v1.5)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface")  # "huggingface", "quantized" or "hashing"
+model_kwargs = {'trust_remote_code': True}
+
+class HuggingFaceEngine(Embeddings):
+    """
+    Purpose: The reference fp32 PyTorch backend (HuggingFaceEmbeddings)
+    Processing: The model is only imported and loaded when this backend is selected
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME):
+        from langchain_huggingface import HuggingFaceEmbeddings
+        self.model_name = model_name
+        self.model = HuggingFaceEmbeddings(model_name=model_name, model_kwargs=model_kwargs)
+
+    def embed_documents(self, texts: list) -> list:
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        return self.model.embed_query(text)
+
+class QuantizedEngine(Embeddings):
+    """
+    Purpose: CPU backend with int8 dynamically-quantized Linear layers
+    Processing:
+        - Loads the same sentence-transformers model and quantizes it with torch.quantization.quantize_dynamic
+        - Vectors live in the same space as the fp32 model (verify with parity_report before serving)
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, batch_size: int = 32):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.batch_size = batch_size
+        model = SentenceTransformer(model_name, device="cpu", **model_kwargs)
+        self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def embed_documents(self, texts: list) -> list:
+        texts = [text.replace("\n", " ") for text in texts]
+        return self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True).tolist()
+
+    def embed_query(self, text: str) -> list:
+        return self.embed_documents([text])[0]
+
+class HashingEngine(Embeddings):
+    """
+    Purpose: Fast deterministic stub for tests and load generation (no model download)
+    Processing:
+        - Each lowercase token is hashed to a dimension and a sign (feature hashing)
+        - The resulting bag-of-words vector is L2-normalized
+    """
+
+    def __init__(self, dimension: int = 1024):
+        self.dimension = dimension
+        self.model_name = f"hashing-{dimension}"
+
+    def _embed(self, text: str) -> list:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dimension] += 1.0 if digest >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self._embed(text)
+
+EMBEDDING_BACKENDS = {
+    "huggingface": HuggingFaceEngine,
+    "quantized": QuantizedEngine,
+    "hashing": HashingEngine,
+}
+
+def get_embedding_engine(backend: str = None) -> Embeddings:
+    """
+    Purpose: Create the embedding engine selected by configuration
+    Input: backend: Backend name (defaults to the EMBEDDING_BACKEND environment variable)
+    Output: Embeddings object with a `model_name` attribute identifying its vector space
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend} (choose from {', '.join(EMBEDDING_BACKENDS)})")
+    print(f"Loading {backend} embedding backend...")
+    return EMBEDDING_BACKENDS[backend]()
+
+def parity_report(candidate: Embeddings, reference: Embeddings, texts: list) -> dict:
+    """
+    Purpose: Compare a candidate backend against the reference fp32 backend
+    Input:
+        - candidate: Embedding engine under test
+        - reference: Reference embedding engine
+        - texts: Sample of corpus chunks
+    Output: Dictionary with the mean, minimum and 1st-percentile cosine similarity
+    """
+    candidate_vectors = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    reference_vectors = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    cosine = (candidate_vectors * reference_vectors).sum(axis=1) / (
+        np.linalg.norm(candidate_vectors, axis=1) * np.linalg.norm(reference_vectors, axis=1)
+    )
+    return {
+        "texts": len(texts),
+        "mean_cosine": float(cosine.mean()),
+        "p1_cosine": float(np.percentile(cosine, 1)),
+        "min_cosine": float(cosine.min()),
+    }
@@ -0,0 +1,196 @@
+import os
+import json
+import shutil
+import numpy as np
+from .abb import abbreviations
+from .lexical import tokenize
+
+EXPANSION_DIRECTORY = "expansion"
+NEIGHBORS_PER_TERM = 5  # Co-occurring terms stored per vocabulary term
+MIN_DOCUMENT_FREQUENCY = 3  # Rarer terms (OCR fragments, names) get no neighbours
+MIN_TERM_LENGTH = 3  # Shorter terms and terms with digits (section numbers, standards) are left out
+MAX_DOCUMENT_RATIO = 0.1  # Terms in more than this share of the chunks are too common to expand with
+MAX_VOCABULARY = 8000  # Most frequent candidate terms kept, bounding the build-time co-occurrence matrix
+MIN_CO_OCCURRENCE = 3  # Chunks two terms must share; fewer is mostly coincidence in a small corpus
+MIN_SIMILARITY = 0.2  # Cosine of the chunk-incidence vectors below which a neighbour is dropped
+BLOCK_SIZE = 256  # Terms per block; the block temporaries are BLOCK_SIZE x vocabulary
+LEAD_TERMS = frozenset(["explain", "describe", "define"])  # Question leads added by the normalizer, never expanded
+# Full form terms -> abbreviation term (eg: "unified modeling language" -> "uml"); the forward direction is
+# already applied by the question normalizer
+ABBREVIATION_TERMS = {
+    " ".join(tokenize(full_form)): abbrev.lower()
+    for abbrev, full_form in abbreviations.items()
+    if tokenize(full_form) and tokenize(abbrev) == [abbrev.lower()]
+}
+
+def chunk_term_lists(postings: list, num_docs: int) -> tuple:
+    """
+    Purpose: Invert term postings into the terms of each chunk
+    Input:
+        - postings: Chunk rows of each term, by term number
+        - num_docs: Number of chunks
+    Output: Tuple of (offsets, terms): the term numbers of chunk c are terms[offsets[c]:offsets[c + 1]]
+    """
+    if not postings:
+        return np.zeros(num_docs + 1, dtype=np.int64), np.zeros(0, dtype=np.int32)
+    docs = np.concatenate(postings)
+    terms = np.repeat(np.arange(len(postings), dtype=np.int32), [len(rows) for rows in postings])
+    order = np.argsort(docs, kind="stable")
+    offsets = np.zeros(num_docs + 1, dtype=np.int64)
+    np.cumsum(np.bincount(docs, minlength=num_docs), out=offsets[1:])
+    return offsets, terms[order]
+
+def shared_chunks(rows: np.ndarray, chunk_offsets: np.ndarray, chunk_terms: np.ndarray, num_terms: int) -> np.ndarray:
+    """Return how many of the given chunk rows contain each term (one co-occurrence row)."""
+    starts, lengths = chunk_offsets[rows], chunk_offsets[rows + 1] - chunk_offsets[rows]
+    positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return np.bincount(chunk_terms[positions], minlength=num_terms)
+
+class ExpansionIndex:
+    """
+    Purpose: Corpus terms that co-occur with each vocabulary term, used to expand a query without an LLM
+    Processing:
+        - Built offline from the postings of the lexical index: two terms are neighbours when the chunks
+          containing them overlap (cosine of their chunk-incidence vectors)
+        - Neighbours are an int32 [terms, NEIGHBORS_PER_TERM] array (-1 padded) with float16 weights
+        - Arrays are memory-mapped on load; expanding a query is a few dictionary and array lookups
+    """
+
+    def __init__(self, vocab: list, neighbors, weights, fingerprint: str = None):
+        self.vocab = vocab
+        self.term_ids = {term: i for i, term in enumerate(vocab)}
+        self.neighbors = neighbors
+        self.weights = weights
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, lexical_index, fingerprint: str = None) -> "ExpansionIndex":
+        """
+        Purpose: Compute the co-occurrence neighbours of the lexical index vocabulary
+        Input:
+            - lexical_index: LexicalIndex of the served chunks
+            - fingerprint: Value identifying the lexical index it was built from
+        Output: ExpansionIndex
+        Processing:
+            1. Keeps alphabetic terms found in at least MIN_DOCUMENT_FREQUENCY chunks and at most MAX_DOCUMENT_RATIO of them
+            2. Counts the chunks each pair of terms shares from the postings and a chunk -> terms inverse
+               (sparse, so memory grows with the postings rather than terms x chunks), one block of terms at a time
+            3. Keeps the NEIGHBORS_PER_TERM most similar terms of each term above MIN_SIMILARITY
+        """
+        all_terms = sorted(lexical_index.term_ids, key=lexical_index.term_ids.get)
+        document_frequency = np.diff(np.asarray(lexical_index.offsets))
+        candidates = np.flatnonzero(
+            (document_frequency >= MIN_DOCUMENT_FREQUENCY)
+            & (document_frequency <= MAX_DOCUMENT_RATIO * lexical_index.num_docs)
+            & np.array([term.isalpha() and len(term) >= MIN_TERM_LENGTH for term in all_terms], dtype=bool)
+        )
+        if len(candidates) > MAX_VOCABULARY:
+            candidates = np.sort(candidates[np.argsort(-document_frequency[candidates], kind="stable")[:MAX_VOCABULARY]])
+        postings = [
+            np.asarray(lexical_index.docs[lexical_index.offsets[term_id]:lexical_index.offsets[term_id + 1]], dtype=np.int64)
+            for term_id in candidates
+        ]
+        chunk_offsets, chunk_terms = chunk_term_lists(postings, lexical_index.num_docs)
+        frequency = document_frequency[candidates].astype(np.float32)
+
+        count = min(NEIGHBORS_PER_TERM, max(len(candidates) - 1, 0))
+        neighbors = np.full((len(candidates), NEIGHBORS_PER_TERM), -1, dtype=np.int32)
+        weights = np.zeros((len(candidates), NEIGHBORS_PER_TERM), dtype=np.float16)
+        for start in range(0, len(candidates) if count else 0, BLOCK_SIZE):
+            end = min(start + BLOCK_SIZE, len(candidates))
+            co_occurrence = np.stack([
+                shared_chunks(postings[i], chunk_offsets, chunk_terms, len(candidates)) for i in range(start, end)
+            ]).astype(np.float32)
+            similarity = co_occurrence / np.sqrt(frequency[start:end, None] * frequency[None, :])
+            similarity[co_occurrence < MIN_CO_OCCURRENCE] = 0
+            similarity[np.arange(end - start), np.arange(start, end)] = 0
+            top = np.argpartition(-similarity, count - 1, axis=1)[:, :count]
+            top_similarity = np.take_along_axis(similarity, top, axis=1)
+            order = np.argsort(-top_similarity, axis=1)
+            top, top_similarity = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_similarity, order, axis=1)
+            neighbors[start:end, :count] = np.where(top_similarity >= MIN_SIMILARITY, top, -1)
+            weights[start:end, :count] = np.where(top_similarity >= MIN_SIMILARITY, top_similarity, 0)
+        return cls([all_terms[term_id] for term_id in candidates], neighbors, weights, fingerprint)
+
+    def save(self, path: str) -> None:
+        """Write the index to path (replaced atomically)."""
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        with open(os.path.join(tmp_path, "vocab.json"), 'w') as f:
+            json.dump(self.vocab, f)
+        with open(os.path.join(tmp_path, "meta.json"), 'w') as f:
+            json.dump({"fingerprint": self.fingerprint, "neighbors": NEIGHBORS_PER_TERM}, f)
+        np.save(os.path.join(tmp_path, "neighbors.npy"), self.neighbors)
+        np.save(os.path.join(tmp_path, "weights.npy"), self.weights)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ExpansionIndex":
+        """Memory-map an index written by save()."""
+        with open(os.path.join(path, "vocab.json"), 'r') as f:
+            vocab = json.load(f)
+        with open(os.path.join(path, "meta.json"), 'r') as f:
+            meta = json.load(f)
+        return cls(
+            vocab,
+            np.load(os.path.join(path, "neighbors.npy"), mmap_mode='r'),
+            np.load(os.path.join(path, "weights.npy"), mmap_mode='r'),
+            meta["fingerprint"]
+        )
+
+    def expand(self, query: str, per_term: int = 2, max_terms: int = 8) -> list:
+        """
+        Purpose: Find terms to add to a query that retrieved nothing
+        Input:
+            - query: Query string (eg: the sanitized question)
+            - per_term: Neighbours taken per query term
+            - max_terms: Maximum number of terms returned
+        Output: New terms, strongest first: abbreviations of full forms in the query, then co-occurring terms
+        """
+        terms = [term for term in tokenize(query) if term not in LEAD_TERMS]
+        present = set(terms)
+        joined = f" {' '.join(terms)} "
+        expansion = {
+            abbrev: float("inf") for full_form, abbrev in ABBREVIATION_TERMS.items()
+            if f" {full_form} " in joined and abbrev not in present
+        }
+        for term in present:
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            taken = 0
+            for neighbor, weight in zip(self.neighbors[term_id], self.weights[term_id]):
+                if neighbor < 0 or taken == per_term:
+                    break
+                neighbor_term = self.vocab[neighbor]
+                if neighbor_term in present:
+                    continue
+                expansion[neighbor_term] = max(expansion.get(neighbor_term, 0.0), float(weight))
+                taken += 1
+        return sorted(expansion, key=expansion.get, reverse=True)[:max_terms]
+
+    def __len__(self) -> int:
+        return len(self.vocab)
+
+def load_or_create_expansion_index(lexical_index, persist_directory: str) -> ExpansionIndex:
+    """
+    Purpose: Load the persisted expansion index or build it from the lexical index
+    Input:
+        - lexical_index: LexicalIndex of the served chunks
+        - persist_directory: Directory holding faiss_indexes (the index is stored next to the collection)
+    Output: ExpansionIndex
+    """
+    index_path = os.path.join(persist_directory, EXPANSION_DIRECTORY)
+    if os.path.exists(index_path):
+        expansion_index = ExpansionIndex.load(index_path)
+        if expansion_index.fingerprint == lexical_index.fingerprint:
+            print(f"Loaded expansion index from {index_path}...\n")
+            return expansion_index
+        print(f"Expansion index at {index_path} is stale, rebuilding...\n")
+    else:
+        print(f"Creating expansion index in {index_path}...\n")
+    expansion_index = ExpansionIndex.build(lexical_index, lexical_index.fingerprint)
+    expansion_index.save(index_path)
+    return expansion_index
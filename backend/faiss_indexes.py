@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import numpy as np
+import faiss
+
+SERVING_INDEX_NAME = "serving.faiss"
+SERVING_META_NAME = "serving.json"
+# Memory-map served indexes read-only so worker processes share them through the page cache
+FAISS_MMAP = os.getenv("FAISS_MMAP", "0") == "1"
+# Flat codes (flat and HNSW storage) are mapped with IO_FLAG_MMAP_IFC, IVF inverted lists with IO_FLAG_MMAP;
+# IVF files fail to load when both flags are set
+MMAP_FLAGS = {
+    "flat": faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY,
+    "hnsw": faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY,
+    "ivf_flat": faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY,
+    "ivf_pq": faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY,
+}
+
+# Parameters of each index type; None means "derive from the number of vectors"
+INDEX_TYPE_DEFAULTS = {
+    "flat": {},
+    "hnsw": {"M": 32, "ef_construction": 200, "ef_search": 64},
+    "ivf_flat": {"nlist": None, "nprobe": 8},
+    "ivf_pq": {"nlist": None, "nprobe": 16, "m": 64, "nbits": 8},
+}
+
+def resolve_index_config(index_type: str = "flat", params: dict = None) -> dict:
+    """
+    Purpose: Merge user parameters with the defaults of an index type
+    Input:
+        - index_type: "flat", "hnsw", "ivf_flat" or "ivf_pq"
+        - params: Optional parameter overrides
+    Output: Config dictionary {"type": ..., **params}
+    """
+    if index_type not in INDEX_TYPE_DEFAULTS:
+        raise ValueError(f"Unknown FAISS index type: {index_type} (choose from {', '.join(INDEX_TYPE_DEFAULTS)})")
+    unknown = set(params or {}) - set(INDEX_TYPE_DEFAULTS[index_type])
+    if unknown:
+        raise ValueError(f"Unknown parameters for {index_type} index: {', '.join(sorted(unknown))}")
+    return {"type": index_type, **INDEX_TYPE_DEFAULTS[index_type], **(params or {})}
+
+def index_config_from_env() -> dict:
+    """
+    Purpose: Read the serving index config from FAISS_INDEX_TYPE and FAISS_INDEX_PARAMS (JSON)
+    Output: Config dictionary
+    """
+    return resolve_index_config(
+        os.getenv("FAISS_INDEX_TYPE", "flat"),
+        json.loads(os.getenv("FAISS_INDEX_PARAMS", "{}"))
+    )
+
+def concrete_params(config: dict, num_vectors: int) -> dict:
+    """
+    Purpose: Fill in size-dependent parameters and clamp them to what the data can train
+    Input:
+        - config: Index config
+        - num_vectors: Number of vectors the index will hold
+    Output: Config with every parameter set
+    """
+    config = dict(config)
+    if config["type"] in ("ivf_flat", "ivf_pq"):
+        # FAISS wants roughly 39 training points per centroid
+        nlist = config["nlist"] or int(4 * np.sqrt(num_vectors))
+        config["nlist"] = max(1, min(nlist, num_vectors // 39))
+        config["nprobe"] = min(config["nprobe"], config["nlist"])
+    if config["type"] == "ivf_pq":
+        max_bits = int(np.log2(max(num_vectors // 39, 2)))
+        config["nbits"] = max(1, min(config["nbits"], max_bits))
+    return config
+
+def build_index(vectors: np.ndarray, config: dict) -> tuple:
+    """
+    Purpose: Build a FAISS index of the configured type over vectors (row order is preserved)
+    Input:
+        - vectors: float32 matrix, one row per chunk
+        - config: Index config
+    Output: Tuple of (faiss index, concrete config)
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    num_vectors, dimension = vectors.shape
+    config = concrete_params(config, num_vectors)
+    if config["type"] == "flat":
+        index = faiss.IndexFlatL2(dimension)
+    elif config["type"] == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, config["M"], faiss.METRIC_L2)
+        index.hnsw.efConstruction = config["ef_construction"]
+    elif config["type"] == "ivf_flat":
+        index = faiss.index_factory(dimension, f"IVF{config['nlist']},Flat", faiss.METRIC_L2)
+    else:
+        if dimension % config["m"]:
+            raise ValueError(f"ivf_pq m={config['m']} must divide the vector dimension {dimension}")
+        index = faiss.index_factory(dimension, f"IVF{config['nlist']},PQ{config['m']}x{config['nbits']}", faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    set_search_params(index, config)
+    return index, config
+
+def read_index(path: str, mmap: bool = None, index_type: str = "flat"):
+    """
+    Purpose: Read a FAISS index from disk, optionally memory-mapped
+    Input:
+        - path: Path to the index file
+        - mmap: Map the file read-only instead of copying it to the heap (defaults to FAISS_MMAP)
+        - index_type: Index type of the file, which selects the mmap flags (see MMAP_FLAGS)
+    Output: FAISS index
+    Processing: A mapped index cannot be modified, and its file must only be replaced atomically (os.replace)
+    """
+    mmap = FAISS_MMAP if mmap is None else mmap
+    return faiss.read_index(path, MMAP_FLAGS[index_type] if mmap else 0)
+
+def write_index(index, path: str) -> None:
+    """Write a FAISS index next to its destination and rename it over, so mapped readers never see a partial file."""
+    faiss.write_index(index, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+def set_search_params(index, config: dict) -> None:
+    """
+    Purpose: Apply search-time parameters (efSearch / nprobe) to an index
+    Input:
+        - index: FAISS index
+        - config: Concrete index config
+    """
+    if config["type"] == "hnsw":
+        index.hnsw.efSearch = config["ef_search"]
+    elif config["type"] in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(index).nprobe = config["nprobe"]
+
+def search_rows(index, vectors: np.ndarray, k: int, rows: np.ndarray) -> tuple:
+    """
+    Purpose: Search only a subset of the index rows (eg: the chunks of one chapter)
+    Input:
+        - index: FAISS index
+        - vectors: float32 query matrix
+        - k: Number of neighbours
+        - rows: Sorted array of allowed rows
+    Output: (distances, rows) as returned by index.search
+    Processing: Contiguous rows use an IDSelectorRange (no per-id lookup), others an IDSelectorBatch
+    """
+    rows = np.ascontiguousarray(rows, dtype=np.int64)
+    if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+        selector = faiss.IDSelectorRange(int(rows[0]), int(rows[-1]) + 1)
+    else:
+        selector = faiss.IDSelectorBatch(rows)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    elif hasattr(index, "hnsw"):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return index.search(vectors, k, params=params)
+
+def load_serving_index(index_path: str, vectors_fn, fingerprint: str, config: dict):
+    """
+    Purpose: Load the serving index for a collection, rebuilding it when the config or data changed
+    Input:
+        - index_path: Collection directory
+        - vectors_fn: Callable returning the flat index vectors in row order (only called on build)
+        - fingerprint: Hash of the FAISS row order of the flat index
+        - config: Requested index config
+    Output: Tuple of (faiss index, metadata dict)
+    Processing:
+        - serving.json records the requested and concrete parameters, the fingerprint and the build time
+        - The flat index stays the source of truth, so incremental updates never have to edit HNSW/IVF structures
+    """
+    index_file = os.path.join(index_path, SERVING_INDEX_NAME)
+    meta_file = os.path.join(index_path, SERVING_META_NAME)
+    try:
+        with open(meta_file, 'r') as f:
+            meta = json.load(f)
+        if meta["config"] == config and meta["fingerprint"] == fingerprint:
+            index = read_index(index_file, index_type=config["type"])
+            set_search_params(index, meta["params"])
+            print(f"Loaded {config['type']} serving index from {index_file}...\n")
+            return index, meta
+    except (FileNotFoundError, ValueError, KeyError, RuntimeError):
+        pass
+
+    print(f"Building {config['type']} serving index in {index_file}...\n")
+    start = time.perf_counter()
+    index, params = build_index(vectors_fn(), config)
+    meta = {
+        "config": config,
+        "params": params,
+        "fingerprint": fingerprint,
+        "ntotal": index.ntotal,
+        "build_seconds": round(time.perf_counter() - start, 3),
+    }
+    write_index(index, index_file)
+    if FAISS_MMAP:
+        # Serve the mapped file rather than the heap copy that was just built
+        index = read_index(index_file, index_type=config["type"])
+        set_search_params(index, params)
+    with open(f"{meta_file}.tmp", 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(f"{meta_file}.tmp", meta_file)
+    return index, meta
@@ -0,0 +1,125 @@
+import os
+import re
+import json
+import threading
+from .chapters import CONTENTS_PATH, find_chapter, load_contents
+
+SUMMARY_TABLE_NAME = "summaries.json"  # Stored chapter and appendix summaries, next to the FAISS collection
+TEMPLATED_TAGS = ("title", "author", "number", "chapter_title", "appendix")
+TEMPLATE_MODEL_NAME = "contents.json"  # Reported as the model of templated answers
+APPENDIX_PATTERN = re.compile(r"\bappendix\s+([a-z])\b", re.IGNORECASE)
+
+def find_appendix(question: str, contents: dict) -> str:
+    """Return the id of the appendix a question names ("appendix B" -> "B"), or None."""
+    appendix_match = APPENDIX_PATTERN.search(question)
+    if appendix_match is None:
+        return None
+    appendix_id = appendix_match.group(1).upper()
+    return appendix_id if any(appendix["chapter"] == appendix_id for appendix in contents.get("appendices", [])) else None
+
+def find_chapter_entry(question: str, contents: dict) -> dict:
+    """Return the contents.json entry of the chapter a question names, or None."""
+    chapter_num = find_chapter(question, contents)
+    if not chapter_num:
+        return None
+    return next((chapter for chapter in contents["chapters"] if chapter["chapter"] == chapter_num.zfill(2)), None)
+
+def templated_answer(tag: str, question: str, contents: dict = None) -> str:
+    """
+    Purpose: Answer a structured intent directly from the table of contents
+    Input:
+        - tag: Intent tag of the question (see common.json)
+        - question: User query string
+        - contents: Contents dictionary; read from CONTENTS_PATH when not given
+    Output: Answer text, or None when the intent needs retrieval or an LLM (unknown chapter, named appendix,
+        summaries)
+    """
+    if tag not in TEMPLATED_TAGS:
+        return None
+    contents = contents or load_contents(CONTENTS_PATH)
+    if contents is None:
+        return None
+    title = contents["title"]
+    if tag == "title":
+        return f"The title of this book is **{title}**."
+    if tag == "author":
+        return f"The author of **{title}** is {contents['author']}."
+    if tag == "number":
+        return f"**{title}** has {contents['chapter_count']}."
+    if tag == "chapter_title":
+        chapter = find_chapter_entry(question, contents)
+        return None if chapter is None else f"Chapter {int(chapter['chapter'])} is **{chapter['title']}**."
+    # appendix: list the appendices, unless the question names one (answered from the summary table)
+    if find_appendix(question, contents) is not None:
+        return None
+    appendices = contents.get("appendices", [])
+    lines = "\n".join(f"- Appendix {appendix['chapter']}: {appendix['title']}" for appendix in appendices)
+    return f"**{title}** has {len(appendices)} appendices:\n\n{lines}"
+
+def summary_unit(tag: str, question: str, contents: dict = None) -> str:
+    """
+    Purpose: Find which stored summary answers a question
+    Input:
+        - tag: Intent tag of the question
+        - question: User query string
+        - contents: Contents dictionary; read from CONTENTS_PATH when not given
+    Output: Chapter id ("01") for summary_chapter, appendix id ("A") for an appendix question naming one, or None
+    """
+    if tag not in ("summary_chapter", "appendix"):
+        return None
+    contents = contents or load_contents(CONTENTS_PATH)
+    if contents is None:
+        return None
+    if tag == "appendix":
+        return find_appendix(question, contents)
+    chapter = find_chapter_entry(question, contents)
+    return None if chapter is None else chapter["chapter"]
+
+class SummaryTable:
+    """
+    Purpose: Pre-generated chapter and appendix summaries, served without an LLM call
+    Processing:
+        - Written by the offline job (python -m backend.fast_answers) as {"key": ..., "answers": {unit: chunks}}
+        - Reloaded when the file changes; answers are only served while its key (contents, index snapshot,
+          prompt and model) matches the one the caller is serving
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._stat = None
+        self._table = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, unit: str) -> list:
+        """Return the stored (chunk, model_name) pairs of a unit, or None if missing or built for another key."""
+        try:
+            stat = os.stat(self.path)
+            stat = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if stat != self._stat:
+                with open(self.path, 'r') as f:
+                    self._table = json.load(f)
+                self._stat = stat
+            table = self._table
+        if table.get("key") != key:
+            return None
+        chunks = table["answers"].get(unit)
+        return None if chunks is None else [tuple(chunk) for chunk in chunks]
+
+    @staticmethod
+    def write(path: str, key: str, answers: dict) -> None:
+        """Write the summaries of every unit (replaced atomically)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"key": key, "answers": answers}, f, indent=2)
+        os.replace(tmp_path, path)
+
+def main():
+    """Generate the summary of every chapter and appendix with the served index and LLM, and store the table."""
+    from .inference import build_summary_table
+    build_summary_table()
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,45 @@
 import os
+import json
 import time
-from typing import List, Tuple
+import asyncio
+import hashlib
+import threading
+import numpy as np
+from functools import partial
+from typing import AsyncIterator, List, Tuple, NamedTuple
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_mistralai import ChatMistralAI
+from langchain_core.documents import Document
 from nemoguardrails import RailsConfig
 from nemoguardrails.llm.providers import register_llm_provider
 from nemoguardrails.integrations.langchain.runnable_rails import RunnableRails
 from .citations import handle_citations
-from .prompts import (
-    get_prompt,
-    rewrite_prompt, 
-    sanitize_question, 
-    validate_question, 
-    replace_text
-)
+from .ingestion import sync_faiss_vector_store, list_pdf_files, parse_corpus
+from .lexical import LexicalIndex
+from .expansion import load_or_create_expansion_index
+from .rewrite_cache import RewriteCache, rewrite_key
+from .answer_cache import ANSWER_CACHE, ANSWER_CACHE_WARMUP, AnswerCache, AnswerKey, question_signature
+from .statistics import get_recurring_questions
+from .chapters import CONTENTS_PATH, load_contents, load_contents_cached
+from .fast_answers import SUMMARY_TABLE_NAME, TEMPLATE_MODEL_NAME, SummaryTable, summary_unit, templated_answer
+from .shards import ShardedIndex, shard_paths_from_env
+from .query_cache import QueryContext
+from .context import Passage, build_context, count_tokens
+from .compression import CONTEXT_COMPRESSION
+from .prompts import get_prompt, rewrite_prompt
+from .normalizer import NormalizedQuestion, normalize_question
 from .document_loading import (
-    load_documents_from_directory, 
-    load_or_create_faiss_vector_store, 
+    EMBEDDING_FUNCTION,
     similarity_search,
-    match_question,
-    clean_text
+    hybrid_search,
+    lexical_search,
+    load_lexical_index,
+    load_serving_index,
+    get_tag,
+    get_content,
+    context_passage,
+    question_chapter
 )
 
 # Load environment variables
@@ -44,10 +63,13 @@ def load_faiss_vector_store(document_path: str, persist_directory: str) -> any:
         - document_path (str): Path to the directory containing documents.
         - persist_directory (str): Directory where the FAISS index is stored or will be created.
     Output: FAISS vector store object.
-    Processing: Loads documents from the directory and builds/loads the FAISS vector store.
+    Processing: Syncs the FAISS vector store with the documents, embedding only new or changed pages,
+                then swaps in the serving index type configured by FAISS_INDEX_TYPE (flat by default).
     """
-    documents = load_documents_from_directory(document_path)
-    return load_or_create_faiss_vector_store(documents, persist_directory)
+    faiss_store = sync_faiss_vector_store(document_path, persist_directory)
+    index_meta = load_serving_index(faiss_store, persist_directory)
+    print(f"Serving FAISS index: {index_meta['params']} (mmap={index_meta['mmap']})\n")
+    return faiss_store
 
 def get_api_key(key_name: str) -> str:
     """
@@ -65,78 +87,422 @@ def get_api_key(key_name: str) -> str:
 # Core Functions
 # -------------------------------
 
+class IndexSnapshot(NamedTuple):
+    """The FAISS store and BM25 index served together; replaced as a whole by reload_index."""
+    faiss_store: any
+    lexical_index: any
+    documents: list = None  # Chunks of a lexical-only snapshot (faiss_store is None while it builds)
+    sentence_index: any = None  # Sentence embeddings of the context units (CONTEXT_COMPRESSION only)
+    expansion_index: any = None  # Co-occurring corpus terms used to expand queries that retrieved nothing
+    corpus_path: str = None  # Corpus directory the snapshot serves; cited PDFs are linked under it
+
+def load_index_snapshot(corpus_path: str = None) -> IndexSnapshot:
+    """
+    Purpose: Load (syncing with the PDFs first) the FAISS store and the BM25 index aligned with it.
+    Input: corpus_path (str): Corpus directory; defaults to CORPUS_SOURCE.
+    Output: IndexSnapshot
+    Processing: The query expansion index is loaded (or built) from the BM25 index; with CONTEXT_COMPRESSION,
+                the sentence embeddings of the context come from the sync (built at ingestion).
+    """
+    corpus_path = corpus_path or document_path
+    corpus_index_directory = os.path.join(corpus_path, "faiss_indexes")
+    faiss_store = load_faiss_vector_store(corpus_path, corpus_index_directory)
+    lexical_index = load_lexical_index(faiss_store, corpus_index_directory)
+    return IndexSnapshot(
+        faiss_store,
+        lexical_index,
+        sentence_index=faiss_store.sentence_index,
+        expansion_index=load_or_create_expansion_index(lexical_index, corpus_index_directory),
+        corpus_path=corpus_path
+    )
+
+def load_lexical_snapshot() -> IndexSnapshot:
+    """
+    Purpose: Build a lexical-only snapshot that can serve while the FAISS index is embedded.
+    Input: None
+    Output: IndexSnapshot without a FAISS store
+    Processing: Parses and splits the PDFs (no embeddings) and builds an in-memory BM25 index over the chunks.
+    """
+    print("No FAISS index yet: serving lexical-only retrieval while it builds in the background...\n")
+    documents = parse_corpus(document_path)
+    return IndexSnapshot(None, LexicalIndex.build([doc.page_content for doc in documents]), documents)
+
+def index_needs_build(corpus_path: str = None) -> bool:
+    """Return True when a corpus (CORPUS_SOURCE by default) has PDFs but no FAISS index yet."""
+    corpus_path = corpus_path or document_path
+    index_file = os.path.join(corpus_path, "faiss_indexes", "collection", "index.faiss")
+    return not os.path.exists(index_file) and bool(list_pdf_files(corpus_path))
+
+def collection_signature(corpus_path: str = None) -> tuple:
+    """
+    Purpose: Summarize the on-disk collection so a rebuild by another process can be noticed.
+    Input: corpus_path (str): Corpus directory; defaults to CORPUS_SOURCE.
+    Output: Tuple of mtimes of the manifest and FAISS index (None when missing).
+    """
+    index_path = os.path.join(corpus_path or document_path, "faiss_indexes", "collection")
+    paths = [os.path.join(index_path, name) for name in ("manifest.json", "index.faiss")]
+    return tuple(os.stat(path).st_mtime_ns if os.path.exists(path) else None for path in paths)
+
+def reload_index() -> str:
+    """
+    Purpose: Swap in a rebuilt index without restarting the server (and dropping sessions).
+    Input: None
+    Output: Snapshot id now being served.
+    Processing:
+        1. Builds the new FAISS store and BM25 index off to the side while requests keep using the old ones
+        2. Replaces the module-level snapshot with a single assignment; in-flight searches finish on the
+           snapshot they already read, which is freed once they are done
+        3. If loading or validation fails, the exception propagates and the old snapshot stays in service
+    """
+    global index_snapshot, index_signature
+    with RELOAD_LOCK:
+        signature = collection_signature()
+        snapshot = load_index_snapshot()
+        index_snapshot = snapshot
+        index_signature = signature
+    # Answers retrieved from the previous snapshot can no longer be replayed
+    answer_cache.retain_version(snapshot.faiss_store.snapshot_id)
+    # A warm-up deferred while the first index was building can run now
+    start_answer_cache_warmup()
+    print(f"Serving index snapshot {snapshot.faiss_store.snapshot_id}\n")
+    return snapshot.faiss_store.snapshot_id
+
+def reload_index_in_background() -> None:
+    """Run reload_index in a thread, logging failures instead of raising them."""
+    try:
+        reload_index()
+    except Exception as e:
+        print(f"Index reload failed, still serving the previous snapshot: {e}")
+
+def maybe_reload_index() -> None:
+    """
+    Purpose: Start a background reload when the collection on disk changed.
+    Input: None
+    Output: None
+    Processing: Checks the file mtimes at most once every INDEX_RELOAD_INTERVAL seconds (0 disables the check).
+                index_signature only changes once reload_index swapped the snapshot, so a failed reload is
+                retried at the next check. While serving BM25-only (degraded mode), a build that failed
+                before writing any file is retried with an exponential backoff.
+    """
+    global last_reload_check, build_retry_at, build_retry_delay
+    if shard_index is not None:
+        # Shards notice their own rebuilds when they are next searched
+        return
+    now = time.monotonic()
+    if not INDEX_RELOAD_INTERVAL or now - last_reload_check < INDEX_RELOAD_INTERVAL or RELOAD_LOCK.locked():
+        return
+    last_reload_check = now
+    signature = collection_signature()
+    if signature != index_signature:
+        threading.Thread(target=reload_index_in_background, daemon=True).start()
+    elif index_snapshot.faiss_store is None and now >= build_retry_at:
+        print(f"Still serving lexical-only retrieval: retrying the FAISS index build (next retry in {build_retry_delay:.0f}s)\n")
+        build_retry_at = now + build_retry_delay
+        build_retry_delay = min(build_retry_delay * 2, MAX_BUILD_RETRY_DELAY)
+        threading.Thread(target=reload_index_in_background, daemon=True).start()
+
 # Load documents and the embeddings from the FAISS vector store
 document_path = os.getenv("CORPUS_SOURCE")
 persist_directory = os.path.join(document_path, "faiss_indexes")
-faiss_store = load_faiss_vector_store(document_path, persist_directory)
+RELOAD_LOCK = threading.Lock()
+INDEX_RELOAD_INTERVAL = float(os.getenv("INDEX_RELOAD_INTERVAL", 60))  # Seconds between checks for a rebuilt index
+BACKGROUND_INDEX_BUILD = os.getenv("BACKGROUND_INDEX_BUILD", "1") == "1"  # Serve BM25-only while a missing index builds
+index_signature = collection_signature()
+last_reload_check = time.monotonic()
+# Backoff of the build retries in degraded mode (doubled after every retry)
+MAX_BUILD_RETRY_DELAY = 3600
+build_retry_delay = max(INDEX_RELOAD_INTERVAL, 1)
+build_retry_at = 0.0
+# Sharded retrieval: CORPUS_SHARDS lists corpora (eg: "swebok,default") served together, one FAISS shard each
+CORPUS_SHARDS = shard_paths_from_env(os.getenv("CORPUS_SHARDS", ""), os.path.dirname(document_path))
+shard_index = None
+if CORPUS_SHARDS:
+    # Shards load lazily on their first query, so startup loads nothing
+    shard_index = ShardedIndex(CORPUS_SHARDS, load_index_snapshot, index_needs_build, collection_signature)
+    index_snapshot = None
+elif BACKGROUND_INDEX_BUILD and index_needs_build():
+    # Degraded mode: answer from BM25 now, swap in the FAISS index when the build finishes
+    index_snapshot = load_lexical_snapshot()
+    threading.Thread(target=reload_index_in_background, daemon=True).start()
+else:
+    index_snapshot = load_index_snapshot()
+
+# Retrieval mode: "dense" (FAISS only) or "hybrid" (FAISS + BM25 fused by reciprocal rank)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")
+# Last resort for questions that retrieve nothing after local expansion: rewrite them with an LLM (network call)
+LLM_QUERY_REWRITE = os.getenv("LLM_QUERY_REWRITE", "0") == "1"
 
 # Initialize the LLM
 MODEL_NAME = "mistral-large-2411"
 llm = ChatMistralAI(model=MODEL_NAME, mistral_api_key=get_api_key("MISTRAL_API_KEY"), temperature=0, max_tokens=500)
-rewrite_llm = ChatMistralAI(model="open-mistral-7b", mistral_api_key=get_api_key("MISTRAL_API_KEY"), temperature=0, max_tokens=40)
+REWRITE_MODEL_NAME = "open-mistral-7b"
+rewrite_llm = ChatMistralAI(model=REWRITE_MODEL_NAME, mistral_api_key=get_api_key("MISTRAL_API_KEY"), temperature=0, max_tokens=40)
+# Rewrites are deterministic (temperature 0), so they are cached per input, prompt and model
+REWRITE_PROMPT_HASH = hashlib.sha256(
+    "\0".join(message.content for message in rewrite_prompt().format_messages(text="")).encode("utf-8")
+).hexdigest()
+rewrite_cache = RewriteCache()
+# Answers are replayed for similar questions asked against the same index, prompt and model
+ANSWER_PROMPT_HASH = hashlib.sha256(
+    "\0".join(message.content for message in get_prompt().format_messages(input="", context="")).encode("utf-8")
+).hexdigest()
+answer_cache = AnswerCache()
+WARMUP_LOCK = threading.Lock()
+answer_cache_warmup_started = False
+# Chapter and appendix summaries pre-generated by build_summary_table
+summary_table = SummaryTable(os.path.join(persist_directory, SUMMARY_TABLE_NAME))
 
 # Guardrails
 register_llm_provider("mistral", ChatMistralAI)
 guardrails = RunnableRails(config, input_key="question", output_key="answer")
 
-def fetch_relevant_documents(question: str) -> Tuple[List[str], str]:
+def fetch_relevant_documents(
+    question: str,
+    query_context: QueryContext = None,
+    mode: str = None,
+    chapter: str = None
+) -> Tuple[List[str], str]:
     """
     Purpose: Fetch the most relevant documents for a given question.
     Input:
         - question (str): The user query to process.
+        - query_context (QueryContext): Per-request context that embeds each text once.
+        - mode (str): "dense" or "hybrid"; defaults to RETRIEVAL_MODE. "lexical" is forced while the FAISS index builds.
+        - chapter (str): Chapter id the question refers to; restricts the search to that chapter's chunks.
     Output:
         - relevant_docs (List[str]): List of relevant documents.
         - context (str): Concatenated content from relevant documents for context.
-    Processing: Searches the FAISS vector store for documents similar to the query.
+    Processing: Searches the FAISS vector store (and the BM25 index in hybrid mode) for documents similar to the query;
+                only the BM25 index is searched while the FAISS index is still building.
+                With CORPUS_SHARDS set, every shard is searched and the hits merged (see search_shards).
     """
-    top_k = 2
+    top_k = 4  # Candidates for the context; build_context keeps what fits CONTEXT_TOKEN_BUDGET
     distance_threshold = 400
-    similar_docs = similarity_search(question, faiss_store, top_k, distance_threshold)
+    mode = mode or RETRIEVAL_MODE
+    if shard_index is not None:
+        similar_docs, snapshots = search_shards(question, query_context, mode, chapter, top_k, distance_threshold)
+        query_vector = compression_query(question, query_context)
+        relevant_docs, context = select_relevant_documents(
+            similar_docs,
+            lambda doc: context_passage(snapshots[id(doc)].faiss_store, doc, snapshots[id(doc)].sentence_index, query_vector),
+            query_context
+        )
+        # Cite each hit under the corpus of its shard
+        relevant_docs = [
+            Document(id=doc.id, page_content=doc.page_content, metadata={**doc.metadata, "corpus_path": snapshots[id(doc)].corpus_path})
+            for doc in relevant_docs
+        ]
+        return relevant_docs, context
+    # Read the snapshot once: a concurrent reload_index cannot change it under this search
+    snapshot = index_snapshot
+    if snapshot.faiss_store is None:
+        # Degraded mode while the FAISS index is being built
+        mode = "lexical"
+    if query_context is not None:
+        query_context.trace["retrieval_mode"] = mode
+        query_context.trace["index_snapshot"] = snapshot.faiss_store.snapshot_id if snapshot.faiss_store else "building"
+        query_context.trace["chapter"] = chapter
+    if mode == "lexical":
+        similar_docs = lexical_search(question, snapshot.lexical_index, snapshot.documents, top_k, distance_threshold, query_context)
+    elif mode == "hybrid":
+        similar_docs = hybrid_search(question, snapshot.faiss_store, snapshot.lexical_index, top_k, distance_threshold, query_context, chapter=chapter)
+    elif mode == "dense":
+        similar_docs = similarity_search(question, snapshot.faiss_store, top_k, distance_threshold, query_context=query_context, chapter=chapter)
+    else:
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+    if snapshot.faiss_store is None:
+        return select_relevant_documents(similar_docs, query_context=query_context)
+    query_vector = compression_query(question, query_context)
+    return select_relevant_documents(
+        similar_docs,
+        lambda doc: context_passage(snapshot.faiss_store, doc, snapshot.sentence_index, query_vector),
+        query_context
+    )
+
+def compression_query(question: str, query_context: QueryContext = None):
+    """
+    Purpose: Return the query vector the context is compressed with, or None when compression is off.
+    Input:
+        - question (str): The user query (already embedded by the search, so this is a cache hit).
+        - query_context (QueryContext): Per-request context; records whether the context was compressed.
+    Output: L2-normalized float32 query embedding, or None.
+    """
+    if query_context is not None:
+        query_context.trace["context_compression"] = CONTEXT_COMPRESSION
+    if not CONTEXT_COMPRESSION:
+        return None
+    embedding = (query_context or QueryContext(EMBEDDING_FUNCTION)).embed(question)
+    return embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+
+def select_relevant_documents(similar_docs: list, passage_fn=None, query_context: QueryContext = None) -> Tuple[List[str], str]:
+    """
+    Purpose: Keep the closest retrieved documents and assemble their parent windows into the LLM context.
+    Input:
+        - similar_docs (list): [Document, distance] pairs, best first.
+        - passage_fn (callable): Returns the context Passage of a retrieved chunk; defaults to the chunk text.
+        - query_context (QueryContext): Per-request context; records the context token count.
+    Output:
+        - relevant_docs (List[str]): Documents under the distance cut-off (else the best one) that made it into the context.
+        - context (str): Merged passages within CONTEXT_TOKEN_BUDGET tokens, best first.
+    """
     # print("similar_docs", similar_docs)
     low_distance_docs = [[doc, score] for doc, score in similar_docs if score < 320]
-    relevant_docs = low_distance_docs[:2] if len(low_distance_docs) != 0 else similar_docs[:1]
+    relevant_docs = low_distance_docs if len(low_distance_docs) != 0 else similar_docs[:1]
     relevant_docs = [doc_pair[0] for doc_pair in relevant_docs]
-    for doc in relevant_docs:
-        doc.page_content = clean_text(doc.page_content)
-    context = "\n\n".join([doc.page_content for doc in relevant_docs])
-    return relevant_docs, context
+    if not relevant_docs:
+        return relevant_docs, ""
+    passage_fn = passage_fn or (lambda doc: Passage(doc.page_content, (doc.metadata.get("source"), doc.metadata.get("page"))))
+    context, used, tokens = build_context([passage_fn(doc) for doc in relevant_docs])
+    if query_context is not None:
+        query_context.trace["context_tokens"] = tokens
+    return [relevant_docs[index] for index in used], context
+
+def search_shards(
+    question: str,
+    query_context: QueryContext,
+    mode: str,
+    chapter: str,
+    top_k: int,
+    distance_threshold: float
+) -> list:
+    """
+    Purpose: Search every corpus shard for a question and merge the hits.
+    Input:
+        - question (str): The user query to process.
+        - query_context (QueryContext): Per-request context; the query is embedded once and shared by all shards.
+        - mode (str): "dense" or "hybrid".
+        - chapter (str): Chapter id of the CORPUS_SOURCE corpus; other shards are searched in full.
+        - top_k (int): Number of merged documents to return.
+        - distance_threshold (float): Maximum distance of a hit.
+    Output: Tuple of ([Document, distance] pairs best first, {id(Document): IndexSnapshot of the shard it came from}).
+    Processing:
+        1. Embeds the question once, then searches the shards in parallel, each with a forked query context
+        2. Dense hits are merged by distance (every shard uses the same embedding model, so distances compare)
+        3. Hybrid hits are merged by their fused rank within the shard, then by distance
+        4. Shards whose FAISS index is still building are skipped and listed in the trace
+    """
+    if query_context is None:
+        query_context = QueryContext(EMBEDDING_FUNCTION)
+    if mode not in ("dense", "hybrid"):
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+    query_context.embed(question)
+    forks = {name: query_context.fork() for name in CORPUS_SHARDS}
+    snapshot_ids, snapshots = {}, {}
+
+    def search_shard(name, snapshot):
+        snapshot_ids[name] = snapshot.faiss_store.snapshot_id
+        shard_chapter = chapter if os.path.normpath(CORPUS_SHARDS[name]) == os.path.normpath(document_path) else None
+        if mode == "hybrid":
+            hits = hybrid_search(question, snapshot.faiss_store, snapshot.lexical_index, top_k, distance_threshold, forks[name], chapter=shard_chapter)
+        else:
+            hits = similarity_search(question, snapshot.faiss_store, top_k, distance_threshold, query_context=forks[name], chapter=shard_chapter)
+        snapshots.update((id(doc), snapshot) for doc, _ in hits)
+        if mode == "hybrid":
+            return [(rank, doc, distance) for rank, (doc, distance) in enumerate(hits)]
+        return hits
 
-def rewrite_question(question: str) -> Tuple[str, List[str], str]:
+    with query_context.timer("shards"):
+        if mode == "hybrid":
+            hits, building = shard_index.search(search_shard, top_k, key=lambda hit: (hit[0], hit[2]))
+            hits = [[doc, distance] for _, doc, distance in hits]
+        else:
+            hits, building = shard_index.search(search_shard, top_k)
+    for name, fork in forks.items():
+        query_context.absorb(name, fork)
+    query_context.trace["retrieval_mode"] = mode
+    query_context.trace["index_snapshot"] = snapshot_ids
+    query_context.trace["chapter"] = chapter
+    query_context.trace["shards_building"] = building
+    return hits, snapshots
+
+def rewrite_question(question: str, query_context: QueryContext = None) -> Tuple[str, bool]:
     """
     Purpose: Rewrite a user question for improved clarity or relevance.
-    Input: question (str): Original user question.
-    Output: new_question (str): Rewritten question.
-    Processing: Uses a pre-defined template and language model to rewrite the question.
+    Input:
+        - question (str): Original user question.
+        - query_context (QueryContext): Per-request context; records rewrite cache hits and misses.
+    Output: Tuple of (rewritten question, whether the LLM was called).
+    Processing: Returns the cached rewrite of the same question, prompt and model if there is one; otherwise
+                uses a pre-defined template and language model to rewrite the question and caches the result.
     """
+    key = rewrite_key(question, REWRITE_PROMPT_HASH, REWRITE_MODEL_NAME)
+    new_question = rewrite_cache.get(key)
+    if query_context is not None:
+        query_context.trace["rewrite_cache_hits" if new_question is not None else "rewrite_cache_misses"] += 1
+    if new_question is not None:
+        return new_question, False
     rewrite_message = rewrite_prompt().format_messages(text=question)
     new_question = rewrite_llm.invoke(rewrite_message).content.strip()
-    return new_question
+    rewrite_cache.put(key, new_question)
+    return new_question, True
+
+def expand_query_locally(question: str, query_context: QueryContext = None) -> str:
+    """
+    Purpose: Add co-occurring corpus terms and abbreviations to a question that retrieved nothing.
+    Input:
+        - question (str): Sanitized question.
+        - query_context (QueryContext): Per-request context; records the expansion terms and time.
+    Output: Expanded question, or None when there is no expansion index or nothing to add.
+    Processing: Looks the question terms up in the expansion index of the served snapshot (of the CORPUS_SOURCE
+                shard in sharded mode); no model or network call.
+    """
+    if shard_index is None:
+        snapshot = index_snapshot
+    else:
+        names = [name for name, path in CORPUS_SHARDS.items() if os.path.normpath(path) == os.path.normpath(document_path)]
+        snapshot = shard_index.get(names[0]) if names else None
+    if snapshot is None or snapshot.expansion_index is None:
+        return None
+    query_context = query_context or QueryContext(EMBEDDING_FUNCTION)
+    with query_context.timer("expand"):
+        terms = snapshot.expansion_index.expand(question)
+    query_context.trace["query_expansion"] = terms
+    return f"{question} {' '.join(terms)}" if terms else None
 
-def update_question(question: str) -> Tuple[str, List[str], str]:
+def update_question(
+    question: str,
+    query_context: QueryContext = None,
+    chapter: str = None,
+    normalized: NormalizedQuestion = None,
+    rewrite: bool = True
+) -> Tuple[str, List[str], str]:
     """
     # Purpose: Process and improve question through multiple refinement steps
-    # Input: Original user question string
+    # Input: Original user question string, the per-request query context, the chapter it refers to,
+    #        the question's normalized forms (computed here when not given) and whether to try the LLM rewrite
     # Output: Tuple of processed question, relevant documents, and context
-    # Processing: Applies text replacement, sanitization, and rewriting as needed
+    # Processing: Tries the expanded, then the sanitized, then the locally expanded question;
+    #             the LLM rewrite is only tried with LLM_QUERY_REWRITE=1 (and rewrite, which the async
+    #             pipeline turns off to await it instead)
     """
+    normalized = normalized or normalize_question(question)
     # Replace any abbreviations or acronyms
-    new_question = replace_text(question)
-    relevant_docs, context = fetch_relevant_documents(new_question)
+    new_question = normalized.expanded
+    relevant_docs, context = fetch_relevant_documents(new_question, query_context, chapter=chapter)
     # print("Replaced q: ", new_question)
     if relevant_docs:
         return new_question, relevant_docs, context
     # Sanitize prompt
-    new_question = sanitize_question(new_question)
-    relevant_docs, context = fetch_relevant_documents(new_question)
+    new_question = normalized.sanitized
+    relevant_docs, context = fetch_relevant_documents(new_question, query_context, chapter=chapter)
     # print("Sanitized q: ", new_question)
     if relevant_docs:
         return new_question, relevant_docs, context
-    # Rewrite prompt with an LLM
-    new_question = rewrite_question(new_question.lower())
-    relevant_docs, context = fetch_relevant_documents(new_question)
+    # Expand with related corpus terms (microseconds, no network call)
+    expanded_question = expand_query_locally(new_question, query_context)
+    if expanded_question is not None:
+        relevant_docs, context = fetch_relevant_documents(expanded_question, query_context, chapter=chapter)
+        if relevant_docs:
+            return expanded_question, relevant_docs, context
+    if not LLM_QUERY_REWRITE or not rewrite:
+        return None, None, None
+    # Rewrite prompt with an LLM (or the rewrite cache)
+    new_question, called_llm = rewrite_question(new_question.lower(), query_context)
+    relevant_docs, context = fetch_relevant_documents(new_question, query_context, chapter=chapter)
     # print("Question rewritten: ", new_question)
     if relevant_docs:
-        time.sleep(1) # Avoids getting rate limited by the mistral api
+        if called_llm:
+            time.sleep(1) # Avoids getting rate limited by the mistral api
         return new_question, relevant_docs, context
     return None, None, None
 
@@ -148,22 +514,224 @@ def chat_completion(question: str) -> Tuple[str, str]:
     Output:
         - response (str): Generated chatbot response.
         - model_name (str): Name of the model used for the response.
-    Processing: Validates the query, retrieves context, and generates a response using the LLM.
+    Processing: Picks up a rebuilt index if one appeared, creates a per-request query context, runs the pipeline and logs the request trace.
     """
-    print(f"Running prompt: {question}")
-    is_valid = validate_question(question)
+    maybe_reload_index()
+    query_context = QueryContext(EMBEDDING_FUNCTION)
+    start = time.perf_counter()
+    try:
+        for chunk in cached_completion(question, query_context):
+            if "ttfb_ms" not in query_context.trace:
+                # Time to first byte, to compare the fast, cached and LLM paths (trace["answer_path"])
+                query_context.trace["ttfb_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            yield chunk
+    finally:
+        print(f"Request trace: {query_context.trace}")
+
+def fast_path_answer(tag: str, question: str, query_context: QueryContext) -> list:
+    """
+    Purpose: Answer a structured intent without retrieval or an LLM call.
+    Input:
+        - tag (str): Intent tag of the question, or None.
+        - question (str): User query to process.
+        - query_context (QueryContext): Per-request context; records the fast path taken.
+    Output: (chunk, model_name) pairs, or None when the question needs the LLM path.
+    Processing: title, author, number, chapter_title and appendix intents are answered from a template over
+                contents.json; chapter and appendix summaries are served from the summary table while it matches
+                the served index, prompt and model. Other questions cost no disk access: contents.json is only
+                read again when it changes, and the summary table key is only computed for summaries.
+    """
+    contents, _ = load_contents_cached(CONTENTS_PATH)
+    if contents is None:
+        return None
+    answer = templated_answer(tag, question, contents)
+    if answer is not None:
+        query_context.trace["answer_path"] = f"template:{tag}"
+        return [(answer, TEMPLATE_MODEL_NAME)]
+    unit = summary_unit(tag, question, contents)
+    if unit is None:
+        return None
+    key = summary_table_key()
+    chunks = summary_table.get(key, unit) if key is not None else None
+    if chunks is not None:
+        query_context.trace["answer_path"] = f"summary_table:{unit}"
+    return chunks
+
+def summary_table_key() -> str:
+    """Return what stored summaries must have been generated with (contents, snapshot, prompt, model), or None."""
+    version = index_version()
+    if version is None:
+        return None
+    return hashlib.sha256(json.dumps(
+        [load_contents_cached(CONTENTS_PATH)[1], str(version), ANSWER_PROMPT_HASH, MODEL_NAME]
+    ).encode("utf-8")).hexdigest()
+
+def build_summary_table() -> dict:
+    """
+    Purpose: Pre-generate the summary of every chapter and appendix and store them in the summary table.
+    Input: None
+    Output: {chapter or appendix id: (chunk, model_name) pairs}
+    Processing: Builds each summary question and context the way get_content does for summary_chapter,
+                retrieves within that chapter or appendix, streams the LLM answer (sleeping between calls to
+                avoid getting rate limited by the mistral api) and writes the table keyed by summary_table_key.
+    """
+    contents = load_contents(CONTENTS_PATH)
+    key = summary_table_key()
+    if contents is None or key is None:
+        raise ValueError("The summary table needs contents.json and a built FAISS index")
+    units = [(chapter["chapter"], *get_content("summary_chapter", f"Summarize chapter {int(chapter['chapter'])}")) for chapter in contents["chapters"]]
+    units += [
+        (appendix["chapter"], f"Summarize appendix {appendix['chapter']}: {appendix['title']}", f"Appendix {appendix['chapter']}: {appendix['title']}")
+        for appendix in contents.get("appendices", [])
+    ]
+    answers = {}
+    for unit, question, context in units:
+        query_context = QueryContext(EMBEDDING_FUNCTION)
+        relevant_docs, new_context = fetch_relevant_documents(question, query_context, chapter=unit)
+        answers[unit] = list(stream_answer(question, f"{context}{new_context}", relevant_docs, query_context))
+        print(f"Summarized {unit}: {query_context.trace['prompt_tokens']} prompt tokens")
+        time.sleep(1) # Avoids getting rate limited by the mistral api
+    SummaryTable.write(summary_table.path, key, answers)
+    return answers
+
+def index_version():
+    """Return what the served answers were retrieved from: the snapshot id, the shard signatures, or None while building."""
+    if shard_index is not None:
+        return tuple(collection_signature(path) for path in CORPUS_SHARDS.values())
+    snapshot = index_snapshot
+    return snapshot.faiss_store.snapshot_id if snapshot.faiss_store is not None else None
+
+def lookup_answer(question: str, query_context: QueryContext) -> Tuple[AnswerKey, list, list]:
+    """
+    Purpose: Look a question up in the answer cache.
+    Input:
+        - question (str): User query to process.
+        - query_context (QueryContext): Per-request context; records the cache outcome and similarity.
+    Output: Tuple of (cache key, question embedding, cached (chunk, model_name) pairs or None); the key is None
+            when the answer cannot be cached (cache disabled, index building or invalid question).
+    Processing: Looks up the question embedding among answers cached for the same index version, prompt, model,
+                chapter and numbers (see AnswerCache).
+    """
+    version = index_version()
+    if not ANSWER_CACHE or version is None or not normalize_question(question).valid:
+        return None, None, None
     question = question.strip()
-    if not is_valid:
-        yield (UNANSWERABLE_MSG, "N/A")
+    embedding = query_context.embed(question)
+    key = AnswerKey(version, ANSWER_PROMPT_HASH, MODEL_NAME, question_signature(question, question_chapter(question)))
+    with query_context.timer("answer_cache"):
+        chunks, similarity = answer_cache.get(key, embedding)
+    query_context.trace["answer_cache"] = "hit" if chunks is not None else "miss"
+    query_context.trace["answer_cache_similarity"] = round(similarity, 4)
+    if chunks is not None:
+        query_context.trace["answer_path"] = "answer_cache"
+    return key, embedding, chunks
+
+def cached_completion(question: str, query_context: QueryContext) -> Tuple[str, str]:
+    """
+    Purpose: Replay the answer of a similar earlier question, or generate one and remember it.
+    Input:
+        - question (str): User query to process.
+        - query_context (QueryContext): Per-request context; records the cache outcome and similarity.
+    Output: The (chunk, model_name) pairs of generate_completion.
+    Processing:
+        1. Looks the question up with lookup_answer; a hit streams the stored chunks with no retrieval or LLM call
+        2. On a miss, streams generate_completion and caches its chunks once an LLM answer was fully streamed
+    """
+    key, embedding, chunks = lookup_answer(question, query_context)
+    if key is None:
+        yield from generate_completion(question, query_context)
         return
+    if chunks is not None:
+        yield from chunks
+        return
+    chunks = []
+    for chunk in generate_completion(question, query_context):
+        chunks.append(chunk)
+        yield chunk
+    if "prompt_tokens" in query_context.trace:
+        answer_cache.put(key, embedding, chunks)
+
+def warm_answer_cache(limit: int = ANSWER_CACHE_WARMUP) -> int:
+    """
+    Purpose: Pre-populate the answer cache with the most frequent questions of the conversation log.
+    Input: limit (int): Number of recurring questions to answer.
+    Output: Number of questions answered by the LLM.
+    Processing: Answers each question through cached_completion (hits cost nothing), sleeping after every
+                LLM call to avoid getting rate limited by the mistral api. Skipped while no FAISS index is
+                served, since those answers could not be cached.
+    """
+    if index_version() is None:
+        print("Answer cache warm-up skipped: the FAISS index is still building\n")
+        return 0
+    generated = 0
+    for question in get_recurring_questions(limit):
+        query_context = QueryContext(EMBEDDING_FUNCTION)
+        for _ in cached_completion(question, query_context):
+            pass
+        if query_context.trace.get("answer_cache") == "miss" and "prompt_tokens" in query_context.trace:
+            generated += 1
+            time.sleep(1)
+    print(f"Answer cache warmed with {generated} answers ({len(answer_cache)} cached)\n")
+    return generated
+
+def warm_answer_cache_in_background() -> None:
+    """Run warm_answer_cache in a thread, logging failures instead of raising them."""
+    try:
+        warm_answer_cache()
+    except Exception as e:
+        print(f"Answer cache warm-up failed: {e}")
+
+def start_answer_cache_warmup() -> None:
+    """Start warm_answer_cache in a thread once (ANSWER_CACHE_WARMUP), as soon as a FAISS index is served."""
+    global answer_cache_warmup_started
+    with WARMUP_LOCK:
+        if not ANSWER_CACHE or ANSWER_CACHE_WARMUP <= 0 or answer_cache_warmup_started or index_version() is None:
+            return
+        answer_cache_warmup_started = True
+    threading.Thread(target=warm_answer_cache_in_background, daemon=True).start()
+
+class AnswerPlan(NamedTuple):
+    """What prepare_answer decided: final chunks, or the question, context and documents the LLM answers over."""
+    chunks: list = None  # (chunk, model_name) pairs answered without the LLM (invalid question, fast path, nothing retrieved)
+    question: str = None
+    context: str = None
+    relevant_docs: list = None
+    rewrite: str = None  # Question left for the LLM rewrite (prepare_answer with rewrite=False)
+    chapter: str = None  # Chapter the rewritten question is searched in
+
+def prepare_answer(question: str, query_context: QueryContext, fast_path: bool = True, rewrite: bool = True) -> AnswerPlan:
+    """
+    Purpose: Run validation, the fast path and retrieval for one user query.
+    Input:
+        - question (str): User query to process.
+        - query_context (QueryContext): Per-request context shared by every retrieval step.
+        - fast_path (bool): Answer structured intents from the contents and the summary table (see fast_path_answer).
+        - rewrite (bool): Try the LLM rewrite here (LLM_QUERY_REWRITE); when False, the question to rewrite is
+          returned in the plan instead.
+    Output: AnswerPlan of the query.
+    Processing: Validates the query, answers structured intents directly, otherwise retrieves the context the
+                LLM answers over. Blocking: embedding, FAISS search and (with rewrite) the rewrite call.
+    """
+    print(f"Running prompt: {question}")
+    normalized = normalize_question(question)
+    question = question.strip()
+    if not normalized.valid:
+        return AnswerPlan(chunks=[(UNANSWERABLE_MSG, "N/A")])
+
+    # Chapter the question refers to, if any: retrieval then only searches that chapter
+    chapter = question_chapter(question)
 
     # Check if this question can be found in common questions (eg: summarize chapter)
-    new_question, context = match_question(question)
+    tag = get_tag(question, query_context.embed(question))
+    if fast_path:
+        chunks = fast_path_answer(tag, question, query_context)
+        if chunks is not None:
+            return AnswerPlan(chunks=chunks)
+    new_question, context = get_content(tag, question) if tag is not None else (None, None)
     if new_question is not None and context is not None:
         if "chapter does not exist in the contents" in context:
-            yield UNANSWERABLE_MSG, MODEL_NAME
-            return
-        relevant_docs, new_context = fetch_relevant_documents(new_question)
+            return AnswerPlan(chunks=[(UNANSWERABLE_MSG, MODEL_NAME)])
+        relevant_docs, new_context = fetch_relevant_documents(new_question, query_context, chapter=chapter)
         if new_context is not None:
             question = new_question
             context += new_context
@@ -171,15 +739,53 @@ def chat_completion(question: str) -> Tuple[str, str]:
 
     # Update the user question to get better results
     else:
-        relevant_docs, context = fetch_relevant_documents(question)
+        relevant_docs, context = fetch_relevant_documents(question, query_context, chapter=chapter)
         if not relevant_docs:
-            question, relevant_docs, context = update_question(question)
+            question, relevant_docs, context = update_question(question, query_context, chapter, normalized, rewrite)
             if question is None:
-                yield UNANSWERABLE_MSG, MODEL_NAME
-                return
+                if LLM_QUERY_REWRITE and not rewrite:
+                    return AnswerPlan(rewrite=normalized.sanitized.lower(), chapter=chapter)
+                return AnswerPlan(chunks=[(UNANSWERABLE_MSG, MODEL_NAME)])
 
-    # LLM inference using Nemo Guardrails
+    return AnswerPlan(question=question, context=context, relevant_docs=relevant_docs)
+
+def generate_completion(question: str, query_context: QueryContext, fast_path: bool = True) -> Tuple[str, str]:
+    """
+    Purpose: Run validation, retrieval and LLM streaming for one user query.
+    Input:
+        - question (str): User query to process.
+        - query_context (QueryContext): Per-request context shared by every retrieval step.
+        - fast_path (bool): Answer structured intents from the contents and the summary table (see fast_path_answer).
+    Output:
+        - response (str): Generated chatbot response.
+        - model_name (str): Name of the model used for the response.
+    Processing: Prepares the answer (prepare_answer), then streams its chunks or the LLM response.
+    """
+    plan = prepare_answer(question, query_context, fast_path)
+    if plan.chunks is not None:
+        yield from plan.chunks
+        return
+    yield from stream_answer(plan.question, plan.context, plan.relevant_docs, query_context)
+
+def answer_messages(question: str, context: str, query_context: QueryContext) -> list:
+    """Return the prompt messages of an LLM answer, recording its prompt tokens and the LLM answer path."""
     messages = get_prompt().format_messages(input=question, context=context)
+    query_context.trace["prompt_tokens"] = sum(count_tokens(message.content) for message in messages)
+    query_context.trace["answer_path"] = "llm"
+    return messages
+
+def stream_answer(question: str, context: str, relevant_docs: list, query_context: QueryContext) -> Tuple[str, str]:
+    """
+    Purpose: Stream the LLM answer to a question over its retrieved context, then the citations.
+    Input:
+        - question (str): Question to answer (after rewriting).
+        - context (str): Retrieved context.
+        - relevant_docs (list): Documents the context came from, cited after the answer.
+        - query_context (QueryContext): Per-request context; records the prompt tokens.
+    Output: (chunk, model_name) pairs.
+    """
+    # LLM inference using Nemo Guardrails
+    messages = answer_messages(question, context, query_context)
     # Stream response from LLM
     full_response = {"answer": ""}
     for chunk in llm.stream(messages):
@@ -191,4 +797,99 @@ def chat_completion(question: str) -> Tuple[str, str]:
         citations = handle_citations(relevant_docs)
         if citations:
             yield citations, MODEL_NAME
-            return
\ No newline at end of file
+            return
+
+# -------------------------------
+# Async pipeline
+# -------------------------------
+
+async def run_blocking(function, *args, **kwargs):
+    """Run a blocking (CPU-bound or I/O) call in the event loop's default executor and return its result."""
+    return await asyncio.get_running_loop().run_in_executor(None, partial(function, *args, **kwargs))
+
+async def achat_completion(question: str) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Purpose: Async variant of chat_completion for event-loop front ends.
+    Input:
+        - question (str): User query to process.
+    Output: The same (chunk, model_name) pairs as chat_completion.
+    Processing: Same pipeline and request trace as chat_completion, but the event loop is never blocked:
+                embedding, FAISS search, index reloads and cache lookups run in an executor, and the rewrite
+                and answer LLM calls use ainvoke and astream.
+    """
+    await run_blocking(maybe_reload_index)
+    query_context = QueryContext(EMBEDDING_FUNCTION)
+    start = time.perf_counter()
+    try:
+        async for chunk in acached_completion(question, query_context):
+            if "ttfb_ms" not in query_context.trace:
+                query_context.trace["ttfb_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            yield chunk
+    finally:
+        print(f"Request trace: {query_context.trace}")
+
+async def acached_completion(question: str, query_context: QueryContext) -> AsyncIterator[Tuple[str, str]]:
+    """Async variant of cached_completion: the lookup runs in an executor, misses stream agenerate_completion."""
+    key, embedding, chunks = await run_blocking(lookup_answer, question, query_context)
+    if chunks is not None:
+        for chunk in chunks:
+            yield chunk
+        return
+    chunks = []
+    async for chunk in agenerate_completion(question, query_context):
+        chunks.append(chunk)
+        yield chunk
+    if key is not None and "prompt_tokens" in query_context.trace:
+        answer_cache.put(key, embedding, chunks)
+
+async def agenerate_completion(question: str, query_context: QueryContext, fast_path: bool = True) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Purpose: Async variant of generate_completion.
+    Input: Same as generate_completion.
+    Output: The same (chunk, model_name) pairs as generate_completion.
+    Processing: Runs prepare_answer in an executor without the LLM rewrite; a question left for the rewrite
+                awaits arewrite_question and is searched again in the executor, then the answer is streamed
+                with astream_answer.
+    """
+    plan = await run_blocking(prepare_answer, question, query_context, fast_path, rewrite=False)
+    if plan.rewrite is not None:
+        new_question, called_llm = await arewrite_question(plan.rewrite, query_context)
+        relevant_docs, context = await run_blocking(fetch_relevant_documents, new_question, query_context, chapter=plan.chapter)
+        if relevant_docs:
+            if called_llm:
+                await asyncio.sleep(1) # Avoids getting rate limited by the mistral api
+            plan = AnswerPlan(question=new_question, context=context, relevant_docs=relevant_docs)
+        else:
+            plan = AnswerPlan(chunks=[(UNANSWERABLE_MSG, MODEL_NAME)])
+    if plan.chunks is not None:
+        for chunk in plan.chunks:
+            yield chunk
+        return
+    async for chunk in astream_answer(plan.question, plan.context, plan.relevant_docs, query_context):
+        yield chunk
+
+async def arewrite_question(question: str, query_context: QueryContext = None) -> Tuple[str, bool]:
+    """Async variant of rewrite_question: the rewrite cache is read and written in an executor, the LLM awaited."""
+    key = rewrite_key(question, REWRITE_PROMPT_HASH, REWRITE_MODEL_NAME)
+    new_question = await run_blocking(rewrite_cache.get, key)
+    if query_context is not None:
+        query_context.trace["rewrite_cache_hits" if new_question is not None else "rewrite_cache_misses"] += 1
+    if new_question is not None:
+        return new_question, False
+    rewrite_message = rewrite_prompt().format_messages(text=question)
+    new_question = (await rewrite_llm.ainvoke(rewrite_message)).content.strip()
+    await run_blocking(rewrite_cache.put, key, new_question)
+    return new_question, True
+
+async def astream_answer(question: str, context: str, relevant_docs: list, query_context: QueryContext) -> AsyncIterator[Tuple[str, str]]:
+    """Async variant of stream_answer: streams the LLM with astream, then formats the citations in an executor."""
+    messages = answer_messages(question, context, query_context)
+    async for chunk in llm.astream(messages):
+        yield (chunk.content, MODEL_NAME)
+
+    if relevant_docs:
+        citations = await run_blocking(handle_citations, relevant_docs)
+        if citations:
+            yield citations, MODEL_NAME
+
+start_answer_cache_warmup()
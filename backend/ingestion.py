@@ -0,0 +1,575 @@
+import os
+import copy
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from .pdf_parsing import iter_parsed_pages
+from .chapters import CONTENTS_NAME, load_contents
+from .dedup import SimHashIndex, dedup_chunks, dedup_settings, simhash
+from .compression import CONTEXT_COMPRESSION
+from .document_loading import (
+	EMBEDDING_FUNCTION,
+	freeze_docstore,
+	load_faiss_index,
+	load_sentence_index,
+	save_faiss_vector_store
+)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+CHECKPOINT_SUFFIX = ".build"
+EMBEDDING_BATCH_SIZE = 64
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", 1))  # >1 parses PDFs in a process pool
+SNAPSHOT_FILES = ("index.faiss", "index.pkl")
+VERIFY_CHECKSUMS = os.getenv("VERIFY_INDEX_CHECKSUMS", "1") == "1"  # Hash the snapshot files on every load
+
+def list_pdf_files(document_path: str) -> list:
+	"""
+	Purpose: List the PDF files of a corpus in a stable order
+	Input: document_path: Path to directory containing PDF files
+	Output: Sorted list of PDF file names
+	"""
+	if not os.path.isdir(document_path):
+		return []
+	return sorted(name for name in os.listdir(document_path) if name.lower().endswith(".pdf"))
+
+def file_fingerprint(path: str) -> dict:
+	"""
+	Purpose: Cheap change detector for a file (size and modification time)
+	Input: path: File path
+	Output: Dictionary with the file size and mtime in nanoseconds
+	"""
+	stat = os.stat(path)
+	return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def load_manifest(index_path: str) -> dict:
+	"""
+	Purpose: Read the manifest stored next to a FAISS collection
+	Input: index_path: Collection directory
+	Output: Manifest dictionary, or None if the collection has none
+	"""
+	try:
+		with open(os.path.join(index_path, MANIFEST_NAME), 'r') as f:
+			return json.load(f)
+	except FileNotFoundError:
+		return None
+
+def save_manifest(index_path: str, manifest: dict) -> None:
+	"""
+	Purpose: Atomically write the manifest next to a FAISS collection
+	Input:
+		- index_path: Collection directory
+		- manifest: Manifest dictionary
+	"""
+	os.makedirs(index_path, exist_ok=True)
+	manifest_path = os.path.join(index_path, MANIFEST_NAME)
+	with open(f"{manifest_path}.tmp", 'w') as f:
+		json.dump(manifest, f, indent=1)
+	os.replace(f"{manifest_path}.tmp", manifest_path)
+
+def file_sha256(path: str) -> str:
+	"""Return the hex SHA-256 digest of a file, read in 1 MB blocks."""
+	digest = hashlib.sha256()
+	with open(path, 'rb') as f:
+		for block in iter(lambda: f.read(1 << 20), b""):
+			digest.update(block)
+	return digest.hexdigest()
+
+def snapshot_info(index_path: str, faiss_store: FAISS) -> dict:
+	"""
+	Purpose: Describe the saved index files for the manifest
+	Input:
+		- index_path: Collection directory
+		- faiss_store: FAISS vector store that was just saved there
+	Output: Dictionary with the vector count, dimension, file checksums and snapshot id
+	"""
+	checksums = {name: file_sha256(os.path.join(index_path, name)) for name in SNAPSHOT_FILES}
+	return {
+		"snapshot_id": hashlib.sha256(json.dumps(checksums, sort_keys=True).encode("utf-8")).hexdigest()[:16],
+		"created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+		"vectors": faiss_store.index.ntotal,
+		"dimension": faiss_store.index.d,
+		"checksums": checksums
+	}
+
+def verify_snapshot(index_path: str, manifest: dict, faiss_store: FAISS, settings: dict = None) -> None:
+	"""
+	Purpose: Check a loaded index against its manifest before serving it
+	Input:
+		- index_path: Collection directory
+		- manifest: Manifest dictionary
+		- faiss_store: Loaded FAISS vector store
+		- settings: Expected embedding model and chunk parameters (None skips the check)
+	Output: None; raises ValueError describing the first mismatch
+	Processing: Checks settings, vector count and dimension, then the file checksums (unless VERIFY_INDEX_CHECKSUMS=0)
+	"""
+	if settings is not None and manifest.get("settings") != settings:
+		raise ValueError(f"Index in {index_path} was built with {manifest.get('settings')}, but the server uses {settings}")
+	snapshot = manifest.get("index")
+	if snapshot is None:
+		return
+	if (faiss_store.index.ntotal, faiss_store.index.d) != (snapshot["vectors"], snapshot["dimension"]):
+		raise ValueError(
+			f"Index in {index_path} has {faiss_store.index.ntotal} vectors of dimension {faiss_store.index.d}, "
+			f"manifest says {snapshot['vectors']} of dimension {snapshot['dimension']}"
+		)
+	if VERIFY_CHECKSUMS:
+		for name, checksum in snapshot["checksums"].items():
+			if file_sha256(os.path.join(index_path, name)) != checksum:
+				raise ValueError(f"Checksum mismatch for {os.path.join(index_path, name)}; rebuild or restore the snapshot")
+
+def snapshot_id(index_path: str, manifest: dict) -> str:
+	"""
+	Purpose: Identify the snapshot being served (used to key caches across hot swaps)
+	Input:
+		- index_path: Collection directory
+		- manifest: Manifest dictionary, or None for a legacy index
+	Output: Snapshot id from the manifest, or one derived from the index file stats
+	"""
+	if manifest is not None and "index" in manifest:
+		return manifest["index"]["snapshot_id"]
+	stats = [list(file_fingerprint(os.path.join(index_path, name)).values()) for name in SNAPSHOT_FILES]
+	return "legacy-" + hashlib.sha256(json.dumps(stats).encode("utf-8")).hexdigest()[:16]
+
+class BuildCheckpoint:
+	"""
+	Purpose: Append-only record of an index build that survives crashes
+	Processing:
+		- Every embedded batch is written as <n>.npy (vectors) plus <n>.jsonl (ids, texts, metadata)
+		- progress.json holds the working manifest (pages already embedded) and the stale ids
+		- A restarted build reopens the checkpoint and skips every page it already embedded
+	"""
+
+	def __init__(self, path: str, settings: dict, files: dict, stale_ids: list, batches: int = 0):
+		self.path = path
+		self.settings = settings
+		self.files = files
+		self.stale_ids = stale_ids
+		self.batches = batches
+
+	@classmethod
+	def open(cls, path: str, settings: dict, manifest: dict) -> "BuildCheckpoint":
+		"""
+		Purpose: Resume the checkpoint at path, or start a new one from the committed manifest
+		Input:
+			- path: Checkpoint directory
+			- settings: Chunk params and embedding model of this build
+			- manifest: Committed manifest (or None)
+		Output: BuildCheckpoint
+		"""
+		try:
+			with open(os.path.join(path, "progress.json"), 'r') as f:
+				progress = json.load(f)
+			if progress["settings"] == settings:
+				print(f"Resuming index build from checkpoint {path} ({progress['batches']} batches done)...")
+				return cls(path, settings, progress["files"], progress["stale_ids"], progress["batches"])
+		except (FileNotFoundError, ValueError, KeyError):
+			pass
+		shutil.rmtree(path, ignore_errors=True)
+		os.makedirs(path)
+		if manifest is not None and manifest["settings"] == settings:
+			checkpoint = cls(path, settings, copy.deepcopy(manifest["files"]), [])
+		else:
+			# New chunk params or model: every committed chunk is stale
+			stale_ids = [] if manifest is None else [
+				chunk_id for entry in manifest["files"].values() for page in entry["pages"].values() for chunk_id in page["ids"]
+			]
+			checkpoint = cls(path, settings, {}, stale_ids)
+		checkpoint.save()
+		return checkpoint
+
+	def save(self) -> None:
+		"""Atomically write progress.json."""
+		progress_path = os.path.join(self.path, "progress.json")
+		with open(f"{progress_path}.tmp", 'w') as f:
+			json.dump({
+				"settings": self.settings,
+				"files": self.files,
+				"stale_ids": self.stale_ids,
+				"batches": self.batches
+			}, f)
+		os.replace(f"{progress_path}.tmp", progress_path)
+
+	def write_batch(self, texts: list, metadatas: list, ids: list, vectors: np.ndarray) -> None:
+		"""Persist one embedded batch (call save() afterwards to record it as done)."""
+		name = os.path.join(self.path, f"{self.batches:06d}")
+		np.save(f"{name}.npy", vectors)
+		with open(f"{name}.jsonl", 'w') as f:
+			for chunk_id, text, metadata in zip(ids, texts, metadatas):
+				f.write(json.dumps({"id": chunk_id, "text": text, "metadata": metadata}) + "\n")
+		self.batches += 1
+
+	def iter_batches(self):
+		"""
+		Purpose: Stream the embedded batches back, one batch in memory at a time
+		Output: Generator of (texts, metadatas, ids, vectors) tuples
+		"""
+		for batch in range(self.batches):
+			name = os.path.join(self.path, f"{batch:06d}")
+			with open(f"{name}.jsonl", 'r') as f:
+				records = [json.loads(line) for line in f]
+			yield (
+				[record["text"] for record in records],
+				[record["metadata"] for record in records],
+				[record["id"] for record in records],
+				np.load(f"{name}.npy")
+			)
+
+	def remove(self) -> None:
+		"""Delete the checkpoint once its batches are committed to the index."""
+		shutil.rmtree(self.path, ignore_errors=True)
+
+class PendingBatch:
+	"""
+	Purpose: Chunks and manifest updates waiting to be embedded together
+	Processing: Manifest changes are only applied to the checkpoint once their chunks are saved
+	"""
+
+	def __init__(self):
+		self.clear()
+
+	def clear(self) -> None:
+		self.texts, self.metadatas, self.ids = [], [], []
+		self.updates = []
+
+	def __len__(self) -> int:
+		return len(self.ids)
+
+	def add_page(self, file_name: str, page_key: str, digest: str, chunks: list, ids: list, stale_ids: list, extra: dict = None) -> None:
+		self.texts.extend(chunk.page_content for chunk in chunks)
+		self.metadatas.extend(chunk.metadata for chunk in chunks)
+		self.ids.extend(ids)
+		self.updates.append(("page", file_name, page_key, {"hash": digest, "ids": ids, **(extra or {})}, stale_ids))
+
+	def finish_file(self, file_name: str, fingerprint: dict, removed_pages: list, stale_ids: list) -> None:
+		self.updates.append(("file", file_name, fingerprint, removed_pages, stale_ids))
+
+	def remove_file(self, file_name: str, stale_ids: list) -> None:
+		self.updates.append(("remove", file_name, None, None, stale_ids))
+
+	def flush(self, checkpoint: BuildCheckpoint) -> None:
+		"""
+		Purpose: Embed the pending chunks and record them in the checkpoint
+		Input: checkpoint: BuildCheckpoint to append to
+		"""
+		if self.ids:
+			vectors = np.asarray(EMBEDDING_FUNCTION.embed_documents(self.texts), dtype=np.float32)
+			checkpoint.write_batch(self.texts, self.metadatas, self.ids, vectors)
+		for kind, file_name, first, second, stale_ids in self.updates:
+			checkpoint.stale_ids.extend(stale_ids)
+			if kind == "page":
+				checkpoint.files.setdefault(file_name, {"pages": {}})["pages"][first] = second
+			elif kind == "file":
+				entry = checkpoint.files.setdefault(file_name, {"pages": {}})
+				for page_key in second:
+					entry["pages"].pop(page_key, None)
+				entry["fingerprint"] = first
+			else:
+				checkpoint.files.pop(file_name, None)
+		checkpoint.save()
+		self.clear()
+
+def build_dedup_index(files: dict, pdf_files: list) -> SimHashIndex:
+	"""
+	Purpose: Load the SimHashes of the committed chunks, so new chunks are checked against the whole corpus
+	Input:
+		- files: Manifest "files" section (pages record "simhashes" aligned with their "ids")
+		- pdf_files: PDFs still in the corpus (chunks of removed PDFs are left out)
+	Output: SimHashIndex of every kept chunk
+	"""
+	dedup_index = SimHashIndex()
+	for file_name, entry in files.items():
+		if file_name not in pdf_files:
+			continue
+		for page in entry["pages"].values():
+			for chunk_id, fingerprint in zip(page["ids"], page.get("simhashes", [])):
+				dedup_index.add(chunk_id, int(fingerprint, 16))
+	return dedup_index
+
+def queue_page(
+	pending: PendingBatch,
+	dedup_index: SimHashIndex,
+	file_name: str,
+	page_number: int,
+	digest: str,
+	chunks: list,
+	old_page: dict
+) -> None:
+	"""
+	Purpose: Queue the chunks of a new or changed page for embedding, dropping near-duplicates first
+	Input:
+		- pending: PendingBatch to add the page to
+		- dedup_index: SimHashIndex of the kept chunks (None disables deduplication)
+		- file_name, page_number, digest: Page identity and content hash
+		- chunks: Chunks of the page
+		- old_page: Manifest entry of the previous version of the page (or None)
+	Processing:
+		- Chunk ids keep the chunk's position on the page, so re-splitting an unchanged page yields the same ids
+		- A chunk within the dedup distance of a kept chunk is not embedded; the page records the ids its dropped
+		  chunks duplicate, their size in bytes, and the SimHashes of the chunks it keeps
+	"""
+	stale_ids = old_page["ids"] if old_page else []
+	ids = [f"{file_name}:{page_number}:{digest[:12]}:{i}" for i in range(len(chunks))]
+	extra = None
+	if dedup_index is not None:
+		for chunk_id in stale_ids:
+			dedup_index.remove(chunk_id)
+		kept, fingerprints, duplicates, duplicate_bytes = [], [], [], 0
+		for chunk_id, chunk in zip(ids, chunks):
+			fingerprint = simhash(chunk.page_content)
+			original = dedup_index.find(fingerprint)
+			if original is None:
+				dedup_index.add(chunk_id, fingerprint)
+				kept.append((chunk_id, chunk))
+				fingerprints.append(f"{fingerprint:016x}")
+			else:
+				duplicates.append(original)
+				duplicate_bytes += len(chunk.page_content.encode("utf-8"))
+		ids, chunks = [chunk_id for chunk_id, _ in kept], [chunk for _, chunk in kept]
+		extra = {"simhashes": fingerprints, "duplicates": duplicates, "duplicate_bytes": duplicate_bytes}
+	pending.add_page(file_name, str(page_number), digest, chunks, ids, stale_ids, extra)
+
+def orphaned_pages(files: dict) -> dict:
+	"""
+	Purpose: Find pages that dropped a chunk as a duplicate of a chunk that is no longer indexed
+	Input: files: Checkpoint "files" section
+	Output: {file name: set of page keys} to re-split and embed
+	"""
+	live_ids = {chunk_id for entry in files.values() for page in entry["pages"].values() for chunk_id in page["ids"]}
+	orphans = {}
+	for file_name, entry in files.items():
+		page_keys = {
+			page_key for page_key, page in entry["pages"].items()
+			if any(chunk_id not in live_ids for chunk_id in page.get("duplicates", []))
+		}
+		if page_keys:
+			orphans[file_name] = page_keys
+	return orphans
+
+def dedup_stats(files: dict) -> tuple:
+	"""Return the number of chunks and bytes that deduplication kept out of the index."""
+	pages = [page for entry in files.values() for page in entry["pages"].values()]
+	return sum(len(page.get("duplicates", [])) for page in pages), sum(page.get("duplicate_bytes", 0) for page in pages)
+
+def sync_faiss_vector_store(
+	document_path: str,
+	persist_directory: str,
+	collection_name: str = "collection",
+	chunk_size: int = 200,
+	chunk_overlap: int = 50,
+	batch_size: int = EMBEDDING_BATCH_SIZE,
+	workers: int = INGESTION_WORKERS
+) -> FAISS:
+	"""
+	Purpose: Bring the FAISS collection up to date with the PDFs, embedding only what changed
+	Input:
+		- document_path: Path to directory containing PDF files
+		- persist_directory: Directory path to save/load the FAISS index
+		- collection_name: Name of the vector store collection
+		- chunk_size: Size of each text chunk (tokens)
+		- chunk_overlap: Number of tokens to overlap between chunks
+		- batch_size: Number of chunks embedded (and checkpointed) together
+		- workers: Number of processes parsing and splitting page ranges
+	Output: FAISS vector store object with a read-only docstore
+	Processing:
+		1. Skips PDFs whose size and mtime match the manifest
+		2. Streams the pages of the other PDFs (parsed in page-range order, optionally in parallel) and hashes them
+		3. Splits new or changed pages, drops chunks that are SimHash near-duplicates of a kept chunk
+		   (CHUNK_DEDUP_DISTANCE, -1 disables), and embeds the rest in fixed-size batches, checkpointing each batch
+		4. Commits: removes vectors of changed and deleted pages, appends the batches, saves the index and manifest
+		   (chunks are annotated with their chapter and section from contents.json when the corpus has one)
+		5. The manifest records the settings, vector count and file checksums; unchanged indexes are verified against it
+	"""
+	index_path = os.path.join(persist_directory, collection_name)
+	manifest = load_manifest(index_path)
+	pdf_files = list_pdf_files(document_path)
+	index_exists = os.path.exists(os.path.join(index_path, "index.faiss"))
+	contents = load_contents(os.path.join(document_path, CONTENTS_NAME))
+	settings = {
+		"embedding_model": EMBEDDING_FUNCTION.model_name,
+		"chunk_size": chunk_size,
+		"chunk_overlap": chunk_overlap
+	}
+	if dedup_settings() is not None:
+		settings["dedup"] = dedup_settings()
+
+	if not index_exists and not pdf_files and os.path.exists(os.path.join(index_path, "index.pkl")):
+		raise FileNotFoundError(f"{index_path} has index.pkl but no index.faiss, and there are no PDFs in {document_path} to rebuild it from")
+	if index_exists and (manifest is None or not pdf_files):
+		# Legacy index without a manifest, or no PDFs to compare against: serve the index as-is
+		if manifest is None:
+			print(f"No manifest in {index_path}; its embedding model and chunk parameters cannot be verified.")
+			if pdf_files:
+				print(f"Delete the collection to rebuild it with incremental updates.\n")
+		print(f"Loading existing FAISS vector store from {index_path}...\n")
+		faiss_store = load_faiss_index(index_path, contents=contents)
+		if manifest is not None:
+			verify_snapshot(index_path, manifest, faiss_store, settings)
+		return finish_snapshot(faiss_store, index_path, manifest, contents)
+
+	if manifest is not None and (manifest.get("version") != MANIFEST_VERSION or not index_exists):
+		# An outdated manifest, or one left behind by a deleted index.faiss: rebuild every PDF
+		manifest = None
+	checkpoint = BuildCheckpoint.open(f"{index_path}{CHECKPOINT_SUFFIX}", settings, manifest)
+	dedup_index = build_dedup_index(checkpoint.files, pdf_files) if "dedup" in settings else None
+
+	pending = PendingBatch()
+	for file_name in pdf_files:
+		path = os.path.join(document_path, file_name)
+		fingerprint = file_fingerprint(path)
+		entry = checkpoint.files.get(file_name, {"pages": {}})
+		if entry.get("fingerprint") == fingerprint:
+			continue
+		print(f"Scanning {path} for changed pages...")
+		seen_pages = set()
+		known_hashes = {page_key: page["hash"] for page_key, page in entry["pages"].items()}
+		for page_number, digest, chunks in iter_parsed_pages(path, settings, known_hashes, workers):
+			page_key = str(page_number)
+			seen_pages.add(page_key)
+			if chunks is None:
+				continue
+			queue_page(pending, dedup_index, file_name, page_number, digest, chunks, entry["pages"].get(page_key))
+			if len(pending) >= batch_size:
+				pending.flush(checkpoint)
+		# Pages past the end of a shortened PDF
+		removed_pages = [page_key for page_key in entry["pages"] if page_key not in seen_pages]
+		pending.finish_file(
+			file_name,
+			fingerprint,
+			removed_pages,
+			[chunk_id for page_key in removed_pages for chunk_id in entry["pages"][page_key]["ids"]]
+		)
+	# PDFs removed from the corpus
+	for file_name, entry in list(checkpoint.files.items()):
+		if file_name not in pdf_files:
+			pending.remove_file(file_name, [chunk_id for page in entry["pages"].values() for chunk_id in page["ids"]])
+	pending.flush(checkpoint)
+	# Pages whose chunks were dropped as duplicates of chunks that have since been removed
+	while dedup_index is not None and orphaned_pages(checkpoint.files):
+		# Forget chunks of removed pages and PDFs so they are not matched again
+		dedup_index = build_dedup_index(checkpoint.files, pdf_files)
+		for file_name, page_keys in orphaned_pages(checkpoint.files).items():
+			entry = checkpoint.files[file_name]
+			print(f"Re-splitting {len(page_keys)} pages of {file_name} whose duplicate chunks lost their original...")
+			known_hashes = {page_key: page["hash"] for page_key, page in entry["pages"].items() if page_key not in page_keys}
+			for page_number, digest, chunks in iter_parsed_pages(os.path.join(document_path, file_name), settings, known_hashes, workers):
+				if chunks is not None:
+					queue_page(pending, dedup_index, file_name, page_number, digest, chunks, entry["pages"].get(str(page_number)))
+					if len(pending) >= batch_size:
+						pending.flush(checkpoint)
+		pending.flush(checkpoint)
+	if dedup_index is not None:
+		duplicate_chunks, duplicate_bytes = dedup_stats(checkpoint.files)
+		print(f"Near-duplicate chunks kept out of the index: {duplicate_chunks} ({duplicate_bytes / 1024:.1f} KB of text)\n")
+
+	faiss_store = commit_checkpoint(checkpoint, index_path, index_exists, manifest, contents)
+	if checkpoint.stale_ids or checkpoint.batches or manifest is None or checkpoint.files != manifest["files"] or "index" not in manifest:
+		manifest = {
+			"version": MANIFEST_VERSION,
+			"settings": settings,
+			"index": snapshot_info(index_path, faiss_store),
+			"files": checkpoint.files
+		}
+		save_manifest(index_path, manifest)
+	checkpoint.remove()
+	return finish_snapshot(faiss_store, index_path, manifest, contents)
+
+def finish_snapshot(faiss_store: FAISS, index_path: str, manifest: dict = None, contents: dict = None) -> FAISS:
+	"""
+	Purpose: Prepare a synced collection for serving
+	Input:
+		- faiss_store: Synced FAISS vector store
+		- index_path: Collection directory
+		- manifest: Committed manifest, or None for a legacy index
+		- contents: Table of contents the chunks are annotated with
+	Output: The FAISS vector store with a frozen docstore, its snapshot_id and its sentence_index
+	Processing: With CONTEXT_COMPRESSION, the sentences of a new snapshot are embedded here, at ingestion;
+		the sentence index of an unchanged snapshot is only memory-mapped (sentence_index is None otherwise)
+	"""
+	freeze_docstore(faiss_store, index_path, contents)
+	faiss_store.snapshot_id = snapshot_id(index_path, manifest)
+	faiss_store.sentence_index = load_sentence_index(faiss_store, os.path.dirname(index_path), contents) if CONTEXT_COMPRESSION else None
+	return faiss_store
+
+def parse_corpus(
+	document_path: str,
+	chunk_size: int = 200,
+	chunk_overlap: int = 50,
+	workers: int = INGESTION_WORKERS
+) -> list:
+	"""
+	Purpose: Split every PDF into cleaned chunks without embedding them
+	Input:
+		- document_path: Path to directory containing PDF files
+		- chunk_size, chunk_overlap: Splitter parameters in tokens (same as the FAISS build)
+		- workers: Number of processes parsing and splitting page ranges
+	Output: List of Document chunks in corpus order
+	Processing: Used to serve lexical-only retrieval while the FAISS index is still being built;
+	            near-duplicate chunks are dropped as in the FAISS build
+	"""
+	settings = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+	chunks = []
+	for file_name in list_pdf_files(document_path):
+		for _, _, page_chunks in iter_parsed_pages(os.path.join(document_path, file_name), settings, {}, workers):
+			chunks.extend(page_chunks)
+	return dedup_chunks(chunks)
+
+def commit_checkpoint(
+	checkpoint: BuildCheckpoint,
+	index_path: str,
+	index_exists: bool,
+	manifest: dict = None,
+	contents: dict = None
+) -> FAISS:
+	"""
+	Purpose: Apply a finished checkpoint to the FAISS collection
+	Input:
+		- checkpoint: BuildCheckpoint whose pages are all embedded
+		- index_path: Collection directory
+		- index_exists: Whether a committed index is present
+		- manifest: Manifest of the committed index, used to verify it when nothing changes
+		- contents: Table of contents the served docstore is annotated with
+	Output: Updated FAISS vector store
+	Processing:
+		1. Removes stale ids (skipping ids already gone, so a retried commit is safe)
+		2. Appends each checkpointed batch (skipping ids already present)
+		3. Saves the index if anything changed
+	"""
+	faiss_store = None
+	if index_exists:
+		print(f"Loading existing FAISS vector store from {index_path}...\n")
+		writable = bool(checkpoint.stale_ids or checkpoint.batches)
+		faiss_store = load_faiss_index(index_path, writable=writable, contents=contents)
+		if manifest is not None and not writable:
+			# A resumed commit may have saved the index but not the manifest, so only verify untouched snapshots
+			verify_snapshot(index_path, manifest, faiss_store)
+	changed = False
+	if faiss_store is not None:
+		present = set(faiss_store.index_to_docstore_id.values())
+		stale_ids = [chunk_id for chunk_id in dict.fromkeys(checkpoint.stale_ids) if chunk_id in present]
+		if stale_ids:
+			print(f"Removing {len(stale_ids)} stale chunks...")
+			faiss_store.delete(stale_ids)
+			changed = True
+	for texts, metadatas, ids, vectors in checkpoint.iter_batches():
+		if faiss_store is not None:
+			keep = [i for i, chunk_id in enumerate(ids) if chunk_id not in faiss_store.docstore._dict]
+			texts, metadatas, ids = [texts[i] for i in keep], [metadatas[i] for i in keep], [ids[i] for i in keep]
+			vectors = vectors[keep]
+		if not ids:
+			continue
+		text_embeddings = list(zip(texts, vectors.tolist()))
+		if faiss_store is None:
+			faiss_store = FAISS.from_embeddings(text_embeddings, EMBEDDING_FUNCTION, metadatas=metadatas, ids=ids)
+		else:
+			faiss_store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+		changed = True
+	if faiss_store is None:
+		raise FileNotFoundError(f"No PDF documents found in {os.path.dirname(index_path)} and no index at {index_path}")
+	if changed:
+		print(f"Saving FAISS vector store to {index_path}...\n")
+		save_faiss_vector_store(faiss_store, index_path)
+	return faiss_store
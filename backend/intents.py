@@ -0,0 +1,114 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+
+COMMON_QUESTIONS_PATH = "/app/data/swebok/common.json"
+INTENT_SIMILARITY_THRESHOLD = 0.70
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Purpose: Scale every row of a matrix to unit length
+    Input: matrix: 2D float array
+    Output: float32 matrix whose rows have L2 norm 1 (zero rows stay zero)
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class IntentMatcher:
+    """
+    Purpose: Match questions to the predefined intents in common.json
+    Processing:
+        - Intent embeddings are kept as one pre-normalized float32 matrix
+        - The matrix is cached as <name>.npy next to the JSON and rebuilt when the JSON changes
+        - All intents are scored for a batch of questions with a single matmul
+    """
+
+    def __init__(self, tags: list, matrix: np.ndarray, source_stat: tuple = None):
+        self.tags = tags
+        self.matrix = matrix
+        self.source_stat = source_stat
+
+    @staticmethod
+    def cache_paths(json_path: str) -> tuple:
+        """Return the (.npy matrix, .tags.json metadata) paths stored next to json_path."""
+        base = os.path.splitext(json_path)[0]
+        return f"{base}.npy", f"{base}.tags.json"
+
+    @classmethod
+    def load(cls, json_path: str = COMMON_QUESTIONS_PATH) -> "IntentMatcher":
+        """
+        Purpose: Load the intent matrix, rebuilding the .npy cache if the JSON changed
+        Input: json_path: Path to the common questions JSON file
+        Output: IntentMatcher instance
+        Processing:
+            1. Hashes the raw JSON bytes
+            2. Loads the cached matrix when its recorded hash matches
+            3. Otherwise parses the JSON, normalizes the embeddings and rewrites the cache
+        """
+        stat = os.stat(json_path)
+        with open(json_path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        npy_path, meta_path = cls.cache_paths(json_path)
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta["source_sha256"] == digest:
+                matrix = np.load(npy_path)
+                if matrix.shape[0] == len(meta["tags"]):
+                    return cls(meta["tags"], matrix, (stat.st_mtime_ns, stat.st_size))
+        except (OSError, ValueError, KeyError):
+            pass
+
+        print(f"Building intent matrix from {json_path}...")
+        questions = json.loads(raw)
+        tags = [item["tag"] for item in questions]
+        matrix = normalize_rows([item["embedding"] for item in questions])
+        try:
+            np.save(npy_path, matrix)
+            with open(meta_path, 'w') as f:
+                json.dump({
+                    "source_sha256": digest,
+                    "tags": tags,
+                    "questions": [item["question"] for item in questions]
+                }, f, indent=2)
+        except OSError as e:
+            print(f"Could not persist intent matrix: {e}")
+        return cls(tags, matrix, (stat.st_mtime_ns, stat.st_size))
+
+    def match_embeddings(self, embeddings, threshold: float = INTENT_SIMILARITY_THRESHOLD) -> list:
+        """
+        Purpose: Find the best matching intent tag for each query embedding
+        Input:
+            - embeddings: Query embeddings, shape (n, dim) or (dim,)
+            - threshold: Cosine similarity a match must exceed
+        Output: List of tags (None where no intent is similar enough)
+        """
+        queries = normalize_rows(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        scores = queries @ self.matrix.T
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(best)), best]
+        return [self.tags[i] if score > threshold else None for i, score in zip(best, best_scores)]
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+def get_intent_matcher(json_path: str = COMMON_QUESTIONS_PATH) -> IntentMatcher:
+    """
+    Purpose: Return the process-wide IntentMatcher, reloading it if the JSON changed
+    Input: json_path: Path to the common questions JSON file
+    Output: IntentMatcher instance
+    """
+    global _matcher
+    stat = os.stat(json_path)
+    matcher = _matcher
+    if matcher is None or matcher.source_stat != (stat.st_mtime_ns, stat.st_size):
+        with _matcher_lock:
+            if _matcher is None or _matcher.source_stat != (stat.st_mtime_ns, stat.st_size):
+                _matcher = IntentMatcher.load(json_path)
+            matcher = _matcher
+    return matcher
@@ -0,0 +1,201 @@
+import os
+import re
+import json
+import shutil
+from collections import Counter
+import numpy as np
+
+LEXICAL_DIRECTORY = "lexical"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset("""
+a an and are as at be by can do does for from has have how in is it its of on or
+that the their this to was what when where which who why will with you your
+""".split())
+
+def tokenize(text: str) -> list:
+    """
+    Purpose: Split text into lowercase alphanumeric terms for the lexical index
+    Input: text: String to tokenize
+    Output: List of terms with stop words removed
+    """
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if term not in STOP_WORDS]
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """
+    Purpose: Fuse several ranked lists of ids with reciprocal rank fusion
+    Input:
+        - rankings: List of ranked id lists (best first)
+        - k: RRF damping constant
+    Output: List of (id, fused_score) tuples, best first
+    Processing: Each list adds 1 / (k + rank) to the score of every id it contains
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+class LexicalIndex:
+    """
+    Purpose: On-disk BM25 inverted index whose rows line up with the FAISS index
+    Processing:
+        - Postings are stored as flat arrays (doc rows and term frequencies) sliced by per-term offsets
+        - IDF and document lengths are precomputed at build time
+        - Arrays are memory-mapped on load, so startup never re-tokenizes the corpus
+    """
+
+    def __init__(self, vocab: list, offsets, docs, freqs, idf, doc_lengths, k1: float = 1.5, b: float = 0.75, fingerprint: str = None):
+        self.fingerprint = fingerprint
+        self.term_ids = {term: i for i, term in enumerate(vocab)}
+        self.offsets = offsets
+        self.docs = docs
+        self.freqs = freqs
+        self.idf = idf
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, texts: list, k1: float = 1.5, b: float = 0.75, fingerprint: str = None) -> "LexicalIndex":
+        """
+        Purpose: Build an inverted index from chunk texts
+        Input:
+            - texts: Chunk texts in FAISS row order
+            - k1, b: BM25 parameters
+            - fingerprint: Identifies the row order the index was built for
+        Output: LexicalIndex held in memory
+        """
+        vocab = {}
+        term_rows, doc_rows, freq_rows, doc_lengths = [], [], [], []
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                term_rows.append(vocab.setdefault(term, len(vocab)))
+                doc_rows.append(row)
+                freq_rows.append(count)
+
+        # Renumber terms alphabetically and group postings by term
+        terms = sorted(vocab)
+        remap = np.empty(len(vocab), dtype=np.int64)
+        remap[[vocab[term] for term in terms]] = np.arange(len(terms))
+        term_rows = remap[np.asarray(term_rows, dtype=np.int64)]
+        doc_rows = np.asarray(doc_rows, dtype=np.int32)
+        order = np.lexsort((doc_rows, term_rows))
+        document_frequency = np.bincount(term_rows, minlength=len(terms))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=offsets[1:])
+
+        num_docs = len(texts)
+        idf = np.log1p((num_docs - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        return cls(
+            terms,
+            offsets,
+            doc_rows[order],
+            np.asarray(freq_rows, dtype=np.float32)[order],
+            idf,
+            np.asarray(doc_lengths, dtype=np.float32),
+            k1,
+            b,
+            fingerprint
+        )
+
+    def save(self, path: str) -> None:
+        """
+        Purpose: Persist the index arrays to a directory
+        Input: path: Target directory (replaced atomically)
+        """
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        vocab = sorted(self.term_ids, key=self.term_ids.get)
+        with open(os.path.join(tmp_path, "vocab.json"), 'w') as f:
+            json.dump(vocab, f)
+        with open(os.path.join(tmp_path, "meta.json"), 'w') as f:
+            json.dump({"k1": self.k1, "b": self.b, "num_docs": self.num_docs, "fingerprint": self.fingerprint}, f)
+        np.save(os.path.join(tmp_path, "offsets.npy"), self.offsets)
+        np.save(os.path.join(tmp_path, "docs.npy"), self.docs)
+        np.save(os.path.join(tmp_path, "freqs.npy"), self.freqs)
+        np.save(os.path.join(tmp_path, "idf.npy"), self.idf)
+        np.save(os.path.join(tmp_path, "doc_lengths.npy"), self.doc_lengths)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        """
+        Purpose: Load a persisted index by memory-mapping its arrays
+        Input: path: Directory written by save()
+        Output: LexicalIndex backed by read-only memory maps
+        """
+        with open(os.path.join(path, "vocab.json"), 'r') as f:
+            vocab = json.load(f)
+        with open(os.path.join(path, "meta.json"), 'r') as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+            for name in ("offsets", "docs", "freqs", "idf", "doc_lengths")
+        }
+        return cls(vocab, k1=meta["k1"], b=meta["b"], fingerprint=meta.get("fingerprint"), **arrays)
+
+    def search(self, query: str, k: int, min_coverage: float = 0.0, rows: np.ndarray = None) -> list:
+        """
+        Purpose: Rank index rows against a query with BM25
+        Input:
+            - query: Query string
+            - k: Number of rows to return
+            - min_coverage: Minimum fraction of the query terms a row must contain
+            - rows: Optional array of rows to restrict the ranking to (eg: one chapter)
+        Output: List of (row, bm25_score) tuples, best first, scores above zero only
+        """
+        query_terms = set(tokenize(query))
+        if self.num_docs == 0 or k <= 0 or not query_terms:
+            return []
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        matched = np.zeros(self.num_docs, dtype=np.int32)
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_doc_length, 1e-9))
+        for term in query_terms:
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            term_rows = self.docs[start:end]
+            freqs = self.freqs[start:end]
+            scores[term_rows] += self.idf[term_id] * freqs * (self.k1 + 1) / (freqs + length_norm[term_rows])
+            matched[term_rows] += 1
+        scores[matched < min_coverage * len(query_terms)] = 0
+        if rows is not None:
+            allowed = np.zeros(self.num_docs, dtype=bool)
+            allowed[rows] = True
+            scores[~allowed] = 0
+        k = min(k, self.num_docs)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top if scores[row] > 0]
+
+def load_or_create_lexical_index(texts_by_row, persist_directory: str, fingerprint: str) -> LexicalIndex:
+    """
+    Purpose: Load the persisted lexical index or build it from the served chunks
+    Input:
+        - texts_by_row: Callable returning chunk texts in FAISS row order (only called on build)
+        - persist_directory: Directory holding faiss_indexes (the index is stored next to the collection)
+        - fingerprint: Hash of the FAISS row order, used to detect a stale lexical index
+    Output: LexicalIndex
+    """
+    index_path = os.path.join(persist_directory, LEXICAL_DIRECTORY)
+    if os.path.exists(index_path):
+        lexical_index = LexicalIndex.load(index_path)
+        if lexical_index.fingerprint == fingerprint:
+            print(f"Loaded lexical index from {index_path}...\n")
+            return lexical_index
+        print(f"Lexical index at {index_path} is stale, rebuilding...\n")
+    else:
+        print(f"Creating lexical index in {index_path}...\n")
+    lexical_index = LexicalIndex.build(texts_by_row(), fingerprint=fingerprint)
+    lexical_index.save(index_path)
+    return lexical_index
@@ -0,0 +1,77 @@
+import re
+from typing import NamedTuple
+from .abb import abbreviations
+
+# One alternation over every abbreviation, longest first so "KLOC" wins over "LOC"; an abbreviation only
+# matches as a whole token (or its plural, eg: "ADs"), never inside another word
+ABBREVIATION_PATTERN = re.compile(
+    r"(?<![A-Za-z0-9])(?:"
+    + "|".join(re.escape(abbrev) for abbrev in sorted(abbreviations, key=len, reverse=True))
+    + r")(?=s?(?![A-Za-z0-9]))"
+)
+NON_ALPHA_PATTERN = re.compile(r"[^\w\s]|[\d_]")  # Everything but letters and whitespace, for ASCII text
+COURSE_CODE_PATTERN = re.compile(r"(?:what\s+is\s+)?[A-Z]{2,4}\s\d{3,4}")  # eg: "CS 101", not a SWEBOK question
+INCOMPLETE_QUESTIONS = frozenset([
+    "what", "whatis", "what's", "explain",
+    "how", "howdoes", "howis", "when", "whenis", "why", "whyis", "who", "whois"
+])
+MAX_QUESTION_CHARS = 200
+
+class NormalizedQuestion(NamedTuple):
+    """The forms of a user question the pipeline searches with."""
+    valid: bool  # False for empty, incomplete, too long or course-code questions
+    expanded: str  # Question with its lead rephrased and abbreviations spelled out
+    sanitized: str  # Expanded question without digits or punctuation
+
+def sanitize(text: str) -> str:
+    """Remove every character that is not a letter or whitespace."""
+    sanitized = NON_ALPHA_PATTERN.sub("", text)
+    if sanitized.isascii():
+        return sanitized
+    # \w also matches numerics that are not decimal digits (eg: "²", "½", "Ⅻ"), which are not letters either
+    return "".join(char for char in sanitized if char.isalpha() or char.isspace())
+
+def is_valid_question(question: str) -> bool:
+    """
+    Purpose: Verify if a question is valid for processing
+    Input: question: Raw user question
+    Output: False for course codes, bare question words, and questions with no letters or over 200 letters
+    """
+    if COURSE_CODE_PATTERN.match(question):
+        return False
+    cleaned_question = question.lower().strip().replace(" ", "")
+    sanitized_question = sanitize(question).replace(" ", "").lower()
+    if cleaned_question in INCOMPLETE_QUESTIONS or sanitized_question in INCOMPLETE_QUESTIONS:
+        return False
+    return 0 < len(sanitized_question) <= MAX_QUESTION_CHARS
+
+def expand_question(question: str) -> str:
+    """
+    Purpose: Rephrase the question lead and spell out abbreviations
+    Input: question: User question
+    Output: Question starting with "Explain"/"What is" (how/when/why/who questions are kept), abbreviations
+        replaced by their full forms from backend/abb.py and words separated by single spaces
+    """
+    lowered = question.lower()
+    if not lowered.startswith(("how", "when", "why", "who")):
+        if lowered.startswith("what is"):
+            question = "Explain" + question[7:]
+        elif lowered.startswith("what's"):
+            question = "Explain" + question[6:]
+        elif lowered.startswith("explain"):
+            question = "What is" + question[7:]
+        else:
+            question = "What is " + question
+    expanded = ABBREVIATION_PATTERN.sub(lambda match: abbreviations[match.group()], question)
+    return " ".join(expanded.split())
+
+def normalize_question(question: str) -> NormalizedQuestion:
+    """
+    Purpose: Produce every normalized form of a user question at once
+    Input: question: Raw user question
+    Output: NormalizedQuestion
+    Processing: Validates the raw question, then expands the stripped question with one regex pass and
+        sanitizes the expansion; all patterns are compiled once at import
+    """
+    expanded = expand_question(question.strip())
+    return NormalizedQuestion(is_valid_question(question), expanded, sanitize(expanded))
@@ -0,0 +1,127 @@
+import json
+import hashlib
+from functools import lru_cache
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Pages handed to a worker process at a time
+PAGES_PER_TASK = 16
+
+def clean_text(text: str) -> str:
+	"""
+	Purpose: Clean text by removing unwanted special characters
+	Input: text: String to be cleaned
+	Output: Cleaned string containing only alphanumeric chars and basic punctuation
+	Processing: Filters string to keep only allowed characters
+	"""
+	return ''.join(char for char in text if char.isalpha() or char.isspace() or char.isnumeric() or char in '.,!?\'";:()')
+
+@lru_cache(maxsize=None)
+def get_text_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+	"""
+	Purpose: Build (once per process) the tiktoken-based splitter for the given chunk params
+	Input: chunk_size, chunk_overlap: Splitter parameters in tokens
+	Output: RecursiveCharacterTextSplitter
+	"""
+	return RecursiveCharacterTextSplitter.from_tiktoken_encoder(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+def count_pdf_pages(path: str) -> int:
+	"""Return the number of pages in a PDF."""
+	return len(PdfReader(path).pages)
+
+def iter_pdf_pages(path: str, start: int = 0, stop: int = None):
+	"""
+	Purpose: Lazily extract the text of a range of pages of a PDF
+	Input:
+		- path: Path to a PDF file
+		- start, stop: Page range (defaults to the whole file)
+	Output: Generator of (page_number, text) tuples
+	"""
+	reader = PdfReader(path)
+	stop = len(reader.pages) if stop is None else min(stop, len(reader.pages))
+	for page_number in range(start, stop):
+		yield page_number, reader.pages[page_number].extract_text().strip()
+
+def page_hash(text: str, settings: dict) -> str:
+	"""
+	Purpose: Hash a page together with everything that shapes its chunks and vectors
+	Input:
+		- text: Extracted page text
+		- settings: Chunk parameters and embedding model name
+	Output: Hex SHA-256 digest
+	"""
+	payload = json.dumps([settings, text], sort_keys=True)
+	return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def split_page(text: str, source: str, page: int, text_splitter: RecursiveCharacterTextSplitter) -> list:
+	"""
+	Purpose: Split one page into cleaned chunks
+	Input:
+		- text: Page text
+		- source: Path of the PDF the page belongs to
+		- page: Zero-based page number
+		- text_splitter: Configured splitter
+	Output: List of Document chunks
+	"""
+	chunks = text_splitter.create_documents([text], [{"source": source, "page": page}])
+	for chunk in chunks:
+		chunk.page_content = clean_text(chunk.page_content)
+		chunk.metadata["cleaned"] = True
+	return chunks
+
+def parse_page_range(path: str, start: int, stop: int, settings: dict, known_hashes: dict) -> list:
+	"""
+	Purpose: Parse, hash and split a range of pages (runs in a worker process)
+	Input:
+		- path: Path to a PDF file
+		- start, stop: Page range to parse
+		- settings: Chunk parameters and embedding model name
+		- known_hashes: {page_key: hash} of pages already indexed; those are not split again
+	Output: List of (page_number, digest, chunks) tuples; chunks is None for unchanged pages
+	"""
+	text_splitter = get_text_splitter(settings["chunk_size"], settings["chunk_overlap"])
+	results = []
+	for page_number, text in iter_pdf_pages(path, start, stop):
+		digest = page_hash(text, settings)
+		if known_hashes.get(str(page_number)) == digest:
+			results.append((page_number, digest, None))
+		else:
+			results.append((page_number, digest, split_page(text, path, page_number, text_splitter)))
+	return results
+
+def iter_parsed_pages(path: str, settings: dict, known_hashes: dict, workers: int = 1, pages_per_task: int = PAGES_PER_TASK):
+	"""
+	Purpose: Stream the parsed pages of a PDF in page order, optionally from a process pool
+	Input:
+		- path: Path to a PDF file
+		- settings: Chunk parameters and embedding model name
+		- known_hashes: {page_key: hash} of pages already indexed
+		- workers: Number of worker processes (1 parses in this process)
+		- pages_per_task: Size of the page range given to each worker task
+	Output: Generator of (page_number, digest, chunks) tuples in page order
+	Processing:
+		1. Splits the PDF into page ranges
+		2. Keeps at most 2 * workers ranges in flight so memory stays bounded
+		3. Yields results strictly in page order, so chunk ids are identical to a serial run
+	"""
+	num_pages = count_pdf_pages(path)
+	ranges = [(start, min(start + pages_per_task, num_pages)) for start in range(0, num_pages, pages_per_task)]
+	if workers <= 1:
+		for start, stop in ranges:
+			yield from parse_page_range(path, start, stop, settings, known_hashes)
+		return
+	with ProcessPoolExecutor(max_workers=workers) as executor:
+		in_flight = deque()
+		ranges = iter(ranges)
+		for start, stop in ranges:
+			in_flight.append(executor.submit(parse_page_range, path, start, stop, settings, known_hashes))
+			if len(in_flight) >= 2 * workers:
+				break
+		while in_flight:
+			results = in_flight.popleft().result()
+			for start, stop in ranges:
+				in_flight.append(executor.submit(parse_page_range, path, start, stop, settings, known_hashes))
+				break
+			yield from results
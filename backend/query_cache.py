@@ -0,0 +1,175 @@
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+import numpy as np
+
+# Process-wide cache limits
+MAX_CACHE_ENTRIES = 2048
+MAX_CACHE_BYTES = 64 * 1024 * 1024  # 64 MB
+HIT_ENTRY_BYTES = 64  # Approximate cost of one cached (Document, score) pair
+
+def normalize_query(text: str) -> str:
+    """
+    Purpose: Normalize query text so equivalent questions share cache entries
+    Input: text: Raw query string
+    Output: Query with surrounding whitespace stripped and inner whitespace collapsed
+    Processing: Splits on whitespace and joins with single spaces
+    """
+    return " ".join(text.split())
+
+class QueryCache:
+    """
+    Purpose: Thread-safe LRU cache for query embeddings and FAISS hit lists
+    Processing:
+        - Entries are evicted least-recently-used first
+        - The cache is bounded both by entry count and by approximate size in bytes
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHE_ENTRIES, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value for key (marking it recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        """Store value under key and evict old entries until both limits hold."""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+QUERY_CACHE = QueryCache()
+
+class QueryContext:
+    """
+    Purpose: Per-request state shared by every retrieval step of one chat_completion call
+    Processing:
+        - Embeds each distinct (normalized) text at most once per request
+        - Falls back to the process-wide QUERY_CACHE before running the embedding model
+        - Collects counters and timings for the request in `trace`
+    """
+
+    def __init__(self, embedding_function: Any, cache: QueryCache = QUERY_CACHE):
+        self.embedding_function = embedding_function
+        self.cache = cache
+        self._embeddings = {}
+        self.trace = {
+            "embeddings_computed": 0,
+            "embedding_cache_hits": 0,
+            "search_cache_hits": 0,
+            "searches": 0,
+            "rewrite_cache_hits": 0,
+            "rewrite_cache_misses": 0,
+            "timings_ms": {},
+        }
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Add the wall-clock time spent inside the block to trace["timings_ms"][stage]."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings = self.trace["timings_ms"]
+            timings[stage] = round(timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000, 3)
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Purpose: Return the query embedding for text
+        Input: text: Query string
+        Output: float32 embedding vector
+        Processing: Checks the request-local map, then the shared cache, then embeds
+        """
+        key = normalize_query(text)
+        embedding = self._embeddings.get(key)
+        if embedding is not None:
+            return embedding
+        embedding = self.cache.get(("embedding", key))
+        if embedding is not None:
+            self.trace["embedding_cache_hits"] += 1
+        else:
+            with self.timer("embed"):
+                embedding = np.asarray(self.embedding_function.embed_query(key), dtype=np.float32)
+            self.trace["embeddings_computed"] += 1
+            self.cache.put(("embedding", key), embedding, embedding.nbytes + len(key))
+        self._embeddings[key] = embedding
+        return embedding
+
+    def search(
+        self,
+        text: str,
+        store_token: Hashable,
+        k: int,
+        search_fn: Callable[[np.ndarray], List[Tuple[Any, float]]]
+    ) -> List[Tuple[Any, float]]:
+        """
+        Purpose: Return the raw hit list for text, reusing cached results
+        Input:
+            - text: Query string
+            - store_token: Identifies the vector store the hits belong to
+            - k: Number of hits requested
+            - search_fn: Runs the actual search given the query embedding
+        Output: List of (Document, distance) tuples
+        """
+        key = ("hits", normalize_query(text), store_token, k)
+        self.trace["searches"] += 1
+        hits = self.cache.get(key)
+        if hits is not None:
+            self.trace["search_cache_hits"] += 1
+            return hits
+        hits = search_fn(self.embed(text))
+        self.cache.put(key, hits, len(hits) * HIT_ENTRY_BYTES + len(key[1]))
+        return hits
+
+    def fork(self) -> "QueryContext":
+        """
+        Purpose: Create a context for one thread of a fanned-out search (eg: one shard)
+        Output: QueryContext sharing the cache and the embeddings computed so far, with its own trace
+        Processing: Embed the query before forking so no fork has to embed it again
+        """
+        child = QueryContext(self.embedding_function, self.cache)
+        child._embeddings = dict(self._embeddings)
+        return child
+
+    def absorb(self, label: str, child: "QueryContext") -> None:
+        """Add the counters of a forked context to this trace and keep its timings under trace["forks"][label]."""
+        for name, value in child.trace.items():
+            if name != "timings_ms" and isinstance(value, int):
+                self.trace[name] = self.trace.get(name, 0) + value
+        self.trace.setdefault("forks", {})[label] = child.trace["timings_ms"]
+
+def store_token(vector_store: Any) -> Optional[Hashable]:
+    """
+    Purpose: Build the cache token that ties cached hits to one vector store
+    Input: vector_store: FAISS vector store
+    Output: Hashable token; changes whenever a different snapshot is served
+    """
+    return getattr(vector_store, "snapshot_id", None) or id(vector_store)
@@ -0,0 +1,93 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+
+# Persistent cache of LLM question rewrites (temperature 0, so a rewrite only depends on its input)
+REWRITE_CACHE_PATH = os.getenv("REWRITE_CACHE_PATH", "rewrite_cache.db")
+REWRITE_CACHE_TTL = float(os.getenv("REWRITE_CACHE_TTL", 30 * 24 * 3600))  # Seconds a rewrite stays valid
+REWRITE_CACHE_MAX_ENTRIES = int(os.getenv("REWRITE_CACHE_MAX_ENTRIES", 10000))
+
+def rewrite_key(text: str, prompt_hash: str, model_name: str) -> str:
+    """
+    Purpose: Build the cache key of a rewrite
+    Input:
+        - text: Question sent to the rewrite model
+        - prompt_hash: Hash of the rewrite prompt template
+        - model_name: Rewrite model
+    Output: Hex SHA-256 of the model, prompt hash and case- and whitespace-normalized text
+    """
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha256(f"{model_name}\0{prompt_hash}\0{normalized}".encode("utf-8")).hexdigest()
+
+class RewriteCache:
+    """
+    Purpose: Thread-safe SQLite cache of question rewrites shared by every worker on the host
+    Processing:
+        - Entries older than ttl seconds are ignored and deleted on lookup
+        - Above max_entries, the least recently used entries are deleted (checked on every insert)
+        - A failing database never fails a request: errors are logged and treated as misses
+    """
+
+    def __init__(self, path: str = REWRITE_CACHE_PATH, ttl: float = REWRITE_CACHE_TTL, max_entries: int = REWRITE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS rewrites ("
+                "key TEXT PRIMARY KEY, rewrite TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS rewrites_last_used ON rewrites (last_used)")
+            self._connection.commit()
+        return self._connection
+
+    def get(self, key: str) -> str:
+        """Return the cached rewrite for key (marking it recently used), or None if missing or expired."""
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                row = connection.execute("SELECT rewrite, created FROM rewrites WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if now - row[1] > self.ttl:
+                    connection.execute("DELETE FROM rewrites WHERE key = ?", (key,))
+                    connection.commit()
+                    return None
+                connection.execute("UPDATE rewrites SET last_used = ? WHERE key = ?", (now, key))
+                connection.commit()
+                return row[0]
+        except sqlite3.Error as e:
+            print(f"Rewrite cache lookup failed: {e}")
+            return None
+
+    def put(self, key: str, rewrite: str) -> None:
+        """Store a rewrite, then delete expired entries and the least recently used ones above max_entries."""
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO rewrites (key, rewrite, created, last_used) VALUES (?, ?, ?, ?)",
+                    (key, rewrite, now, now)
+                )
+                connection.execute("DELETE FROM rewrites WHERE created < ?", (now - self.ttl,))
+                connection.execute(
+                    "DELETE FROM rewrites WHERE key IN (SELECT key FROM rewrites ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                connection.commit()
+        except sqlite3.Error as e:
+            print(f"Rewrite cache update failed: {e}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM rewrites").fetchone()[0]
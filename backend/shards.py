@@ -0,0 +1,178 @@
+import os
+import heapq
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from .faiss_indexes import SERVING_INDEX_NAME
+from .lexical import LEXICAL_DIRECTORY
+
+# Upper bound on the (approximate) size of the shards kept loaded at once
+SHARD_MEMORY_BUDGET_MB = float(os.getenv("SHARD_MEMORY_BUDGET_MB", 2048))
+# Threads the searches of one query fan out on
+SHARD_SEARCH_WORKERS = int(os.getenv("SHARD_SEARCH_WORKERS", 4))
+
+def shard_paths_from_env(value: str, data_directory: str) -> dict:
+    """
+    Purpose: Parse CORPUS_SHARDS into shard names and corpus directories
+    Input:
+        - value: Comma-separated corpus names (eg: "swebok,default") or directories
+        - data_directory: Directory that bare corpus names are resolved against
+    Output: {shard name: corpus directory}, in the order given
+    """
+    shards = {}
+    for entry in filter(None, (entry.strip() for entry in value.split(","))):
+        path = entry if os.sep in entry else os.path.join(data_directory, entry)
+        shards[os.path.basename(os.path.normpath(path))] = path
+    return shards
+
+def served_bytes(persist_directory: str, collection_name: str = "collection") -> int:
+    """
+    Purpose: Estimate the memory a loaded shard holds from the size of the files it serves
+    Input:
+        - persist_directory: Directory holding the shard's FAISS indexes
+        - collection_name: Name of the vector store collection
+    Output: Bytes of the served FAISS index, columnar docstore and lexical index
+    Processing: The flat index.faiss is not counted when a derived serving index replaces it
+    """
+    index_path = os.path.join(persist_directory, collection_name)
+    index_file = os.path.join(index_path, SERVING_INDEX_NAME)
+    if not os.path.exists(index_file):
+        index_file = os.path.join(index_path, "index.faiss")
+    total = os.path.getsize(index_file) if os.path.exists(index_file) else 0
+    for directory in (os.path.join(index_path, "docstore"), os.path.join(persist_directory, LEXICAL_DIRECTORY)):
+        if os.path.isdir(directory):
+            total += sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+    return total
+
+class ShardedIndex:
+    """
+    Purpose: Serve several corpora, one FAISS shard (and BM25 index) per corpus, behind one search call
+    Processing:
+        - Shards load lazily on their first query and stay cached in LRU order
+        - Least recently used shards are evicted once the loaded shards exceed the memory budget
+          (in-flight searches keep the snapshot they already hold)
+        - A shard without a FAISS index is built in a background thread and skipped until it is ready
+        - A shard whose files changed on disk (another process rebuilt it) is reloaded on its next use
+        - Queries fan out to every shard on a thread pool; per-shard hit lists are k-way merged
+    """
+
+    def __init__(
+        self,
+        shards: dict,
+        load_fn,
+        needs_build_fn,
+        signature_fn,
+        memory_budget_mb: float = SHARD_MEMORY_BUDGET_MB,
+        workers: int = SHARD_SEARCH_WORKERS
+    ):
+        """
+        Input:
+            - shards: {shard name: corpus directory}
+            - load_fn: Callable(corpus directory) -> IndexSnapshot, syncing the shard with its PDFs
+            - needs_build_fn: Callable(corpus directory) -> True when the shard has PDFs but no FAISS index yet
+            - signature_fn: Callable(corpus directory) -> tuple that changes when the shard is rebuilt on disk
+            - memory_budget_mb: Memory budget for loaded shards
+            - workers: Size of the search thread pool
+        """
+        self.shards = shards
+        self.load_fn = load_fn
+        self.needs_build_fn = needs_build_fn
+        self.signature_fn = signature_fn
+        self.memory_budget = memory_budget_mb * 2**20
+        self.loaded_bytes = 0
+        self._loaded = OrderedDict()  # name -> (snapshot, size in bytes, signature)
+        self._building = set()
+        self._lock = threading.Lock()
+        self._shard_locks = {name: threading.Lock() for name in shards}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(shards))), thread_name_prefix="shard")
+
+    def get(self, name: str):
+        """
+        Purpose: Return the snapshot of a shard, loading it if needed
+        Input: name: Shard name
+        Output: IndexSnapshot, or None while the shard's FAISS index is being built
+        """
+        document_path = self.shards[name]
+        signature = self.signature_fn(document_path)
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is not None and entry[2] == signature:
+                self._loaded.move_to_end(name)
+                return entry[0]
+            if name in self._building:
+                return None
+        if self.needs_build_fn(document_path):
+            with self._lock:
+                if name not in self._building:
+                    self._building.add(name)
+                    threading.Thread(target=self._build, args=(name,), daemon=True).start()
+            return None
+        # One load per shard at a time; other shards keep loading and searching in parallel
+        with self._shard_locks[name]:
+            with self._lock:
+                entry = self._loaded.get(name)
+                if entry is not None and entry[2] == signature:
+                    self._loaded.move_to_end(name)
+                    return entry[0]
+            return self._load(name, signature)
+
+    def _load(self, name: str, signature: tuple):
+        """Load a shard, insert it as most recently used and evict others down to the memory budget."""
+        document_path = self.shards[name]
+        print(f"Loading shard {name} from {document_path}...\n")
+        snapshot = self.load_fn(document_path)
+        size = served_bytes(os.path.join(document_path, "faiss_indexes"))
+        with self._lock:
+            old = self._loaded.pop(name, None)
+            if old is not None:
+                self.loaded_bytes -= old[1]
+            self._loaded[name] = (snapshot, size, signature)
+            self.loaded_bytes += size
+            while self.loaded_bytes > self.memory_budget and len(self._loaded) > 1:
+                evicted, (_, evicted_size, _) = self._loaded.popitem(last=False)
+                self.loaded_bytes -= evicted_size
+                print(f"Evicted shard {evicted} ({evicted_size / 2**20:.1f} MB) to stay within the shard memory budget\n")
+        return snapshot
+
+    def _build(self, name: str) -> None:
+        """Build a shard's missing FAISS index in the background; it is served from its next query on."""
+        try:
+            with self._shard_locks[name]:
+                self._load(name, None)
+            with self._lock:
+                # Record the on-disk signature of the fresh build so get() does not load it twice
+                entry = self._loaded.get(name)
+                if entry is not None:
+                    self._loaded[name] = (entry[0], entry[1], self.signature_fn(self.shards[name]))
+        except Exception as e:
+            print(f"Building shard {name} failed: {e}")
+        finally:
+            with self._lock:
+                self._building.discard(name)
+
+    def search(self, search_fn, k: int, key=None) -> tuple:
+        """
+        Purpose: Run one query against every shard and merge the hits
+        Input:
+            - search_fn: Callable(name, snapshot) -> hit list sorted best first
+            - k: Number of merged hits to return
+            - key: Sort key of a hit (defaults to its distance, hit[1])
+        Output: Tuple of (merged hits, names of the shards still building)
+        Processing: Each shard's list is already sorted, so heapq.merge picks the global top k lazily
+        """
+        key = key or (lambda hit: hit[1])
+
+        def search_shard(name):
+            snapshot = self.get(name)
+            return name, (None if snapshot is None else search_fn(name, snapshot))
+
+        results = list(self._pool.map(search_shard, self.shards))
+        building = [name for name, hits in results if hits is None]
+        merged = heapq.merge(*(hits for _, hits in results if hits), key=key)
+        return list(islice(merged, k)), building
+
+    def loaded(self) -> list:
+        """Return the names of the loaded shards, least recently used first."""
+        with self._lock:
+            return list(self._loaded)
@@ -178,6 +178,21 @@ def get_statistics(period="Daily"):
         })
         return stats
 
+def get_recurring_questions(limit: int, min_count: int = 2) -> List[str]:
+    """Return the most frequently asked questions (case-insensitive), skipping those whose answer was marked incorrect."""
+    with Session() as session:
+        normalized = func.lower(func.trim(Conversation.question))
+        rows = (
+            session.query(func.min(Conversation.question), func.count(Conversation.id))
+            .filter(Conversation.question.isnot(None), Conversation.correct.isnot(False))
+            .group_by(normalized)
+            .having(func.count(Conversation.id) >= min_count)
+            .order_by(func.count(Conversation.id).desc())
+            .limit(limit)
+            .all()
+        )
+        return [question.strip() for question, _ in rows]
+
 def calculate_confusion_matrix(conversations: List[Conversation]) -> Dict[str, int]:
     """Calculate confusion matrix values from conversations."""
     # True Positives (TP): The chatbot correctly answers an answerable question.
@@ -0,0 +1,64 @@
+"""
+Purpose: Compare PDF parsing + chunking wall-clock time of the serial loader and the parallel page-range pipeline
+Usage: python benchmarks/bench_ingestion.py [--corpora swebok default] [--workers 16]
+Processing:
+    1. Serial baseline: PyPDFDirectoryLoader(...).load_and_split() followed by the tiktoken splitter
+    2. Page pipeline in one process (workers=1)
+    3. Page pipeline on a process pool (workers=N)
+Embedding is not included; only the CPU-bound parse/split stage is timed.
+"""
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from langchain_community.document_loaders import PyPDFDirectoryLoader
+from backend.ingestion import list_pdf_files
+from backend.pdf_parsing import get_text_splitter, iter_parsed_pages
+
+CHUNK_SIZE = 200
+CHUNK_OVERLAP = 50
+
+def run_serial_loader(document_path: str) -> int:
+    """Run the original loader and return the number of chunks."""
+    documents = PyPDFDirectoryLoader(document_path).load_and_split()
+    return len(get_text_splitter(CHUNK_SIZE, CHUNK_OVERLAP).split_documents(documents))
+
+def run_page_pipeline(document_path: str, workers: int) -> int:
+    """Run the page-range pipeline and return the number of chunks."""
+    settings = {"embedding_model": "benchmark", "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+    num_chunks = 0
+    for file_name in list_pdf_files(document_path):
+        path = os.path.join(document_path, file_name)
+        for _, _, chunks in iter_parsed_pages(path, settings, {}, workers):
+            num_chunks += len(chunks)
+    return num_chunks
+
+def timed(fn, *args) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpora", nargs="+", default=["swebok", "default"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print(f"{'corpus':<10} {'mode':<22} {'chunks':>8} {'seconds':>9} {'speedup':>8}")
+    for corpus in args.corpora:
+        document_path = os.path.join(ROOT, "data", corpus)
+        if not list_pdf_files(document_path):
+            print(f"{corpus:<10} no PDFs in {document_path}, skipped")
+            continue
+        chunks, baseline = timed(run_serial_loader, document_path)
+        print(f"{corpus:<10} {'serial loader':<22} {chunks:>8} {baseline:>9.2f} {1.0:>8.2f}")
+        for workers in (1, args.workers):
+            chunks, seconds = timed(run_page_pipeline, document_path, workers)
+            print(f"{corpus:<10} {f'pipeline x{workers}':<22} {chunks:>8} {seconds:>9.2f} {baseline / seconds:>8.2f}")
+
+if __name__ == "__main__":
+    main()
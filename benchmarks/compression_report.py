@@ -0,0 +1,104 @@
+"""
+Purpose: Measure what extractive context compression saves and how it changes the answers on tests/questions.json
+Usage: python benchmarks/compression_report.py [--corpus swebok] [--ratios 0.3,0.5,0.7] [--k 4] [--answers]
+Processing:
+    1. Loads the served collection (columnar docstore) and builds or loads its sentence index
+    2. For every evaluation question, retrieves the top k chunks and assembles the context as serving does,
+       once uncompressed and once per keep ratio, and reports the mean context tokens and the reduction
+    3. With --answers, runs the full pipeline (needs MISTRAL_API_KEY) with compression off and on at the
+       configured COMPRESSION_KEEP_RATIO, and reports the prompt tokens and the accuracy of tests/test_questions.py
+       (answerable questions must not get the out-of-scope message, unanswerable ones must)
+"""
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def load_questions() -> dict:
+    """Return the answerable and unanswerable evaluation questions."""
+    with open(os.path.join(ROOT, "tests", "questions.json"), "r") as f:
+        question_sets = json.load(f)["questions"]
+    return {kind: [q for qs in question_sets for q in qs[kind] if q] for kind in ("answerable", "unanswerable")}
+
+def context_tokens(args) -> None:
+    """Report the context size with and without compression (no LLM calls)."""
+    from backend.chapters import CONTENTS_NAME, load_contents
+    from backend.ingestion import load_manifest, snapshot_id
+    from backend.context import build_context
+    from backend.document_loading import (
+        EMBEDDING_FUNCTION, context_passage, context_unit, freeze_docstore, load_faiss_index, load_sentence_index, similarity_search
+    )
+
+    corpus_path = os.path.join(ROOT, "data", args.corpus)
+    persist_directory = os.path.join(corpus_path, "faiss_indexes")
+    index_path = os.path.join(persist_directory, "collection")
+    contents = load_contents(os.path.join(corpus_path, CONTENTS_NAME))
+    faiss_store = load_faiss_index(index_path, contents=contents)
+    freeze_docstore(faiss_store, index_path, contents)
+    faiss_store.snapshot_id = snapshot_id(index_path, load_manifest(index_path))
+    sentence_index = load_sentence_index(faiss_store, persist_directory, contents)
+    print(f"{args.corpus}: {len(sentence_index.spans)} sentences in {len(sentence_index.offsets) - 1} units, "
+          f"{sentence_index.embeddings.nbytes / 2**20:.2f} MB of float16 embeddings\n")
+
+    ratios = [float(ratio) for ratio in args.ratios.split(",")]
+    tokens = {ratio: [] for ratio in [1.0] + ratios}
+    for question in (q for qs in load_questions().values() for q in qs):
+        embedding = np.asarray(EMBEDDING_FUNCTION.embed_query(question), dtype=np.float32)
+        query_vector = embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+        docs = [doc for doc, _ in similarity_search(question, faiss_store, args.k, 400, embedding=embedding)]
+        if not docs:
+            continue
+        passages = [(context_passage(faiss_store, doc), context_unit(faiss_store, doc)) for doc in docs]
+        for ratio in tokens:
+            compressed = [
+                passage if ratio == 1.0 else passage._replace(text=sentence_index.compress(unit, passage.text, query_vector, ratio))
+                for passage, unit in passages
+            ]
+            tokens[ratio].append(build_context(compressed)[2])
+    baseline = np.mean(tokens[1.0])
+    print(f"{'keep ratio':>10} {'questions':>10} {'context tokens':>15} {'reduction':>10}")
+    for ratio, counts in tokens.items():
+        label = "off" if ratio == 1.0 else f"{ratio:.2f}"
+        print(f"{label:>10} {len(counts):>10} {np.mean(counts):>15.1f} {1 - np.mean(counts) / baseline:>10.1%}")
+
+def answer_quality(args) -> None:
+    """Run the pipeline with compression off and on and report prompt tokens and accuracy."""
+    os.environ["CORPUS_SOURCE"] = os.path.join(ROOT, "data", args.corpus)
+    os.environ["CONTEXT_COMPRESSION"] = "1"  # Loads the sentence index with the snapshot
+    from backend import inference
+    from backend.query_cache import QueryContext
+
+    questions = load_questions()
+    print(f"\n{'compression':>11} {'prompt tokens':>14} {'answerable':>11} {'unanswerable':>13}")
+    for enabled in (False, True):
+        inference.CONTEXT_COMPRESSION = enabled
+        prompt_tokens, correct = [], {}
+        for kind, kind_questions in questions.items():
+            correct[kind] = 0
+            for question in kind_questions:
+                query_context = QueryContext(inference.EMBEDDING_FUNCTION)
+                response = "".join(chunk for chunk, _ in inference.generate_completion(question, query_context))
+                if "prompt_tokens" in query_context.trace:
+                    prompt_tokens.append(query_context.trace["prompt_tokens"])
+                correct[kind] += (inference.UNANSWERABLE_MSG in response) == (kind == "unanswerable")
+        accuracy = {kind: correct[kind] / max(len(questions[kind]), 1) for kind in questions}
+        print(f"{'on' if enabled else 'off':>11} {np.mean(prompt_tokens):>14.1f} "
+              f"{accuracy['answerable']:>11.1%} {accuracy['unanswerable']:>13.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="swebok")
+    parser.add_argument("--ratios", default="0.3,0.5,0.7")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--answers", action="store_true")
+    args = parser.parse_args()
+    context_tokens(args)
+    if args.answers:
+        answer_quality(args)
+
+if __name__ == "__main__":
+    main()
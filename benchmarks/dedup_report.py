@@ -0,0 +1,111 @@
+"""
+Purpose: Measure what near-duplicate elimination saves and how it changes retrieval on tests/questions.json
+Usage: python benchmarks/dedup_report.py [--corpus swebok] [--distances 3,6,10] [--backend huggingface] [--k 2]
+Processing:
+    1. Reads the chunks of the collection (index.pkl) in row order, as they were before deduplication
+    2. For each SimHash distance, drops near-duplicates in corpus order and counts the chunks, text bytes and
+       vector bytes saved
+    3. Searches the full and the deduplicated chunk sets with every evaluation question and reports, at top-k:
+       - dup slots: share of questions whose top k holds two near-duplicate chunks
+       - answerable/unanswerable hits: share of questions with a hit under the serving distance cut-off (320)
+       - top-1 agreement with the full index (a dropped chunk is replaced by the chunk it duplicated)
+Chunk vectors are read back from index.faiss when it exists, otherwise embedded with --backend.
+"""
+import os
+import sys
+import json
+import pickle
+import argparse
+import numpy as np
+import faiss
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend.dedup import SimHashIndex, simhash
+from backend.embeddings import get_embedding_engine
+
+RELEVANT_DISTANCE = 320  # Cut-off used by fetch_relevant_documents
+
+def load_questions() -> dict:
+    """Return the answerable and unanswerable evaluation questions."""
+    with open(os.path.join(ROOT, "tests", "questions.json"), "r") as f:
+        question_sets = json.load(f)["questions"]
+    return {kind: [q for qs in question_sets for q in qs[kind] if q] for kind in ("answerable", "unanswerable")}
+
+def dedup_map(fingerprints: list, max_distance: int) -> np.ndarray:
+    """Map every row to the row it is kept as: itself, or the earlier chunk it duplicates."""
+    index, original = SimHashIndex(max_distance), np.arange(len(fingerprints))
+    for row, fingerprint in enumerate(fingerprints):
+        match = index.find(fingerprint)
+        if match is None:
+            index.add(row, fingerprint)
+        else:
+            original[row] = match
+    return original
+
+def evaluate(vectors: np.ndarray, rows: np.ndarray, queries: dict, k: int, fingerprints: list, max_distance: int) -> dict:
+    """Search a flat index over the given rows and collect the retrieval statistics."""
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors[rows])
+    results = {}
+    for kind, query_vectors in queries.items():
+        distances, hits = index.search(query_vectors, k)
+        results[kind] = (distances, rows[hits])
+    distances, hits = results["answerable"]
+    all_hits = np.concatenate([results[kind][1] for kind in results])
+    dup_slots = sum(
+        any(bin(fingerprints[a] ^ fingerprints[b]).count("1") <= max_distance for a in row for b in row if a < b)
+        for row in all_hits
+    )
+    return {
+        "top1": np.concatenate([results[kind][1][:, 0] for kind in results]),
+        "dup_slots": dup_slots / len(all_hits),
+        "answerable_hits": float(np.mean(distances[:, 0] < RELEVANT_DISTANCE)),
+        "unanswerable_hits": float(np.mean(results["unanswerable"][0][:, 0] < RELEVANT_DISTANCE)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="swebok")
+    parser.add_argument("--distances", default="3,6,10")
+    parser.add_argument("--backend", default="huggingface")
+    parser.add_argument("--k", type=int, default=2)
+    args = parser.parse_args()
+
+    index_path = os.path.join(ROOT, "data", args.corpus, "faiss_indexes", "collection")
+    with open(os.path.join(index_path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    texts = [docstore.search(index_to_docstore_id[row]).page_content for row in range(len(index_to_docstore_id))]
+    engine = get_embedding_engine(args.backend)
+    if os.path.exists(os.path.join(index_path, "index.faiss")):
+        flat = faiss.read_index(os.path.join(index_path, "index.faiss"))
+        vectors = flat.reconstruct_n(0, flat.ntotal)
+    else:
+        vectors = np.asarray(engine.embed_documents(texts), dtype=np.float32)
+    questions = load_questions()
+    queries = {kind: np.asarray([engine.embed_query(q) for q in qs], dtype=np.float32) for kind, qs in questions.items()}
+    fingerprints = [simhash(text) for text in texts]
+    text_bytes = np.array([len(text.encode("utf-8")) for text in texts])
+
+    baseline_distance = min(int(d) for d in args.distances.split(","))
+    full = evaluate(vectors, np.arange(len(texts)), queries, args.k, fingerprints, baseline_distance)
+    print(f"{args.corpus}: {len(texts)} chunks, {text_bytes.sum() / 1024:.1f} KB of text, "
+          f"{vectors.nbytes / 2**20:.2f} MB of vectors, {sum(map(len, questions.values()))} questions, k={args.k}\n")
+    print(f"{'distance':>8} {'chunks':>7} {'dropped':>8} {'text KB':>8} {'vector MB':>10} "
+          f"{'dup slots':>10} {'ans hits':>9} {'unans hits':>11} {'top1 agree':>11}")
+    print(f"{'off':>8} {len(texts):>7} {0:>8} {0:>8.1f} {0:>10.2f} "
+          f"{full['dup_slots']:>10.3f} {full['answerable_hits']:>9.3f} {full['unanswerable_hits']:>11.3f} {1:>11.3f}")
+    for max_distance in (int(d) for d in args.distances.split(",")):
+        original = dedup_map(fingerprints, max_distance)
+        kept = np.flatnonzero(original == np.arange(len(texts)))
+        dropped = len(texts) - len(kept)
+        result = evaluate(vectors, kept, queries, args.k, fingerprints, baseline_distance)
+        agree = float(np.mean(original[full["top1"]] == result["top1"]))
+        saved_text = (text_bytes.sum() - text_bytes[kept].sum()) / 1024
+        saved_vectors = dropped * vectors.shape[1] * vectors.itemsize / 2**20
+        print(f"{max_distance:>8} {len(kept):>7} {dropped:>8} {saved_text:>8.1f} {saved_vectors:>10.2f} "
+              f"{result['dup_slots']:>10.3f} {result['answerable_hits']:>9.3f} {result['unanswerable_hits']:>11.3f} {agree:>11.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Purpose: Compare startup time and memory of the pickled docstore against the columnar docstore
+Usage: python benchmarks/docstore_startup.py [--corpus default] [--runs 5]
+Processing:
+    1. Writes the columnar docstore from index.pkl if it is missing or stale
+    2. In a fresh process per run, loads the docstore the old way (unpickle + ReadOnlyDocstore)
+       or the new way (ColumnarDocstore memory maps), then fetches the documents of 100 random rows
+    3. Reports the median load time, the RSS added by the load, and the time to fetch the documents
+Linux only (RSS is read from /proc/self/status).
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import subprocess
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend.docstore import ColumnarDocstore, ReadOnlyDocstore
+
+def rss_kb() -> int:
+    """Return the resident set size of this process in kB."""
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+
+def pickle_stat(index_path: str) -> list:
+    """Return [size, mtime_ns] of index.pkl."""
+    stat = os.stat(os.path.join(index_path, "index.pkl"))
+    return [stat.st_size, stat.st_mtime_ns]
+
+def load_pickled(index_path: str) -> tuple:
+    """Load the docstore as FAISS.load_local and freeze_docstore did."""
+    with open(os.path.join(index_path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return ReadOnlyDocstore(docstore._dict), index_to_docstore_id
+
+def run(index_path: str, mode: str) -> dict:
+    """Measure one load in this process."""
+    before = rss_kb()
+    start = time.perf_counter()
+    if mode == "pickle":
+        docstore, index_to_docstore_id = load_pickled(index_path)
+        fetch = lambda row: docstore.search(index_to_docstore_id[row])
+    else:
+        docstore = ColumnarDocstore.load(os.path.join(index_path, "docstore"))
+        fetch = docstore.document
+    load_ms = (time.perf_counter() - start) * 1000
+    rss_mb = (rss_kb() - before) / 1024
+    rows = np.random.default_rng(0).integers(0, len(docstore), size=100)
+    start = time.perf_counter()
+    for row in rows:
+        fetch(int(row))
+    return {"load_ms": load_ms, "rss_mb": rss_mb, "fetch_100_ms": (time.perf_counter() - start) * 1000}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="default")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", choices=["pickle", "columnar"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    index_path = os.path.join(ROOT, "data", args.corpus, "faiss_indexes", "collection")
+    if args.child:
+        print(json.dumps(run(index_path, args.child)))
+        return
+
+    docstore_path = os.path.join(index_path, "docstore")
+    if ColumnarDocstore.load(docstore_path, pickle_stat(index_path)) is None:
+        docstore, index_to_docstore_id = load_pickled(index_path)
+        ids = [index_to_docstore_id[row] for row in range(len(index_to_docstore_id))]
+        ColumnarDocstore.write(docstore_path, ids, [docstore.search(doc_id) for doc_id in ids], pickle_stat(index_path))
+
+    print(f"{'docstore':<10} {'load ms':>9} {'RSS MB':>8} {'fetch 100 ms':>13}")
+    for mode in ("pickle", "columnar"):
+        results = [
+            json.loads(subprocess.check_output([sys.executable, __file__, "--corpus", args.corpus, "--child", mode]))
+            for _ in range(args.runs)
+        ]
+        median = {key: float(np.median([r[key] for r in results])) for key in results[0]}
+        print(f"{mode:<10} {median['load_ms']:>9.1f} {median['rss_mb']:>8.1f} {median['fetch_100_ms']:>13.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Purpose: Check that an embedding backend matches the fp32 reference on the corpus before serving it
+Usage: python benchmarks/embedding_parity.py --backend quantized [--corpus swebok] [--sample 500] [--min-cosine 0.99]
+Processing:
+    1. Embeds a sample of indexed chunks with both backends and reports cosine similarity
+    2. Searches the FAISS index with the evaluation questions using both backends and reports top-k overlap
+    3. Reports the per-query embedding latency of both backends
+Exits with status 1 if the mean chunk cosine is below --min-cosine.
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import random
+import argparse
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend.embeddings import get_embedding_engine, parity_report
+
+def load_chunk_texts(index_path: str) -> list:
+    """Read chunk texts straight from the pickled docstore."""
+    with open(os.path.join(index_path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return [docstore.search(doc_id).page_content for doc_id in index_to_docstore_id.values()]
+
+def load_questions() -> list:
+    """Return every answerable and unanswerable evaluation question."""
+    with open(os.path.join(ROOT, "tests", "questions.json"), "r") as f:
+        question_sets = json.load(f)["questions"]
+    return [q for qs in question_sets for q in qs["answerable"] + qs["unanswerable"] if q]
+
+def embed_queries(engine, questions: list) -> tuple:
+    """Embed each question separately and return (vectors, mean milliseconds per query)."""
+    start = time.perf_counter()
+    vectors = np.asarray([engine.embed_query(q) for q in questions], dtype=np.float32)
+    return vectors, (time.perf_counter() - start) * 1000 / len(questions)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="quantized")
+    parser.add_argument("--corpus", default="swebok")
+    parser.add_argument("--sample", type=int, default=500)
+    parser.add_argument("--k", type=int, default=2)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    index_path = os.path.join(ROOT, "data", args.corpus, "faiss_indexes", "collection")
+    texts = load_chunk_texts(index_path)
+    random.Random(0).shuffle(texts)
+    texts = texts[:args.sample]
+
+    reference = get_embedding_engine("huggingface")
+    candidate = get_embedding_engine(args.backend)
+    report = parity_report(candidate, reference, texts)
+
+    questions = load_questions()
+    reference_queries, report["reference_ms_per_query"] = embed_queries(reference, questions)
+    candidate_queries, report["candidate_ms_per_query"] = embed_queries(candidate, questions)
+    faiss_path = os.path.join(index_path, "index.faiss")
+    if os.path.exists(faiss_path):
+        import faiss
+        index = faiss.read_index(faiss_path)
+        _, reference_rows = index.search(reference_queries, args.k)
+        _, candidate_rows = index.search(candidate_queries, args.k)
+        overlap = [len(set(a) & set(b)) / args.k for a, b in zip(reference_rows, candidate_rows)]
+        report[f"top{args.k}_overlap"] = float(np.mean(overlap))
+
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["mean_cosine"] >= args.min_cosine else 1)
+
+if __name__ == "__main__":
+    main()
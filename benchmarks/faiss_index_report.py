@@ -0,0 +1,103 @@
+"""
+Purpose: Compare FAISS index types on a collection before choosing FAISS_INDEX_TYPE
+Usage: python benchmarks/faiss_index_report.py [--corpus default] [--k 2] [--queries questions|corpus] [--configs '[{"type": "hnsw", "M": 16}]']
+Processing:
+    1. Reads the flat index of the collection and uses its exact results as ground truth
+    2. Builds every candidate index from the same vectors (row order preserved)
+    3. Reports recall@k against flat, p50/p99 single-query search latency, serialized size and build time
+Queries are the evaluation questions embedded with --backend, or (--queries corpus) sampled
+chunk vectors with small noise added, which needs no embedding model.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import faiss
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend.faiss_indexes import build_index, resolve_index_config
+
+DEFAULT_CONFIGS = [
+    {"type": "flat"},
+    {"type": "hnsw", "M": 16, "ef_search": 32},
+    {"type": "hnsw", "M": 32, "ef_search": 64},
+    {"type": "ivf_flat", "nprobe": 4},
+    {"type": "ivf_flat", "nprobe": 16},
+    {"type": "ivf_pq", "nprobe": 16},
+]
+
+def load_questions() -> list:
+    """Return every answerable and unanswerable evaluation question."""
+    with open(os.path.join(ROOT, "tests", "questions.json"), "r") as f:
+        question_sets = json.load(f)["questions"]
+    return [q for qs in question_sets for q in qs["answerable"] + qs["unanswerable"] if q]
+
+def corpus_queries(vectors: np.ndarray, count: int) -> np.ndarray:
+    """Sample chunk vectors and perturb them so queries are near, but not on, indexed points."""
+    rng = np.random.default_rng(0)
+    sample = vectors[rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)]
+    noise = rng.normal(scale=sample.std() * 0.5, size=sample.shape).astype(np.float32)
+    return sample + noise
+
+def measure(index, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    """Search query by query and return recall@k against truth and latency percentiles."""
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        _, rows = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(rows[0]) & set(expected))
+    return {
+        f"recall@{k}": round(hits / truth.size, 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="default")
+    parser.add_argument("--k", type=int, default=2)
+    parser.add_argument("--queries", choices=["questions", "corpus"], default="questions")
+    parser.add_argument("--backend", default="huggingface")
+    parser.add_argument("--sample", type=int, default=500)
+    parser.add_argument("--configs", help="JSON list of index configs (defaults to a flat/HNSW/IVF/IVF-PQ sweep)")
+    args = parser.parse_args()
+
+    index_path = os.path.join(ROOT, "data", args.corpus, "faiss_indexes", "collection", "index.faiss")
+    flat = faiss.read_index(index_path)
+    vectors = flat.reconstruct_n(0, flat.ntotal)
+    if args.queries == "questions":
+        from backend.embeddings import get_embedding_engine
+        engine = get_embedding_engine(args.backend)
+        queries = np.asarray([engine.embed_query(q) for q in load_questions()], dtype=np.float32)
+    else:
+        queries = corpus_queries(vectors, args.sample)
+    _, truth = flat.search(queries, args.k)
+
+    configs = json.loads(args.configs) if args.configs else DEFAULT_CONFIGS
+    rows = []
+    for config in configs:
+        config = resolve_index_config(config["type"], {key: value for key, value in config.items() if key != "type"})
+        start = time.perf_counter()
+        index, params = build_index(vectors, config)
+        build_seconds = time.perf_counter() - start
+        rows.append({
+            "params": params,
+            **measure(index, queries, truth, args.k),
+            "size_mb": round(faiss.serialize_index(index).nbytes / 2**20, 2),
+            "build_s": round(build_seconds, 2),
+        })
+
+    print(f"{flat.ntotal} vectors, {len(queries)} queries, k={args.k}\n")
+    print(f"{'index':<50} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8} {'MB':>8} {'build s':>8}")
+    for row in rows:
+        name = " ".join(f"{key}={value}" for key, value in row["params"].items() if key != "type")
+        name = f"{row['params']['type']} {name}".strip()
+        print(f"{name:<50} {row[f'recall@{args.k}']:>7.3f} {row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f} {row['size_mb']:>8.2f} {row['build_s']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
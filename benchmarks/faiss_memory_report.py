@@ -0,0 +1,75 @@
+"""
+Purpose: Measure the memory each extra serving process costs with heap-loaded vs memory-mapped FAISS indexes
+Usage: python benchmarks/faiss_memory_report.py [--corpus default] [--workers 4] [--index-file serving.faiss]
+Processing:
+    1. Starts 1..N worker processes that read the index (heap or FAISS_MMAP-style mmap), read back every
+       stored vector so every page is resident, and run a few searches
+    2. While all workers are alive, reads their RSS and PSS from /proc/<pid>/smaps_rollup
+    3. Reports the total PSS for each worker count and the marginal cost of one more worker
+PSS splits shared pages between the processes mapping them, so it is the number that adds up to machine memory.
+Linux only.
+"""
+import os
+import sys
+import argparse
+import multiprocessing as mp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def memory_kb(pid: int) -> dict:
+    """Read Rss and Pss (kB) of a process."""
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                usage[key] = int(value.split()[0])
+    return usage
+
+def worker(index_file: str, mmap: bool, ready, done) -> None:
+    """Load the index, touch every vector, then wait until the parent has measured."""
+    import faiss
+    from backend.faiss_indexes import read_index
+    faiss.omp_set_num_threads(1)  # one search thread per serving process
+    index = read_index(index_file, mmap=mmap)
+    for start in range(0, index.ntotal, 1024):
+        queries = index.reconstruct_n(start, min(1024, index.ntotal - start))
+    index.search(queries[:8], 1)
+    ready.wait()
+    done.wait()
+
+def measure(index_file: str, mmap: bool, workers: int) -> dict:
+    """Run workers processes together and return their summed Rss and Pss in MB."""
+    ctx = mp.get_context("spawn")
+    ready, done = ctx.Barrier(workers + 1), ctx.Barrier(workers + 1)
+    processes = [ctx.Process(target=worker, args=(index_file, mmap, ready, done)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    ready.wait()
+    usage = [memory_kb(process.pid) for process in processes]
+    done.wait()
+    for process in processes:
+        process.join()
+    return {key: sum(u[key] for u in usage) / 1024 for key in ("Rss", "Pss")}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="default")
+    parser.add_argument("--index-file", default="index.faiss", help="File inside the collection directory (e.g. serving.faiss)")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    index_file = os.path.join(ROOT, "data", args.corpus, "faiss_indexes", "collection", args.index_file)
+    print(f"{index_file}: {os.path.getsize(index_file) / 2**20:.1f} MB\n")
+    print(f"{'mode':<6} {'workers':>7} {'RSS MB':>9} {'PSS MB':>9} {'PSS/extra worker':>17}")
+    for mmap in (False, True):
+        previous = None
+        for workers in range(1, args.workers + 1):
+            usage = measure(index_file, mmap, workers)
+            marginal = "" if previous is None else f"{usage['Pss'] - previous:.1f}"
+            print(f"{'mmap' if mmap else 'heap':<6} {workers:>7} {usage['Rss']:>9.1f} {usage['Pss']:>9.1f} {marginal:>17}")
+            previous = usage["Pss"]
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Purpose: Compare the time to first byte of structured-intent questions on the fast path and on the LLM path
+Usage: python benchmarks/fast_path_report.py [--corpus swebok] [--runs 3] [--llm]
+Processing:
+    1. Builds one question per structured intent (title, author, number, chapter_title, appendix, a chapter
+       summary and an appendix summary)
+    2. Times the fast path alone (template over contents.json, or summary table lookup); no model is loaded
+    3. With --llm, runs generate_completion with the fast path on and off (needs MISTRAL_API_KEY and, for the
+       summaries, a table written by `python -m backend.fast_answers`) and reports the median time to the first
+       chunk and the answer path of each question
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend.chapters import CONTENTS_NAME, load_contents
+from backend.fast_answers import summary_unit, templated_answer
+
+QUESTIONS = [
+    ("title", "What is the title of the textbook?"),
+    ("author", "Who is the author?"),
+    ("number", "How many chapters are there?"),
+    ("chapter_title", "What is the title of chapter 4?"),
+    ("appendix", "What are the appendices about?"),
+    ("summary_chapter", "Summarize chapter 3"),
+    ("appendix", "Summarize appendix B"),
+]
+
+def time_to_first_chunk(chunks) -> float:
+    """Return the milliseconds until a (chunk, model_name) generator yields, draining the rest."""
+    start = time.perf_counter()
+    first = None
+    for _ in chunks:
+        if first is None:
+            first = (time.perf_counter() - start) * 1000
+    return first
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="swebok")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--llm", action="store_true")
+    args = parser.parse_args()
+
+    contents = load_contents(os.path.join(ROOT, "data", args.corpus, CONTENTS_NAME))
+    print(f"{'intent':>16} {'fast path us':>13}  answer")
+    for tag, question in QUESTIONS:
+        start = time.perf_counter()
+        for _ in range(1000):
+            answer = templated_answer(tag, question, contents)
+            unit = summary_unit(tag, question, contents) if answer is None else None
+        elapsed_us = (time.perf_counter() - start) * 1000
+        label = answer.splitlines()[0] if answer else f"summary table entry {unit}"
+        print(f"{tag:>16} {elapsed_us:>13.1f}  {label}")
+    if not args.llm:
+        return
+
+    os.environ["CORPUS_SOURCE"] = os.path.join(ROOT, "data", args.corpus)
+    from backend import inference
+    from backend.query_cache import QueryContext
+    print(f"\n{'intent':>16} {'fast ttfb ms':>13} {'llm ttfb ms':>12}  fast path taken")
+    for tag, question in QUESTIONS:
+        timings, path = {True: [], False: []}, None
+        for _ in range(args.runs):
+            for fast_path in (True, False):
+                query_context = QueryContext(inference.EMBEDDING_FUNCTION)
+                timings[fast_path].append(time_to_first_chunk(inference.generate_completion(question, query_context, fast_path)))
+                if fast_path:
+                    path = query_context.trace.get("answer_path")
+            time.sleep(1)  # Avoids getting rate limited by the mistral api
+        print(f"{tag:>16} {np.median(timings[True]):>13.1f} {np.median(timings[False]):>12.1f}  {path}")
+
+if __name__ == "__main__":
+    main()
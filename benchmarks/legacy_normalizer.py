@@ -0,0 +1,48 @@
+"""
+Purpose: Reference implementations of the question normalization that backend/normalizer.py replaced
+Processing: The per-character, per-word and per-abbreviation functions update_question and generate_completion
+    used to call; tests/test_normalizer.py checks the compiled normalizer against them and
+    benchmarks/normalizer_bench.py times both
+"""
+import re
+
+from backend.abb import abbreviations
+
+def legacy_sanitize_question(question: str) -> str:
+    """Filter out all characters except letters and spaces."""
+    return ''.join(char for char in question if char.isalpha() or char.isspace())
+
+def legacy_validate_question(question: str) -> bool:
+    """Check that the sanitized question is a complete question of at most 200 letters."""
+    pattern = r'(?:what\s+is\s+)?[A-Z]{2,4}\s\d{3,4}'
+    if re.match(pattern, question):
+        return False
+    ignore_list = [
+        "what", "whatis", "what's", "explain",
+        "how", "howdoes", "howis", "when", "whenis", "why", "whyis", "who", "whois"
+    ]
+    cleaned_question = question.lower().strip().replace(" ", "")
+    sanitized_question = legacy_sanitize_question(question).replace(" ", "").lower()
+    if cleaned_question in ignore_list or sanitized_question in ignore_list:
+        return False
+    return len(sanitized_question) > 0 and len(sanitized_question) <= 200
+
+def legacy_replace_text(question: str) -> str:
+    """Rephrase the question lead and replace abbreviations word by word."""
+    if not question.lower().startswith(("how", "when", "why", "who")):
+        if question.lower().startswith("what is"):
+            question = question.replace(question[:7], "Explain")
+        elif question.lower().startswith("what's"):
+            question = question.replace(question[:6], "Explain")
+        elif question.lower().startswith("explain"):
+            question = question.replace(question[:7], "What is")
+        else:
+            question = "What is " + question
+    result = []
+    for word in question.split():
+        replaced_word = word
+        for abbrev, full_form in abbreviations.items():
+            if abbrev in word:
+                replaced_word = word.replace(abbrev, full_form)
+        result.append(replaced_word)
+    return ' '.join(result)
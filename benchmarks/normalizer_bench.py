@@ -0,0 +1,52 @@
+"""
+Purpose: Compare the per-request cost of the compiled question normalizer with the functions it replaced
+Usage: python benchmarks/normalizer_bench.py [--repeat 200]
+Processing:
+    1. Normalizes every question of tests/questions.json with the reference functions (replace_text,
+       sanitize_question and validate_question, kept in benchmarks/legacy_normalizer.py) and with normalize_question
+    2. Reports the mean time per question of both and the number of questions whose outputs differ
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend.normalizer import normalize_question
+from benchmarks.legacy_normalizer import legacy_replace_text, legacy_sanitize_question, legacy_validate_question
+
+def legacy_normalize(question: str) -> tuple:
+    """Produce the three forms the way update_question and generate_completion used to."""
+    expanded = legacy_replace_text(question.strip())
+    return legacy_validate_question(question), expanded, legacy_sanitize_question(expanded)
+
+def time_per_question(normalize_fn, questions: list, repeat: int) -> float:
+    """Return the mean microseconds per question."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question in questions:
+            normalize_fn(question)
+    return (time.perf_counter() - start) / (repeat * len(questions)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, "tests", "questions.json"), "r") as f:
+        question_sets = json.load(f)["questions"]
+    questions = [q for qs in question_sets for kind in ("answerable", "unanswerable") for q in qs[kind] if q]
+    differ = sum(tuple(normalize_question(q)) != legacy_normalize(q) for q in questions)
+    legacy_us = time_per_question(legacy_normalize, questions, args.repeat)
+    compiled_us = time_per_question(normalize_question, questions, args.repeat)
+    print(f"{len(questions)} questions, {args.repeat} repeats, {differ} with different output\n")
+    print(f"{'normalizer':>10} {'us/question':>12}")
+    print(f"{'legacy':>10} {legacy_us:>12.1f}")
+    print(f"{'compiled':>10} {compiled_us:>12.1f}")
+    print(f"\nspeedup: {legacy_us / compiled_us:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import numpy as np
+
+from backend import answer_cache as answer_cache_module
+from backend.answer_cache import AnswerCache, AnswerKey, question_signature
+
+KEY = AnswerKey("snapshot-1", "prompt", "model", question_signature("What is chapter 3 about?", "03"))
+CHUNKS = [("An answer.", "model")]
+
+def vector(*values):
+    return np.array(values, dtype=np.float32)
+
+def test_similar_question_hits():
+    cache = AnswerCache(max_entries=4, ttl=60, threshold=0.95)
+    cache.put(KEY, vector(1, 0, 0), CHUNKS)
+    chunks, similarity = cache.get(KEY, vector(1, 0.05, 0))
+    assert chunks == CHUNKS and similarity > 0.95
+    assert cache.get(KEY, vector(0, 1, 0))[0] is None
+    assert cache.get(KEY._replace(model_name="other"), vector(1, 0, 0))[0] is None
+
+def test_expired_entries_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache_module.time, "time", lambda: now[0])
+    cache = AnswerCache(max_entries=4, ttl=60, threshold=0.95)
+    cache.put(KEY, vector(1, 0, 0), CHUNKS)
+    now[0] += 61
+    assert cache.get(KEY, vector(1, 0, 0))[0] is None
+    assert len(cache) == 0
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache(max_entries=2, ttl=60, threshold=0.95)
+    cache.put(KEY, vector(1, 0, 0), [("first", "model")])
+    cache.put(KEY, vector(0, 1, 0), [("second", "model")])
+    assert cache.get(KEY, vector(1, 0, 0))[0] == [("first", "model")]
+    cache.put(KEY, vector(0, 0, 1), [("third", "model")])
+    assert len(cache) == 2
+    assert cache.get(KEY, vector(0, 1, 0))[0] is None
+    assert cache.get(KEY, vector(1, 0, 0))[0] == [("first", "model")]
+
+def test_retain_version_drops_other_snapshots():
+    cache = AnswerCache(max_entries=4, ttl=60, threshold=0.95)
+    cache.put(KEY, vector(1, 0, 0), CHUNKS)
+    cache.put(KEY._replace(index_version="snapshot-2"), vector(0, 1, 0), CHUNKS)
+    cache.retain_version("snapshot-2")
+    assert len(cache) == 1
+    assert cache.get(KEY, vector(1, 0, 0))[0] is None
@@ -0,0 +1,16 @@
+from backend.chapters import find_chapter
+
+CONTENTS = {"chapters": [
+    {"chapter": "01", "chapter_number_text": "one"},
+    {"chapter": "02", "chapter_number_text": "two"},
+    {"chapter": "03", "chapter_number_text": "three"},
+]}
+
+def test_find_chapter_explicit():
+    assert find_chapter("What are the two main types of software maintenance?", CONTENTS, explicit=True) is None
+    assert find_chapter("Summarize chapter three", CONTENTS, explicit=True) == "03"
+    assert find_chapter("What is in chapter 02?", CONTENTS, explicit=True) == "2"
+
+def test_find_chapter_number_word():
+    # The chapter intents still accept a bare number word
+    assert find_chapter("What is the title of the third chapter, three?", CONTENTS) == "03"
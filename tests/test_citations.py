@@ -0,0 +1,18 @@
+from langchain_core.documents import Document
+
+from backend.citations import handle_citations
+
+def test_citation_links_the_shard_pdf(monkeypatch):
+    monkeypatch.setenv("CORPUS_SOURCE", "/app/data/swebok")
+    doc = Document(page_content="", metadata={"source": "/build/data/other/guide.pdf", "page": 4, "corpus_path": "/app/data/other"})
+    assert 'file=/app/data/other/guide.pdf&page=5"' in handle_citations([doc])
+
+def test_citation_defaults_to_corpus_source(monkeypatch):
+    monkeypatch.setenv("CORPUS_SOURCE", "/app/data/swebok")
+    doc = Document(page_content="", metadata={"source": "data\\swebok\\textbook.pdf", "page": 0})
+    assert 'file=/app/data/swebok/textbook.pdf&page=1"' in handle_citations([doc])
+
+def test_citation_file_name_is_url_encoded(monkeypatch):
+    monkeypatch.setenv("CORPUS_SOURCE", "/app/data/default")
+    doc = Document(page_content="", metadata={"source": "/app/data/default/Software Engineering (A Practitioner's Approach) R&D #2+.pdf", "page": 9})
+    assert "file=/app/data/default/Software%20Engineering%20%28A%20Practitioner%27s%20Approach%29%20R%26D%20%232%2B.pdf&page=10\"" in handle_citations([doc])
@@ -0,0 +1,33 @@
+from backend.context import Passage, build_context
+
+def test_adjacent_passages_are_merged_in_text_order():
+    passages = [
+        Passage("fox jumps over the lazy dog", "book", 2),
+        Passage("The quick brown fox jumps over", "book", 1),
+    ]
+    context, used, _ = build_context(passages, budget=1000)
+    assert context == "The quick brown fox jumps over the lazy dog"
+    assert used == [0, 1]
+
+def test_repeated_window_is_used_once():
+    passages = [Passage("Requirements elicitation techniques.", "book", 4), Passage("Requirements elicitation techniques.", "book", 4)]
+    context, used, _ = build_context(passages, budget=1000)
+    assert context == "Requirements elicitation techniques."
+    assert used == [0, 1]
+
+def test_groups_are_joined_best_first():
+    passages = [Passage("Testing finds defects.", "testing", 0), Passage("Design comes first.", "design", 0)]
+    context, _, _ = build_context(passages, budget=1000)
+    assert context == "Testing finds defects.\n\nDesign comes first."
+
+def test_passages_over_budget_are_skipped():
+    passages = [Passage("Short answer.", "book", 0), Passage(" ".join(["word"] * 500), "other", 0)]
+    context, used, tokens = build_context(passages, budget=50)
+    assert context == "Short answer."
+    assert used == [0]
+    assert tokens <= 50
+
+def test_best_passage_is_truncated_to_budget():
+    context, used, tokens = build_context([Passage(" ".join(["word"] * 500), "book", 0)], budget=20)
+    assert used == [0]
+    assert tokens <= 20
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from backend import faiss_indexes
+from backend.faiss_indexes import load_serving_index, resolve_index_config
+
+VECTORS = np.random.default_rng(0).random((2000, 64), dtype=np.float32)
+
+@pytest.mark.parametrize("index_type,params", [
+    ("flat", None),
+    ("hnsw", None),
+    ("ivf_flat", None),
+    ("ivf_pq", {"m": 8}),
+])
+def test_mapped_serving_index_loads(tmp_path, monkeypatch, index_type, params):
+    monkeypatch.setattr(faiss_indexes, "FAISS_MMAP", True)
+    config = resolve_index_config(index_type, params)
+    built = []
+
+    def vectors_fn():
+        built.append(True)
+        return VECTORS
+
+    for _ in range(2):
+        index, meta = load_serving_index(str(tmp_path), vectors_fn, "rows", config)
+        assert index.ntotal == len(VECTORS)
+        _, rows = index.search(VECTORS[:4], 1)
+        assert rows[:, 0].tolist() == [0, 1, 2, 3]
+    # The second load reads the mapped file instead of building again
+    assert len(built) == 1
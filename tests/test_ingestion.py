@@ -0,0 +1,37 @@
+import os
+import pytest
+from langchain_core.documents import Document
+
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+
+from backend import ingestion
+
+PAGES = {
+    1: "Software requirements describe what a system must do and the constraints on its operation.",
+    2: "Software testing checks that a program behaves as specified and finds defects before release.",
+}
+
+def fake_parsed_pages(path, settings, known_hashes, workers=1):
+    """Stand-in for iter_parsed_pages: one chunk per page of PAGES, hashed by its text."""
+    for page_number, text in PAGES.items():
+        digest = str(hash((text, settings["chunk_size"])))
+        if known_hashes.get(str(page_number)) == digest:
+            yield page_number, digest, None
+        else:
+            yield page_number, digest, [Document(page_content=text, metadata={"source": path, "page": page_number})]
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingestion, "iter_parsed_pages", fake_parsed_pages)
+    (tmp_path / "book.pdf").write_bytes(b"%PDF-1.4\n")
+    return str(tmp_path), str(tmp_path / "faiss_indexes")
+
+def test_sync_rebuilds_when_index_faiss_is_deleted(corpus):
+    document_path, persist_directory = corpus
+    faiss_store = ingestion.sync_faiss_vector_store(document_path, persist_directory, workers=1)
+    assert faiss_store.index.ntotal == len(PAGES)
+    os.remove(os.path.join(persist_directory, "collection", "index.faiss"))
+    # The manifest is left behind; every page must be embedded again
+    faiss_store = ingestion.sync_faiss_vector_store(document_path, persist_directory, workers=1)
+    assert faiss_store.index.ntotal == len(PAGES)
+    assert os.path.exists(os.path.join(persist_directory, "collection", "index.faiss"))
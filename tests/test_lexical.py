@@ -0,0 +1,29 @@
+import numpy as np
+
+from backend.lexical import LexicalIndex, reciprocal_rank_fusion
+
+TEXTS = ["alpha beta", "alpha gamma", "beta alpha delta", "alpha alpha epsilon"]
+
+def test_search_restricted_to_rows():
+    index = LexicalIndex.build(TEXTS)
+    assert [row for row, _ in index.search("alpha", 4, rows=np.array([3]))] == [3]
+    assert [row for row, _ in index.search("alpha beta", 4, rows=np.array([0, 1]))][0] == 0
+    assert index.search("delta", 4, rows=np.array([0, 1])) == []
+
+def test_search_ranks_every_row():
+    index = LexicalIndex.build(TEXTS)
+    assert [row for row, _ in index.search("gamma", 4)] == [1]
+    assert [row for row, _ in index.search("alpha epsilon", 4)][0] == 3
+    assert [row for row, _ in index.search("alpha delta", 4, min_coverage=1.0)] == [2]
+    assert index.search("zeta", 4) == []
+
+def test_save_and_load(tmp_path):
+    index = LexicalIndex.build(TEXTS, fingerprint="rows")
+    index.save(str(tmp_path / "lexical"))
+    loaded = LexicalIndex.load(str(tmp_path / "lexical"))
+    assert loaded.fingerprint == "rows"
+    assert loaded.search("alpha beta", 4) == index.search("alpha beta", 4)
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c"]])
+    assert [item for item, _ in fused] == ["b", "c", "a"]
@@ -0,0 +1,55 @@
+import json
+import pytest
+from pathlib import Path
+from typing import List
+
+from backend.normalizer import normalize_question, sanitize
+from benchmarks.legacy_normalizer import legacy_replace_text, legacy_sanitize_question, legacy_validate_question
+
+class TestNormalizer:
+    """Test suite for the single-pass question normalizer."""
+
+    @pytest.fixture
+    def questions(self) -> List[str]:
+        """Load every evaluation question."""
+        with open(Path(__file__).parent / 'questions.json', 'r') as f:
+            question_sets = json.load(f)["questions"]
+        return [q for qs in question_sets for kind in ("answerable", "unanswerable") for q in qs[kind] if q]
+
+    def test_matches_reference_on_questions(self, questions: List[str]):
+        """Every normalized form matches the reference functions on tests/questions.json"""
+        for question in questions:
+            normalized = normalize_question(question)
+            expanded = legacy_replace_text(question.strip())
+            assert normalized.valid == legacy_validate_question(question), question
+            assert normalized.expanded == expanded, question
+            assert normalized.sanitized == legacy_sanitize_question(expanded), question
+
+    @pytest.mark.parametrize("question", [
+        "CS 101", "what is SE 2024", "what", "What is", "  how  ", "Why?", "", "!!!", "a" * 201
+    ])
+    def test_rejects_like_reference(self, question: str):
+        """Course codes, bare question words and empty or overlong questions are invalid"""
+        assert normalize_question(question).valid is False
+        assert legacy_validate_question(question) is False
+
+    @pytest.mark.parametrize("text", ["x² + y²", "½ of the effort", "Chapter Ⅻ", "Café 2nd_draft", "日本語 三 ٣", "tab\there"])
+    def test_sanitizes_like_reference(self, text: str):
+        """Only letters and whitespace survive, including for non-ASCII digits and numerics"""
+        assert sanitize(text) == legacy_sanitize_question(text)
+
+    @pytest.mark.parametrize("question, expanded", [
+        ("What is KLOC?", "Explain Thousand Lines of Code?"),
+        ("How is UML used?", "How is Unified Modeling Language used?"),
+        ("What are ADs?", "What is What are Architecture Descriptions?"),
+        ("Explain V&V and I/O", "What is Verification and Validation and Input/Output"),
+        ("what's UI/UX", "Explain User Interface/User Experience"),
+    ])
+    def test_expands_whole_tokens(self, question: str, expanded: str):
+        """Abbreviations are expanded as whole tokens, including plurals and separators"""
+        assert normalize_question(question).expanded == expanded
+
+    @pytest.mark.parametrize("question", ["What does MITRE publish?", "Describe EXIT criteria", "Is SEED data used?"])
+    def test_keeps_abbreviations_inside_words(self, question: str):
+        """Words that merely contain an abbreviation (IT, DE, ...) are left alone"""
+        assert normalize_question(question).expanded == "What is " + question
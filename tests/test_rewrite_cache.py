@@ -0,0 +1,31 @@
+from backend import rewrite_cache as rewrite_cache_module
+from backend.rewrite_cache import RewriteCache, rewrite_key
+
+def test_key_ignores_case_and_spacing():
+    assert rewrite_key("What is  UML?", "prompt", "model") == rewrite_key("what is uml?", "prompt", "model")
+    assert rewrite_key("what is uml?", "prompt", "model") != rewrite_key("what is uml?", "prompt", "other")
+
+def test_expired_rewrite_is_a_miss(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rewrite_cache_module.time, "time", lambda: now[0])
+    cache = RewriteCache(str(tmp_path / "rewrites.db"), ttl=60, max_entries=10)
+    cache.put("key", "rewritten question")
+    assert cache.get("key") == "rewritten question"
+    now[0] += 61
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+def test_least_recently_used_rewrites_are_evicted(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rewrite_cache_module.time, "time", lambda: now[0])
+    cache = RewriteCache(str(tmp_path / "rewrites.db"), ttl=3600, max_entries=2)
+    for key in ("first", "second"):
+        now[0] += 1
+        cache.put(key, f"{key} rewrite")
+    now[0] += 1
+    assert cache.get("first") == "first rewrite"
+    now[0] += 1
+    cache.put("third", "third rewrite")
+    assert len(cache) == 2
+    assert cache.get("second") is None
+    assert cache.get("first") == "first rewrite"